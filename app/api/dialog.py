@@ -1,6 +1,7 @@
 from fastapi import APIRouter, WebSocket, Query
 from app.websocket import websocket_chat_handler
 from app.utils.JWTutils.jwt_helper import get_user_id
+from app.utils.logger import logger
 import json
 
 router = APIRouter(tags=["对话"])
@@ -38,7 +39,7 @@ async def websocket_chat_endpoint(
 
             set_request_token(token)
         except Exception as e:
-            print(f"验证失败: {e}")
+            logger.info("WebSocket token 验证失败: {}", e)
             await websocket.send_json(
                 {"type": "error", "content": f"Token 验证失败: {str(e)}"}
             )
@@ -54,7 +55,7 @@ async def websocket_chat_endpoint(
         )
 
     except Exception as e:
-        print(f"WebSocket 错误: {e}")
+        logger.warning("WebSocket 错误: {}", e)
         try:
             await websocket.close()
         except:
@@ -1,7 +1,16 @@
-from fastapi import APIRouter, Depends
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from app.utils.JWTutils.authentication import verify_token
-from app.database.service.message import get_messages
-from app.database.service.session import check_session_owner
+from app.database.service.message import (
+    get_owned_messages,
+    get_owned_messages_page,
+    iter_owned_messages,
+    parse_message_columns,
+)
+from app.utils.logger import logger
 
 router = APIRouter(prefix="/message", tags=["消息"])
 
@@ -9,12 +18,83 @@ router = APIRouter(prefix="/message", tags=["消息"])
 @router.get("/get-all-messages")
 async def get_all_message(session_id: int, user_id: str = Depends(verify_token)):
     try:
-        if not check_session_owner(session_id, user_id):
+        # 归属校验和消息查询合并为一次数据库调用
+        messages = await get_owned_messages(session_id, user_id)
+        if messages is None:
             return {"code": 403, "message": "无权访问此会话", "data": None}
 
-        result = get_messages(session_id)
-
-        return {"code": "200", "message": "获取成功", "data": result.data}
+        return {"code": "200", "message": "获取成功", "data": messages}
 
     except Exception as e:
         return {"code": "500", "message": f"获取失败，{e}", "data": None}
+
+
+@router.get("/messages")
+async def get_messages_page(
+    session_id: int,
+    user_id: str = Depends(verify_token),
+    limit: int = Query(50, ge=1, le=500, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    fields: Optional[str] = Query(
+        None, description="返回的字段，逗号分隔，如 id,role,content,created_at"
+    ),
+):
+    """按时间顺序分页获取会话消息（游标分页）"""
+    try:
+        columns = parse_message_columns(fields)
+        page = await get_owned_messages_page(session_id, user_id, limit, cursor, columns)
+    except ValueError as e:
+        return {"code": 400, "message": str(e), "data": None}
+    except Exception as e:
+        return {"code": 500, "message": f"获取失败，{e}", "data": None}
+
+    if page is None:
+        return {"code": 403, "message": "无权访问此会话", "data": None}
+
+    messages, next_cursor = page
+    return {
+        "code": 200,
+        "message": "获取成功",
+        "data": {"items": messages, "next_cursor": next_cursor},
+    }
+
+
+@router.get("/stream-messages")
+async def stream_messages(
+    session_id: int,
+    user_id: str = Depends(verify_token),
+    page_size: int = Query(200, ge=1, le=1000, description="每次从数据库读取的条数"),
+    fields: Optional[str] = Query(
+        None, description="返回的字段，逗号分隔，如 id,role,content,created_at"
+    ),
+):
+    """
+    以 NDJSON 流式返回会话的全部消息（每行一条消息）
+
+    服务端逐页读取、逐行输出，不在内存中拼出完整历史，前端可以边接收边渲染
+    """
+    try:
+        columns = parse_message_columns(fields)
+        # 先读第一页：归属校验失败时还能返回普通的 JSON 响应
+        first_page = await get_owned_messages_page(
+            session_id, user_id, page_size, None, columns
+        )
+    except ValueError as e:
+        return {"code": 400, "message": str(e), "data": None}
+    except Exception as e:
+        return {"code": 500, "message": f"获取失败，{e}", "data": None}
+
+    if first_page is None:
+        return {"code": 403, "message": "无权访问此会话", "data": None}
+
+    async def lines():
+        try:
+            async for message in iter_owned_messages(
+                session_id, user_id, page_size, columns, first_page
+            ):
+                yield json.dumps(message, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # 响应头已经发出，只能记录日志并提前结束
+            logger.error("[Message] 流式读取会话 {} 失败: {}", session_id, e)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
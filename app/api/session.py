@@ -2,11 +2,11 @@ from fastapi import APIRouter, Depends, Query
 from app.utils.JWTutils.authentication import verify_token
 from app.database.service.session import create_session
 from app.services.title_generator import generate_title
-from app.database.service.session import delete_session_service
-from app.database.service.session import check_session_owner
-from app.database.service.message import delete_messages
+from app.database.service.session import delete_session_owned
 from pydantic import BaseModel
-from app.database.service.session import get_sessions_paginated
+from typing import Optional
+from app.database.service.session import list_sessions_after, list_sessions_by_page
+from app.utils.logger import logger
 
 router = APIRouter(tags=["会话"])
 
@@ -16,27 +16,60 @@ async def get_session_history(
     user_id: str = Depends(verify_token),
     page: int = Query(1, ge=1, description="当前页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页条数"),
+    mode: str = Query(
+        "page",
+        pattern="^(page|cursor)$",
+        description="分页方式：page 按页码，cursor 按游标（页数多时更快）",
+    ),
+    cursor: Optional[str] = Query(None, description="cursor 模式下上一页返回的 next_cursor"),
+    count: Optional[str] = Query(
+        None,
+        pattern="^(exact|cached|estimated|none)$",
+        description="总数获取方式，page 模式默认 exact，cursor 模式默认 none",
+    ),
 ):
     """获取聊天历史"""
 
-    print(f"用户 ID: {user_id}")
-
     try:
-        result = get_sessions_paginated(user_id, page, page_size)
-
-        print(f"---获取历史记录成功，{result}----")
+        if mode == "cursor":
+            items, next_cursor, total = await list_sessions_after(
+                user_id, page_size, cursor, count or "none"
+            )
+            logger.debug(
+                "获取会话列表: user_id={}, cursor={}, count={}", user_id, cursor, len(items)
+            )
+            return {
+                "code": 200,
+                "message": "获取成功",
+                "data": {
+                    "items": items,
+                    "total": total,
+                    "page_size": page_size,
+                    "next_cursor": next_cursor,
+                },
+            }
+
+        items, total = await list_sessions_by_page(
+            user_id, page, page_size, count or "exact"
+        )
+
+        logger.debug(
+            "获取会话列表: user_id={}, page={}, count={}", user_id, page, len(items)
+        )
 
         # RestFul API
         return {
             "code": 200,
             "message": "获取成功",
             "data": {
-                "items": result.data,  # 具体的会话列表
-                "total": result.count,  # 总条数
+                "items": items,  # 具体的会话列表
+                "total": total,  # 总条数
                 "page": page,
                 "page_size": page_size,
             },
         }
+    except ValueError as e:
+        return {"code": 400, "message": str(e), "data": None}
     except Exception as e:
         return {
             "code": 500,
@@ -64,7 +97,7 @@ async def create_new_session(
         title = await generate_title(data.content)
 
         # 1. 创建 Session 记录
-        session_res = create_session(user_id, title)
+        session_res = await create_session(user_id, title)
 
         if not session_res.data:
             return {"code": 500, "message": "创建会话记录失败", "data": None}
@@ -89,16 +122,10 @@ async def create_new_session(
 @router.delete("/delete-session")
 async def delete_session(session_id: int, user_id: int = Depends(verify_token)):
     try:
-        if not check_session_owner(session_id, user_id):
+        # 归属校验、删除消息和删除会话在同一个事务中完成
+        if not await delete_session_owned(session_id, user_id):
             return {"code": 403, "message": "无权访问此会话", "data": None}
 
-        deleted_session = delete_session_service(session_id)
-
-        deleted_messages = delete_messages(session_id)
-
-        if deleted_session and deleted_messages:
-            return {"code": 200, "message": "会话删除成功", "data": None}
-
-        return {"code": 500, "message": "会话删除失败", "data": None}
+        return {"code": 200, "message": "会话删除成功", "data": None}
     except Exception as e:
         return {"code": 500, "message": f"服务器内部错误: {str(e)}", "data": None}
@@ -3,6 +3,7 @@
 """
 from fastapi import APIRouter
 from app.tools.tool_metadata import get_all_tools_metadata
+from app.tools.cache import tool_cache_stats
 
 router = APIRouter(prefix="/api/tools", tags=["工具"])
 
@@ -20,3 +21,15 @@ async def get_tools_metadata():
         "data": get_all_tools_metadata()
     }
 
+
+@router.get("/cache")
+async def get_tools_cache_stats():
+    """
+    获取工具结果缓存的统计信息
+
+    返回每个缓存工具的 TTL、容量、当前条目数和命中/未命中次数
+    """
+    return {
+        "success": True,
+        "data": tool_cache_stats()
+    }
@@ -0,0 +1,51 @@
+"""
+键集分页游标
+
+游标是最后一行 (created_at, id) 的 base64 编码，对前端不透明。
+下一页的查询条件为 (created_at, id) 大于（或小于）游标，可以走 (..., created_at) 索引，
+不像 offset 分页那样需要先扫描并跳过前面的所有行。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(row: dict) -> str:
+    """把一行的 (created_at, id) 编码为游标"""
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    解析游标
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        # 游标会拼进查询条件，只接受合法的时间戳
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except Exception:
+        raise ValueError("无效的游标")
+
+
+def keyset_filter(after: Tuple[str, int], desc: bool = False) -> str:
+    """
+    生成 PostgREST or 过滤条件：(created_at, id) 排在游标之后的行
+
+    Args:
+        after: decode_cursor 的结果
+        desc: 是否按时间倒序
+    """
+    created_at, row_id = after
+    op = "lt" if desc else "gt"
+    return (
+        f'created_at.{op}."{created_at}",'
+        f'and(created_at.eq."{created_at}",id.{op}.{row_id})'
+    )
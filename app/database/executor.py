@@ -0,0 +1,64 @@
+"""
+数据库查询执行器
+
+supabase-py 的同步客户端在请求期间会阻塞当前线程，直接在 async 处理函数里调用
+会卡住整个事件循环（所有 WebSocket 流都会停顿）。这里把查询放到一个有界线程池中执行，
+对外提供 async 接口，并按查询名称记录耗时直方图。
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from app.utils.metrics import histogram
+from app.utils.tracing import tracer
+
+load_dotenv()
+
+# 线程池大小：同时进行的 Supabase 查询上限
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="supabase")
+
+db_query_seconds = histogram(
+    "db_query_seconds", "Supabase 查询耗时（秒）", labelnames=("query",)
+)
+
+
+def db_query(name: str):
+    """
+    把同步的 Supabase 查询函数包装为 async 函数
+
+    函数体在线程池中执行（保留调用方的 contextvars），并记录到 db_query_seconds 和 db.<name> span。
+
+        @db_query("messages.insert")
+        def save_message(...):
+            return supabase.table("messages").insert(...).execute()
+
+        await save_message(...)
+
+    Args:
+        name: 查询名称，作为直方图的 query 标签
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, func, *args, **kwargs)
+            with db_query_seconds.time(query=name), tracer.span(f"db.{name}"):
+                return await loop.run_in_executor(_executor, call)
+
+        return wrapper
+
+    return decorator
+
+
+def shutdown_executor():
+    """关闭线程池（应用关闭时调用），等待正在执行的查询完成"""
+    _executor.shutdown(wait=True)
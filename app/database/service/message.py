@@ -1,7 +1,13 @@
+from typing import AsyncIterator, Optional, Tuple
+
 from app.database.client import supabase
+from app.database.cursor import decode_cursor, encode_cursor, keyset_filter
+from app.database.executor import db_query
+from app.database.service.session import session_owner_cache
 
 
 # 插入一条新消息
+@db_query("messages.insert")
 def save_message(session_id: int, role: str, content: str):
     """插入一条消息"""
     return (
@@ -11,7 +17,20 @@ def save_message(session_id: int, role: str, content: str):
     )
 
 
+# 批量插入消息（一次请求写入多行）
+@db_query("messages.insert_batch")
+def save_messages(rows: list):
+    """
+    批量插入消息
+
+    Args:
+        rows: [{"session_id", "role", "content", "created_at"}, ...]，按写入顺序排列
+    """
+    return supabase.table("messages").insert(rows).execute()
+
+
 # 获取历史聊天记录
+@db_query("messages.select")
 def get_messages(session_id: int):
     return (
         supabase.table("messages")
@@ -23,5 +42,158 @@ def get_messages(session_id: int):
 
 
 # 删除session_id的所有消息
+@db_query("messages.delete")
 def delete_messages(session_id: int):
     return supabase.table("messages").delete().eq("session_id", session_id).execute()
+
+
+@db_query("messages.select_owned")
+def _select_owned_messages(session_id: int, user_id: str):
+    # 通过 sessions -> messages 的外键嵌入查询，同时完成归属校验和消息读取
+    res = (
+        supabase.table("sessions")
+        .select("id, messages(*)")
+        .eq("id", session_id)
+        .eq("user_id", user_id)
+        .order("created_at", desc=False, reference_table="messages")
+        .execute()
+    )
+    return res.data[0]["messages"] if res.data else None
+
+
+async def get_owned_messages(session_id: int, user_id: str) -> Optional[list]:
+    """
+    获取属于该用户的会话的全部消息（一次数据库调用）
+
+    Returns:
+        按时间排序的消息列表；会话不存在或不属于该用户时返回 None
+    """
+    owner = session_owner_cache.get(session_id)
+    if owner is not None and owner != str(user_id):
+        # 已知不属于该用户，不需要访问数据库
+        return None
+
+    messages = await _select_owned_messages(session_id, user_id)
+    if messages is not None:
+        session_owner_cache.put(session_id, user_id)
+    return messages
+
+
+# 分页查询可以选择的列；id 和 created_at 用作游标，始终返回
+MESSAGE_COLUMNS = ("id", "session_id", "role", "content", "created_at")
+DEFAULT_MESSAGE_COLUMNS = ("id", "role", "content", "created_at")
+
+
+def parse_message_columns(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    解析 fields 参数（逗号分隔的列名）
+
+    Raises:
+        ValueError: 包含不支持的列
+    """
+    if not fields:
+        return DEFAULT_MESSAGE_COLUMNS
+    columns = [column.strip() for column in fields.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in MESSAGE_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+    for column in ("id", "created_at"):
+        if column not in columns:
+            columns.append(column)
+    return tuple(columns)
+
+
+@db_query("messages.select_page_owned")
+def _select_owned_messages_page(
+    session_id: int,
+    user_id: str,
+    limit: int,
+    after: Optional[Tuple[str, int]],
+    columns: Tuple[str, ...],
+):
+    query = (
+        supabase.table("sessions")
+        .select(f"id, messages({','.join(columns)})")
+        .eq("id", session_id)
+        .eq("user_id", user_id)
+    )
+    if after is not None:
+        # 键集分页：(created_at, id) 大于游标的消息
+        query = query.or_(keyset_filter(after), reference_table="messages")
+    res = (
+        query.order("created_at", desc=False, reference_table="messages")
+        .order("id", desc=False, reference_table="messages")
+        .limit(limit, reference_table="messages")
+        .execute()
+    )
+    return res.data[0]["messages"] if res.data else None
+
+
+async def get_owned_messages_page(
+    session_id: int,
+    user_id: str,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    columns: Tuple[str, ...] = DEFAULT_MESSAGE_COLUMNS,
+) -> Optional[Tuple[list, Optional[str]]]:
+    """
+    按时间顺序分页获取属于该用户的会话消息（一次数据库调用）
+
+    Args:
+        session_id: 会话 ID
+        user_id: 用户 ID
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor，为空从第一条开始
+        columns: 返回的列（parse_message_columns 的结果）
+
+    Returns:
+        (消息列表, next_cursor)，没有更多消息时 next_cursor 为 None；
+        会话不存在或不属于该用户时返回 None
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    after = decode_cursor(cursor) if cursor else None
+
+    owner = session_owner_cache.get(session_id)
+    if owner is not None and owner != str(user_id):
+        return None
+
+    messages = await _select_owned_messages_page(
+        session_id, user_id, limit, after, columns
+    )
+    if messages is None:
+        return None
+    session_owner_cache.put(session_id, user_id)
+
+    next_cursor = encode_cursor(messages[-1]) if len(messages) == limit else None
+    return messages, next_cursor
+
+
+async def iter_owned_messages(
+    session_id: int,
+    user_id: str,
+    page_size: int = 200,
+    columns: Tuple[str, ...] = DEFAULT_MESSAGE_COLUMNS,
+    first_page: Optional[Tuple[list, Optional[str]]] = None,
+) -> AsyncIterator[dict]:
+    """
+    逐页读取会话的全部消息并逐条产出，内存中最多只有一页
+
+    Args:
+        first_page: 已经查询过的第一页（调用方先用它校验归属），为空时从头查询
+    """
+    page = first_page
+    if page is None:
+        page = await get_owned_messages_page(
+            session_id, user_id, page_size, None, columns
+        )
+    while page is not None:
+        messages, next_cursor = page
+        for message in messages:
+            yield message
+        if next_cursor is None:
+            return
+        page = await get_owned_messages_page(
+            session_id, user_id, page_size, next_cursor, columns
+        )
@@ -1,8 +1,118 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
 from app.database.client import supabase
+from app.database.cursor import decode_cursor, encode_cursor, keyset_filter
+from app.database.executor import db_query
+from app.utils.metrics import counter
+
+load_dotenv()
+
+# 会话归属缓存的条目上限
+SESSION_OWNER_CACHE_SIZE = int(os.getenv("SESSION_OWNER_CACHE_SIZE", "50000"))
+# 用户会话总数缓存的条目上限和有效期（秒）
+SESSION_COUNT_CACHE_SIZE = int(os.getenv("SESSION_COUNT_CACHE_SIZE", "10000"))
+SESSION_COUNT_CACHE_TTL = float(os.getenv("SESSION_COUNT_CACHE_TTL", "60"))
+
+# 会话总数的获取方式：
+# exact - 精确计数（扫描该用户的全部会话）
+# cached - 优先使用缓存的精确计数，过期后重新计数
+# estimated - PostgREST 估算（行数较多时使用查询计划的估计值）
+# none - 不返回总数
+COUNT_MODES = ("exact", "cached", "estimated", "none")
+
+session_owner_cache_total = counter(
+    "session_owner_cache_total", "会话归属缓存请求数（outcome: hit/miss）", ("outcome",)
+)
+
+
+class SessionOwnerCache:
+    """
+    会话归属缓存：session_id -> 所属用户 ID
+
+    会话的所属用户创建后不会改变，所以只要会话存在，缓存就不会过期；
+    create_session 写入、delete_session_owned 移除，命中时鉴权不需要查询数据库。
+    只在事件循环中访问，不需要加锁。
+    """
+
+    def __init__(self, maxsize: int = SESSION_OWNER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._owners: "OrderedDict[int, str]" = OrderedDict()
+
+    def get(self, session_id: int) -> Optional[str]:
+        owner = self._owners.get(session_id)
+        if owner is not None:
+            self._owners.move_to_end(session_id)
+        return owner
+
+    def put(self, session_id: int, user_id):
+        self._owners[session_id] = str(user_id)
+        self._owners.move_to_end(session_id)
+        while len(self._owners) > self.maxsize:
+            self._owners.popitem(last=False)
+
+    def invalidate(self, session_id: int):
+        self._owners.pop(session_id, None)
+
+    def clear(self):
+        self._owners.clear()
+
+
+class SessionCountCache:
+    """
+    用户会话总数缓存：user_id -> (总数, 过期时间)
+
+    本进程内创建、删除会话时直接加减，其他 worker 的修改在过期后体现
+    """
+
+    def __init__(
+        self, maxsize: int = SESSION_COUNT_CACHE_SIZE, ttl: float = SESSION_COUNT_CACHE_TTL
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._counts: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def get(self, user_id) -> Optional[int]:
+        entry = self._counts.get(str(user_id))
+        if entry is None:
+            return None
+        count, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._counts[str(user_id)]
+            return None
+        self._counts.move_to_end(str(user_id))
+        return count
+
+    def put(self, user_id, count: int):
+        self._counts[str(user_id)] = (count, time.monotonic() + self.ttl)
+        self._counts.move_to_end(str(user_id))
+        while len(self._counts) > self.maxsize:
+            self._counts.popitem(last=False)
+
+    def adjust(self, user_id, delta: int):
+        entry = self._counts.get(str(user_id))
+        if entry is not None:
+            self._counts[str(user_id)] = (max(entry[0] + delta, 0), entry[1])
+
+    def clear(self):
+        self._counts.clear()
+
+
+# 创建全局实例
+session_owner_cache = SessionOwnerCache()
+session_count_cache = SessionCountCache()
 
 
 # 分页查询用户的会话历史
-def get_sessions_paginated(user_id: str, page: int = 1, page_size: int = 10):
+@db_query("sessions.select_page")
+def get_sessions_paginated(
+    user_id: str, page: int = 1, page_size: int = 10, count: Optional[str] = "exact"
+):
     # 计算分页的起始和结束索引
     # 例如：page=1, page_size=10 -> range(0, 9)
     #      page=2, page_size=10 -> range(10, 19)
@@ -12,7 +122,7 @@ def get_sessions_paginated(user_id: str, page: int = 1, page_size: int = 10):
     return (
         supabase.table("sessions")
         .select(
-            "*", count="exact"
+            "*", count=count
         )  # count="exact" 可以返回总共有多少条数据，方便前端做分页器
         .eq("user_id", user_id)
         .order("created_at", desc=True)
@@ -21,7 +131,111 @@ def get_sessions_paginated(user_id: str, page: int = 1, page_size: int = 10):
     )
 
 
-def create_session(user_id: int, title: str):
+async def list_sessions_by_page(
+    user_id: str, page: int = 1, page_size: int = 10, count: str = "exact"
+) -> Tuple[List[dict], Optional[int]]:
+    """
+    按页码分页获取会话（offset 分页，越往后的页越慢）
+
+    Args:
+        count: 总数的获取方式，见 COUNT_MODES
+
+    Returns:
+        (会话列表, 总数)，count="none" 时总数为 None
+    """
+    cached = session_count_cache.get(user_id) if count == "cached" else None
+    if cached is not None or count == "none":
+        res = await get_sessions_paginated(user_id, page, page_size, None)
+        return res.data, cached
+
+    query_count = "estimated" if count == "estimated" else "exact"
+    res = await get_sessions_paginated(user_id, page, page_size, query_count)
+    if query_count == "exact" and res.count is not None:
+        session_count_cache.put(user_id, res.count)
+    return res.data, res.count
+
+
+@db_query("sessions.select_after")
+def _select_sessions_after(
+    user_id: str, limit: int, after: Optional[Tuple[str, int]]
+):
+    query = supabase.table("sessions").select("*").eq("user_id", user_id)
+    if after is not None:
+        # 键集分页：(created_at, id) 小于游标的会话，配合 (user_id, created_at desc, id desc) 索引
+        # 每页只读取 limit 行，与历史会话的数量无关
+        query = query.or_(keyset_filter(after, desc=True))
+    return (
+        query.order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit)
+        .execute()
+        .data
+    )
+
+
+@db_query("sessions.count")
+def _count_sessions(user_id: str, count: str):
+    return (
+        supabase.table("sessions")
+        .select("id", count=count, head=True)
+        .eq("user_id", user_id)
+        .execute()
+        .count
+    )
+
+
+async def count_sessions(user_id: str, count: str = "cached") -> Optional[int]:
+    """
+    获取用户的会话总数
+
+    Args:
+        count: 获取方式，见 COUNT_MODES
+
+    Returns:
+        会话总数，count="none" 时为 None
+    """
+    if count == "none":
+        return None
+    if count == "cached":
+        cached = session_count_cache.get(user_id)
+        if cached is not None:
+            return cached
+    if count == "estimated":
+        return await _count_sessions(user_id, "estimated")
+
+    total = await _count_sessions(user_id, "exact")
+    if total is not None:
+        session_count_cache.put(user_id, total)
+    return total
+
+
+async def list_sessions_after(
+    user_id: str, limit: int = 10, cursor: Optional[str] = None, count: str = "none"
+) -> Tuple[List[dict], Optional[str], Optional[int]]:
+    """
+    按创建时间倒序分页获取会话（游标分页）
+
+    Args:
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor，为空从最新的会话开始
+        count: 总数的获取方式，见 COUNT_MODES；需要总数时与分页查询并发执行
+
+    Returns:
+        (会话列表, next_cursor, 总数)，没有更多会话时 next_cursor 为 None
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    after = decode_cursor(cursor) if cursor else None
+    sessions, total = await asyncio.gather(
+        _select_sessions_after(user_id, limit, after), count_sessions(user_id, count)
+    )
+    next_cursor = encode_cursor(sessions[-1]) if len(sessions) == limit else None
+    return sessions, next_cursor, total
+
+
+@db_query("sessions.insert")
+def _insert_session(user_id: int, title: str):
     return (
         supabase.table("sessions")
         .insert({"user_id": user_id, "title": title})
@@ -29,6 +243,16 @@ def create_session(user_id: int, title: str):
     )
 
 
+async def create_session(user_id: int, title: str):
+    """创建会话，并记录会话归属"""
+    res = await _insert_session(user_id, title)
+    for row in res.data or []:
+        session_owner_cache.put(row["id"], row.get("user_id", user_id))
+    session_count_cache.adjust(user_id, len(res.data or []))
+    return res
+
+
+@db_query("sessions.update_title")
 def update_session_title(session_id: int, title: str):
     """更新会话标题"""
     return (
@@ -39,20 +263,65 @@ def update_session_title(session_id: int, title: str):
     )
 
 
-def check_session_owner(session_id: int, user_id: str):
-    """检查会话是否属于用户"""
+@db_query("sessions.select_owner")
+def _select_session_owner(session_id: int):
     res = (
         supabase.table("sessions")
-        .select("id")
+        .select("user_id")
         .eq("id", session_id)
-        .eq("user_id", user_id)
         .execute()
     )
-    return len(res.data) > 0
+    return res.data[0]["user_id"] if res.data else None
+
+
+async def check_session_owner(session_id: int, user_id: str) -> bool:
+    """检查会话是否属于用户（优先使用缓存）"""
+    owner = session_owner_cache.get(session_id)
+    if owner is not None:
+        session_owner_cache_total.inc(outcome="hit")
+        return owner == str(user_id)
+
+    session_owner_cache_total.inc(outcome="miss")
+    owner = await _select_session_owner(session_id)
+    if owner is None:
+        # 会话不存在
+        return False
+    session_owner_cache.put(session_id, owner)
+    return str(owner) == str(user_id)
+
+
+@db_query("sessions.delete_owned")
+def _delete_session_owned(session_id: int, user_id: str):
+    # 事务中校验归属并删除会话及其消息（见 migrations/001_session_ownership.sql）
+    res = supabase.rpc(
+        "delete_session_owned",
+        {"p_session_id": session_id, "p_user_id": str(user_id)},
+    ).execute()
+
+    return len(res.data or []) > 0
+
 
+async def delete_session_owned(session_id: int, user_id: str) -> bool:
+    """
+    删除属于该用户的会话及其全部消息（一次数据库调用）
 
-# 删除会话
-def delete_session_service(session_id: int):
-    res = supabase.table("sessions").delete().eq("id", session_id).execute()
+    Returns:
+        是否删除成功；会话不存在或不属于该用户时返回 False
+    """
+    owner = session_owner_cache.get(session_id)
+    if owner is not None:
+        session_owner_cache_total.inc(outcome="hit")
+        if owner != str(user_id):
+            # 已知不属于该用户，不需要访问数据库
+            return False
+    else:
+        session_owner_cache_total.inc(outcome="miss")
 
-    return len(res.data) > 0
+    try:
+        deleted = await _delete_session_owned(session_id, user_id)
+        if deleted:
+            session_count_cache.adjust(user_id, -1)
+        return deleted
+    finally:
+        # 删除完成后再移除，避免删除期间的鉴权查询把旧记录重新写入缓存
+        session_owner_cache.invalidate(session_id)
@@ -1,14 +1,4 @@
-import os
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from app.tools import all_tools  # 从统一入口导入
-
-# dotenv
-from dotenv import load_dotenv
-
-load_dotenv()
-
-API_KEY = os.getenv("API_KEY")
+from app.services.agent_registry import agent_registry, DEFAULT_MODEL
 
 
 async def get_agent_response(user_id: str, user_input: str):
@@ -22,16 +12,8 @@ async def get_agent_response(user_id: str, user_input: str):
     Returns:
         Agent 的响应文本
     """
-    # 初始化模型
-    llm = ChatOpenAI(
-        api_key=API_KEY,
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        model="qwen-plus",
-        temperature=0,
-    )
-
-    # 使用 langgraph 的 create_react_agent（新版推荐方式）
-    agent_executor = create_react_agent(llm, all_tools)
+    # 从注册表获取预构建的 Agent（启动时已编译，所有请求共享）
+    agent_executor = agent_registry.get_agent(DEFAULT_MODEL)
 
     # 异步运行（注入用户ID到消息中）
     result = await agent_executor.ainvoke(
@@ -0,0 +1,188 @@
+"""
+Agent 注册表
+
+ReAct Agent 的构建（ChatOpenAI 初始化、工具 schema 转换、LangGraph 图编译）开销不小，
+不应该在每条 WebSocket 消息里重复执行。本模块在 FastAPI 启动时预先构建 Agent，
+按「模型配置 + 工具集 + checkpointer」缓存编译好的图，所有连接共享同一个实例。
+"""
+
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+from langgraph.prebuilt import create_react_agent
+
+from app.tools import all_tools
+from app.services.ambient_context import ambient_prompt
+from app.services.context_window import compact_context
+from app.utils.logger import logger
+from app.utils.metrics import histogram
+
+load_dotenv()
+
+API_KEY = os.getenv("API_KEY")
+
+# OpenAI 兼容接口地址，默认 DashScope；压测时指向本地替身（见 benchmarks/load_test.py）
+DEFAULT_BASE_URL = os.getenv(
+    "LLM_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"
+)
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """模型配置（不可变，可作为注册表的 key）"""
+
+    model: str = "qwen-plus"
+    temperature: float = 0
+    streaming: bool = False
+    base_url: str = DEFAULT_BASE_URL
+    # 允许模型在一步中返回多个工具调用（DashScope 默认关闭）
+    parallel_tool_calls: bool = True
+
+
+agent_build_seconds = histogram(
+    "agent_build_seconds",
+    "Agent 构建耗时（秒，tools: all 全部工具 / subset 工具路由选出的子集，子集在请求中首次使用时构建）",
+    ("streaming", "tools"),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+
+# 流式接口（WebSocket）使用的模型配置
+STREAMING_MODEL = ModelConfig(streaming=True)
+
+# 非流式接口使用的模型配置
+DEFAULT_MODEL = ModelConfig()
+
+
+class AgentRegistry:
+    """
+    编译好的 Agent 缓存
+
+    key 为 (模型配置, 工具名称元组, checkpointer 标识)，
+    相同配置的请求复用同一个编译后的图（LangGraph 编译后的图是无状态的，可以并发使用，
+    会话状态全部保存在 checkpointer 中，由 thread_id 隔离）。
+    """
+
+    def __init__(self):
+        self._agents: Dict[Tuple, object] = {}
+        # 每个 key 的构建耗时（秒），用于观察启动和首次构建的开销
+        self._build_seconds: Dict[Tuple, float] = {}
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _make_key(config: ModelConfig, tools: List, checkpointer) -> Tuple:
+        tool_names = tuple(t.name for t in tools)
+        return (config, tool_names, id(checkpointer) if checkpointer else None)
+
+    def _build(self, config: ModelConfig, tools: List, checkpointer):
+        """构建一个新的 Agent（ChatOpenAI + create_react_agent）"""
+        llm = ChatOpenAI(
+            api_key=API_KEY,
+            base_url=config.base_url,
+            model=config.model,
+            temperature=config.temperature,
+            streaming=config.streaming,
+        )
+        if tools:
+            # 预先绑定工具以传入 parallel_tool_calls，create_react_agent 会复用这次绑定
+            llm = llm.bind_tools(tools, parallel_tool_calls=config.parallel_tool_calls)
+        return create_react_agent(
+            llm,
+            tools,
+            checkpointer=checkpointer,
+            # 每次调用模型前按 token 预算压缩上下文
+            pre_model_hook=compact_context,
+            # 本轮的环境信息（当前时间、用户位置）并入本轮的用户消息，不破坏前缀缓存
+            prompt=ambient_prompt,
+        )
+
+    def get_agent(
+        self,
+        config: ModelConfig = DEFAULT_MODEL,
+        tools: Optional[List] = None,
+        checkpointer=None,
+    ):
+        """
+        获取（必要时构建）编译好的 Agent
+
+        Args:
+            config: 模型配置
+            tools: 工具列表，默认使用 all_tools
+            checkpointer: 会话记忆存储，None 表示无记忆
+
+        Returns:
+            编译后的 LangGraph Agent
+        """
+        tools = all_tools if tools is None else tools
+        key = self._make_key(config, tools, checkpointer)
+
+        agent = self._agents.get(key)
+        if agent is not None:
+            self._hits += 1
+            return agent
+
+        self._misses += 1
+        start = time.perf_counter()
+        agent = self._build(config, tools, checkpointer)
+        elapsed = time.perf_counter() - start
+
+        self._agents[key] = agent
+        self._build_seconds[key] = elapsed
+        agent_build_seconds.observe(
+            elapsed,
+            streaming=str(config.streaming).lower(),
+            tools="all" if len(tools) == len(all_tools) else "subset",
+        )
+        logger.info(
+            "[AgentRegistry] 构建 Agent 完成: model={}, streaming={}, tools={}, 耗时 {:.1f}ms",
+            config.model,
+            config.streaming,
+            len(tools),
+            elapsed * 1000,
+        )
+        return agent
+
+    def warm_up(self, checkpointer=None):
+        """
+        预热：在应用启动时构建常用的 Agent，避免第一条消息承担构建开销
+
+        Args:
+            checkpointer: 流式对话使用的 checkpointer
+        """
+        self.get_agent(STREAMING_MODEL, checkpointer=checkpointer)
+        self.get_agent(DEFAULT_MODEL)
+
+    def clear(self):
+        """清空缓存（配置变更或测试时使用）"""
+        self._agents.clear()
+        self._build_seconds.clear()
+
+    def stats(self) -> dict:
+        """
+        获取注册表统计信息
+
+        Returns:
+            包含已构建 Agent 数量、命中/未命中次数和每个 Agent 构建耗时的字典
+        """
+        return {
+            "agents": len(self._agents),
+            "hits": self._hits,
+            "misses": self._misses,
+            "builds": [
+                {
+                    **asdict(key[0]),
+                    "tools": len(key[1]),
+                    "checkpointer": key[2] is not None,
+                    "build_seconds": seconds,
+                }
+                for key, seconds in self._build_seconds.items()
+            ],
+        }
+
+
+# 创建全局实例
+agent_registry = AgentRegistry()
@@ -16,22 +16,26 @@ from langchain_core.messages.human import HumanMessage  # 用户的消息类型
 from app.database.service.message import get_messages
 
 # Python 标准库
-import os  # 用于读取环境变量
-import asyncio  # 异步编程支持，用于并发处理和延迟控制
+import asyncio  # 用于处理对话任务被取消的情况
+import time  # 统计整轮耗时
+import uuid  # 快速通道中工具调用的 run_id
 
-# 1.0.5 版本正确导入 InMemorySaver
-from langgraph.checkpoint.memory import InMemorySaver
+# 工具路由：按用户输入选出本轮使用的工具子集，减少每次模型调用携带的 schema
+from app.services.tool_router import tool_router
 
+# 意图快速通道：账单、通知、天气等常见请求直接调用工具，不经过 ReAct 循环
+from app.services.intent_fast_path import IntentMatch, intent_fast_path
 
-# LangChain OpenAI 集成，用于调用兼容 OpenAI API 的大语言模型
-from langchain_openai import ChatOpenAI
+# 环境上下文：当前时间、时区、用户位置，省掉调用 get_time 的一步
+from app.services.ambient_context import AMBIENT_CONFIG_KEY, ambient_context
+
+# 会话记忆存储（memory / sqlite / postgres，由配置决定）
+from app.database.checkpointer import get_checkpointer, touch_thread
 
-# LangGraph 提供的预置 ReAct Agent 创建函数
-# ReAct = Reasoning + Acting，一种让 LLM 能够思考并调用工具的 Agent 架构
-from langgraph.prebuilt import create_react_agent
 
-# 导入所有可用的工具列表（如天气查询、账单查询等）
-from app.tools import all_tools
+# Agent 注册表：启动时预先构建 ReAct Agent，所有连接共享
+# ReAct = Reasoning + Acting，一种让 LLM 能够思考并调用工具的 Agent 架构
+from app.services.agent_registry import agent_registry, STREAMING_MODEL, DEFAULT_MODEL
 
 # WebSocket 连接管理器，用于向客户端发送消息
 from app.websocket.manager import manager
@@ -39,21 +43,137 @@ from app.websocket.manager import manager
 # 加载 .env 文件中的环境变量
 from dotenv import load_dotenv
 
-# 保存消息到数据库的服务函数
-from app.database.service.message import save_message
+# 消息写入队列，后台批量保存到数据库
+from app.services.message_writer import message_writer
 
 # 工具元数据，用于获取工具的展示名称、图标、描述等信息
 from app.tools.tool_metadata import get_tool_display_info, get_all_tools_metadata
 
+# 请求上下文：让工具知道当前轮次属于哪个用户和会话（如文生图完成后推送结果）
+from app.utils.context import set_request_session
+
+# 工具执行限制：每轮对话的工具调用时间预算
+from app.tools.execution import start_turn_deadline
+
+# 链路追踪：记录首个 token、LLM 调用、工具调用等环节的耗时
+from app.utils.tracing import tracer
+
+# 指标：按结果统计对话轮次
+from app.utils.metrics import counter
+
+# 日志
+from app.utils.logger import logger
+
 # 加载环境变量（从 .env 文件读取配置）
 load_dotenv()
 
+# astream_events 只订阅用到的事件：模型（调用开始/结束、文本片段）和工具（调用开始/结束）
+# v2 由回调直接生成事件，不像 v1 那样基于 astream_log 为图中每个 runnable 记录并复制完整的输入输出；
+# include_types 让节点、路由、pre_model_hook 等其他 runnable 的事件在回调中就被丢弃
+# 对比见 benchmarks/event_stream.py
+STREAM_EVENTS_VERSION = "v2"
+STREAM_EVENT_TYPES = ["chat_model", "tool"]
+
+chat_turns_total = counter(
+    "chat_turns_total", "对话轮次数（outcome: completed/cancelled/error）", ("outcome",)
+)
+
+
+async def _send_tool_calling(user_id: str, session_id: int, tool_name: str, run_id: str):
+    """通知客户端开始调用工具"""
+    # 获取工具的元数据（展示名称、描述、图标、分类等）
+    tool_info = get_tool_display_info(tool_name)
+    await manager.send_status(
+        user_id,
+        "tool_calling",  # 状态类型：正在调用工具
+        {
+            "tool": tool_name,  # 工具的内部名称
+            "run_id": run_id,  # 本次调用的 ID，与 tool_completed 对应
+            "display_name": tool_info["display_name"],  # 工具的展示名称
+            "message": tool_info["description"],  # 工具的描述
+            "icon": tool_info["icon"],  # 工具的图标
+            "category": tool_info["category"],  # 工具的分类
+        },
+        session_id=session_id,
+    )
+
 
-# 从环境变量获取 API 密钥（用于调用大语言模型）
-API_KEY = os.getenv("API_KEY")
+async def _send_tool_completed(
+    user_id: str, session_id: int, tool_name: str, run_id: str, duration_ms
+):
+    """通知客户端工具调用完成"""
+    tool_info = get_tool_display_info(tool_name)
+    await manager.send_status(
+        user_id,
+        "tool_completed",  # 状态类型：工具执行完成
+        {
+            "tool": tool_name,  # 工具的内部名称
+            "run_id": run_id,  # 本次调用的 ID
+            "duration_ms": duration_ms,  # 执行耗时（毫秒）
+            "display_name": tool_info["display_name"],  # 工具的展示名称
+            "message": f"{tool_info['display_name']}执行完成",  # 完成提示消息
+            "icon": tool_info["icon"],  # 工具的图标
+            "category": tool_info["category"],  # 工具的分类
+        },
+        session_id=session_id,
+    )
 
 
-checkpointer = InMemorySaver()
+async def _run_fast_path(
+    user_id: str,
+    session_id: int,
+    match: IntentMatch,
+    user_input: str,
+    current_message: HumanMessage,
+    thread_id: str,
+    emit,
+    run_spans: dict,
+) -> bool:
+    """
+    意图快速通道：直接调用工具，再单次流式生成回答，最后把本轮写回会话记忆
+
+    Returns:
+        是否已完成回答；工具调用失败时返回 False，由 Agent 重新处理
+    """
+    tool_name = match.intent.tool_name
+    run_id = f"fast-{uuid.uuid4().hex}"
+
+    # 与 Agent 调用工具时一样发送状态和记录 span
+    run_spans[run_id] = tracer.start_span(f"tool.{tool_name}")
+    await _send_tool_calling(user_id, session_id, tool_name, run_id)
+    tool_result = await intent_fast_path.call_tool(match)
+    span = run_spans.pop(run_id)
+    span.end()
+    await _send_tool_completed(
+        user_id, session_id, tool_name, run_id, round(span.duration_seconds * 1000)
+    )
+    if tool_result is None:
+        return False
+
+    answer = ""
+    answer_run_id = f"fast-{uuid.uuid4().hex}"
+    run_spans[answer_run_id] = tracer.start_span("llm.call")
+    async for content in intent_fast_path.answer_stream(
+        match, get_tool_display_info(tool_name)["display_name"], user_input, tool_result
+    ):
+        answer += content
+        await emit(content)
+    run_spans.pop(answer_run_id).end()
+
+    # 以 agent 节点的身份把本轮消息写入会话记忆，后续追问能看到工具结果
+    # 顶层图运行时会忽略 checkpoint_ns（记忆实际保存在空命名空间），
+    # 而 aupdate_state 会把非空的 checkpoint_ns 当作子图查找，所以这里只传 thread_id
+    try:
+        agent_executor = agent_registry.get_agent(STREAMING_MODEL, checkpointer=get_checkpointer())
+        await agent_executor.aupdate_state(
+            {"configurable": {"thread_id": thread_id}},
+            {"messages": intent_fast_path.turn_messages(match, current_message, tool_result, answer)},
+            as_node="agent",
+        )
+    except Exception as e:
+        logger.warning("[IntentFastPath] 写入会话记忆失败: {}", e)
+    return True
+
 
 async def get_agent_response_stream(user_id: str, session_id: int, user_input: str):
     """
@@ -61,7 +181,7 @@ async def get_agent_response_stream(user_id: str, session_id: int, user_input: s
 
     这是核心的流式响应函数，它会：
     1. 加载历史对话记录
-    2. 创建 AI Agent 并开始处理用户输入
+    2. 获取预构建的 AI Agent 并开始处理用户输入
     3. 实时通过 WebSocket 发送：思考状态、工具调用状态、生成的文本片段
     4. 完成后保存对话到数据库
 
@@ -70,10 +190,41 @@ async def get_agent_response_stream(user_id: str, session_id: int, user_input: s
         session_id: 会话 ID，用于加载和保存对话历史
         user_input: 用户输入的文本内容
     """
+    # 用于累积完整的 AI 响应文本（被取消时保存已生成的部分）
+    full_response = ""
+
+    # 本轮对话在独立任务中执行，设置的上下文只对本轮的工具调用可见
+    set_request_session(user_id, session_id)
+    start_turn_deadline()
+
+    # 整轮对话的 span，本轮中的 LLM 调用、工具调用、数据库查询、WebSocket 发送都是它的子 span
+    turn_span = tracer.start_span("chat.turn", user_id=user_id, session_id=session_id)
+    trace_token = tracer.attach(turn_span)
+    # 进行中的 LLM / 工具调用的 span：{run_id: Span}
+    # 同一步的多个工具调用并发执行，用 run_id 区分
+    run_spans = {}
+    first_token = True
+    turn_start = time.perf_counter()
+
+    async def emit(content: str):
+        """累积并发送一个文本片段（Agent 和快速通道共用）"""
+        nonlocal full_response, first_token
+        if first_token:
+            # 首个 token 耗时：从本轮开始到第一个文本片段
+            first_token = False
+            tracer.start_span("llm.first_token", start_ns=turn_span.start_ns).end()
+        # 累加到完整响应中
+        full_response += content
+        # 通过 WebSocket 发送文本片段给客户端，is_final=False 表示还未结束
+        # 片段会在连接管理器中合并发送，客户端处理不过来时这里会等待（背压）
+        await manager.send_text_chunk(user_id, content, is_final=False, session_id=session_id)
+
     try:
         # ============ 第一步：通知客户端开始处理 ============
         # 发送 "thinking" 状态，让前端显示 "正在思考..." 的提示
-        await manager.send_status(user_id, "thinking", {"message": "正在思考..."})
+        await manager.send_status(
+            user_id, "thinking", {"message": "正在思考..."}, session_id=session_id
+        )
 
         # ============ 第二步：加载历史对话记录 ============
         # 初始化历史消息列表，用于存储转换后的 LangChain 消息对象
@@ -111,151 +262,170 @@ async def get_agent_response_stream(user_id: str, session_id: int, user_input: s
         # 将历史消息和当前消息合并，形成完整的对话上下文
         input_message = current_message
 
-        # ============ 第四步：初始化大语言模型 ============
-        # 创建 ChatOpenAI 实例，配置模型参数
-        llm = ChatOpenAI(
-            api_key=API_KEY,  # API 密钥，用于认证
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",  # 阿里云通义千问的兼容接口地址
-            model="qwen-plus",  # 使用的模型名称（通义千问 Plus 版本）
-            temperature=0,  # 温度参数设为 0，使输出更加确定性（减少随机性）
-            streaming=True,  # 启用流式输出，允许逐字符接收响应
-        )
+        # 会话唯一标识：用户ID+会话ID，确保记忆隔离
+        thread_id = f"{user_id}_{session_id}"
 
-        # ============ 第五步：创建 ReAct Agent ============
-        # 使用 LangGraph 的 create_react_agent 创建具有工具调用能力的 Agent
-        # Agent 可以根据用户请求，自主决定是否调用工具，以及调用哪些工具
-        agent_executor = create_react_agent(llm, all_tools, checkpointer=checkpointer)
-
-        # ============ 第六步：配置运行参数 ============
+        # ============ 第四步：配置运行参数 ============
         # 配置字典，用于控制 Agent 的运行行为
+        # 记录活跃时间，长期不活跃的会话记忆会被自动清理
+        await touch_thread(thread_id)
+
         config = {
             "recursion_limit": 50,  # 递归限制：防止 Agent 陷入无限循环调用工具
             "configurable": {
-                # 会话唯一标识：用户ID+会话ID，确保记忆隔离
-                "thread_id": f"{user_id}_{session_id}",
+                "thread_id": thread_id,
                 # 命名空间：隔离不同业务场景的记忆
                 "checkpoint_ns": "agent_stream_service"
             }
         }
 
-        # ============ 第七步：流式运行 Agent 并处理事件 ============
-        # 用于累积完整的 AI 响应文本
-        full_response = ""
-
-        # 使用 astream_events 异步迭代 Agent 产生的所有事件
-        # 这是流式处理的核心，每当有新事件（文本片段、工具调用等）产生时，立即处理
-        async for event in agent_executor.astream_events(
-            {"messages": input_message},  # 输入：包含历史和当前消息的列表
-            version="v1",  # 事件版本，使用 v1 格式
-            config=config,  # 运行配置
-        ):
-            # 获取事件类型
-            kind = event["event"]
-
-            # -------- 事件处理：LLM 流式输出 --------
-            if kind == "on_chat_model_stream":
-                # 当 LLM 产生新的文本片段时触发
-                # 从事件数据中提取文本内容
-                content = event["data"]["chunk"].content
-
-                # 如果有实际内容（非空）
-                if content:
-                    # 累加到完整响应中
-                    full_response += content
-                    # 通过 WebSocket 发送文本片段给客户端，is_final=False 表示还未结束
-                    await manager.send_text_chunk(user_id, content, is_final=False)
-                    # 短暂延迟 10ms，避免发送过快导致客户端处理不过来
-                    await asyncio.sleep(0.01)
-
-            # -------- 事件处理：工具调用开始 --------
-            elif kind == "on_tool_start":
-                # 当 Agent 开始调用某个工具时触发
-                # 获取正在调用的工具名称
-                tool_name = event["name"]
-                # 获取工具的元数据（展示名称、描述、图标、分类等）
-                tool_info = get_tool_display_info(tool_name)
-                # 通过 WebSocket 发送工具调用状态给客户端
-                await manager.send_status(
-                    user_id,
-                    "tool_calling",  # 状态类型：正在调用工具
-                    {
-                        "tool": tool_name,  # 工具的内部名称
-                        "display_name": tool_info["display_name"],  # 工具的展示名称
-                        "message": tool_info["description"],  # 工具的描述
-                        "icon": tool_info["icon"],  # 工具的图标
-                        "category": tool_info["category"],  # 工具的分类
-                    },
-                )
-
-            # -------- 事件处理：工具调用结束 --------
-            elif kind == "on_tool_end":
-                # 当工具执行完成时触发
-                # 获取已完成的工具名称
-                tool_name = event["name"]
-                # 获取工具的元数据
-                tool_info = get_tool_display_info(tool_name)
-                # 通过 WebSocket 发送工具完成状态给客户端
-                await manager.send_status(
-                    user_id,
-                    "tool_completed",  # 状态类型：工具执行完成
-                    {
-                        "tool": tool_name,  # 工具的内部名称
-                        "display_name": tool_info["display_name"],  # 工具的展示名称
-                        "message": f"{tool_info['display_name']}执行完成",  # 完成提示消息
-                        "icon": tool_info["icon"],  # 工具的图标
-                        "category": tool_info["category"],  # 工具的分类
-                    },
-                )
-
-        # ============ 第八步：发送完成状态 ============
+        # ============ 第五步：常见意图走快速通道 ============
+        # 账单、通知、天气等高置信度意图直接调用工具并单次生成回答，省掉一次 LLM 往返
+        fast_match = intent_fast_path.match(user_input)
+        turn_span.set_attribute("intent", fast_match.intent.name if fast_match else "none")
+        answered = False
+        if fast_match is None:
+            intent_fast_path.record(None, "miss")
+        elif intent_fast_path.enabled:
+            answered = await _run_fast_path(
+                user_id, session_id, fast_match, user_input, current_message, thread_id, emit, run_spans
+            )
+            intent_fast_path.record(fast_match, "hit" if answered else "fallback")
+
+        # ============ 第六步：流式运行 Agent 并处理事件 ============
+        if not answered:
+            # 按用户输入选出相关的工具，没有明显相关的分类时使用全部工具
+            route = tool_router.route(user_input, thread_id)
+            turn_span.set_attribute("tools", len(route.tools))
+            # 从注册表获取编译好的 ReAct Agent（全部工具的 Agent 启动时已预热，
+            # 工具子集的 Agent 第一次使用时构建，之后同样只是一次字典查找）
+            # Agent 可以根据用户请求，自主决定是否调用工具，以及调用哪些工具
+            agent_executor = agent_registry.get_agent(
+                STREAMING_MODEL, tools=route.tools, checkpointer=get_checkpointer()
+            )
+            # 本轮的环境信息通过运行配置传给 Agent 的 prompt，不写入会话记忆
+            config["configurable"][AMBIENT_CONFIG_KEY] = await ambient_context.build(user_id)
+            # Agent 节点的模型调用次数，减 1 即为本轮的工具步数
+            model_calls = 0
+
+            # 使用 astream_events 异步迭代 Agent 产生的模型和工具事件
+            # 这是流式处理的核心，每当有新事件（文本片段、工具调用等）产生时，立即处理
+            async for event in agent_executor.astream_events(
+                {"messages": input_message},  # 输入：包含历史和当前消息的列表
+                version=STREAM_EVENTS_VERSION,  # 事件版本，使用 v2 格式
+                config=config,  # 运行配置
+                include_types=STREAM_EVENT_TYPES,  # 只订阅模型和工具事件
+            ):
+                # 获取事件类型
+                kind = event["event"]
+
+                # -------- 事件处理：LLM 调用开始/结束（只用于统计耗时） --------
+                if kind == "on_chat_model_start":
+                    run_spans[event["run_id"]] = tracer.start_span("llm.call")
+                    # 只统计 Agent 节点的调用（不含 pre_model_hook 中的摘要模型）
+                    if event.get("metadata", {}).get("langgraph_node") == "agent":
+                        route.record_model_call()
+                        model_calls += 1
+
+                elif kind == "on_chat_model_end":
+                    span = run_spans.pop(event["run_id"], None)
+                    if span is not None:
+                        span.end()
+
+                # -------- 事件处理：LLM 流式输出 --------
+                elif kind == "on_chat_model_stream":
+                    # 当 LLM 产生新的文本片段时触发
+                    # 从事件数据中提取文本内容
+                    content = event["data"]["chunk"].content
+
+                    # 如果有实际内容（非空），累加并发送给客户端
+                    if content:
+                        await emit(content)
+
+                # -------- 事件处理：工具调用开始 --------
+                elif kind == "on_tool_start":
+                    # 当 Agent 开始调用某个工具时触发
+                    run_spans[event["run_id"]] = tracer.start_span(f"tool.{event['name']}")
+                    # 通过 WebSocket 发送工具调用状态给客户端
+                    await _send_tool_calling(user_id, session_id, event["name"], event["run_id"])
+
+                # -------- 事件处理：工具调用结束 --------
+                elif kind == "on_tool_end":
+                    # 当工具执行完成时触发
+                    # 计算工具执行耗时（含等待并发名额的时间）
+                    span = run_spans.pop(event["run_id"], None)
+                    duration_ms = None
+                    if span is not None:
+                        span.end()
+                        duration_ms = round(span.duration_seconds * 1000)
+                    # 通过 WebSocket 发送工具完成状态给客户端
+                    await _send_tool_completed(
+                        user_id, session_id, event["name"], event["run_id"], duration_ms
+                    )
+
+            ambient_context.observe_turn(model_calls)
+
+        # ============ 第七步：发送完成状态 ============
         # 发送最终的空文本片段，is_final=True 表示流式输出结束
-        await manager.send_text_chunk(user_id, "", is_final=True)
+        await manager.send_text_chunk(user_id, "", is_final=True, session_id=session_id)
         # 发送 "completed" 状态，通知客户端整个响应已完成
-        await manager.send_status(user_id, "completed", {"message": "回答完成"})
-
-        # ============ 第九步：异步保存消息到数据库 ============
-        # 打印日志，标记开始保存
-        print("---开始保存消息----")
-
-        # 定义内部异步函数，用于保存单条消息到数据库
-        async def _save_to_db(sid, role, content):
-            """
-            异步保存消息到数据库
-
-            Args:
-                sid: 会话 ID
-                role: 消息角色（user 或 assistant）
-                content: 消息内容
-            """
-            try:
-                # 调用数据库服务保存消息
-                # 注意：如果 save_message 是阻塞操作，可以考虑用 loop.run_in_executor 包装
-                save_message(session_id=sid, role=role, content=content)
-            except Exception as e:
-                # 记录保存失败的错误，但不影响主流程
-                print(f"保存消息失败: {e}")
+        await manager.send_status(
+            user_id, "completed", {"message": "回答完成"}, session_id=session_id
+        )
+
+        # ============ 第八步：异步保存消息到数据库 ============
+        logger.debug("保存会话 {} 的消息", session_id)
 
         # 如果有会话 ID，则保存对话记录
         if session_id:
-            # 使用 asyncio.create_task 异步执行保存操作，不阻塞主流程
-            # 保存用户消息
-            asyncio.create_task(_save_to_db(session_id, "user", user_input))
-            # 保存 AI 助手消息
-            asyncio.create_task(_save_to_db(session_id, "assistant", full_response))
+            # 放入写入队列，由后台任务批量写入数据库（不阻塞主流程，失败自动重试）
+            # 同一轮的用户消息和助手消息按入队顺序写入
+            await message_writer.enqueue(session_id, "user", user_input)
+            await message_writer.enqueue(session_id, "assistant", full_response)
+
+        chat_turns_total.inc(outcome="completed")
+        intent_fast_path.observe_turn(
+            "fast" if answered else "agent", fast_match, time.perf_counter() - turn_start
+        )
+
+    # ============ 取消处理 ============
+    except asyncio.CancelledError:
+        # 用户取消或连接断开：停止 LLM 流，通知客户端并保存已生成的部分
+        turn_span.set_attribute("cancelled", True)
+        chat_turns_total.inc(outcome="cancelled")
+        try:
+            await manager.send_text_chunk(
+                user_id, "", is_final=True, session_id=session_id
+            )
+            await manager.send_status(
+                user_id, "cancelled", {"message": "已取消回答"}, session_id=session_id
+            )
+        except Exception:
+            pass
+
+        if session_id:
+            await message_writer.enqueue(session_id, "user", user_input)
+            if full_response:
+                await message_writer.enqueue(session_id, "assistant", full_response)
+        raise
 
     # ============ 异常处理 ============
     except Exception as e:
-        # 导入 traceback 模块获取详细错误堆栈
-        import traceback
-
-        # 格式化完整的错误堆栈信息
-        error_details = traceback.format_exc()
-        # 打印错误摘要
-        print(f"[Agent Stream Error] {e}")
-        # 打印详细错误堆栈
-        print(f"[Agent Stream Error Details]\n{error_details}")
+        turn_span.set_error(e)
+        chat_turns_total.inc(outcome="error")
+        # 记录错误和完整堆栈
+        logger.exception("[Agent Stream Error] {}", e)
         # 通过 WebSocket 向客户端发送错误消息
-        await manager.send_error(user_id, f"处理出错: {str(e)}")
+        await manager.send_error(
+            user_id, f"处理出错: {str(e)}", session_id=session_id
+        )
+
+    finally:
+        # 结束未收到结束事件的 span（取消或出错时）
+        for span in run_spans.values():
+            span.end()
+        tracer.detach(trace_token)
+        turn_span.end()
 
 
 def get_agent_response(user_id: str, user_input: str):
@@ -272,23 +442,13 @@ def get_agent_response(user_id: str, user_input: str):
     Returns:
         str: 完整的 AI 响应文本
     """
-    # 初始化大语言模型（非流式模式）
-    llm = ChatOpenAI(
-        api_key=API_KEY,  # API 密钥
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",  # 阿里云通义千问接口
-        model="qwen-plus",  # 模型名称
-        temperature=0,  # 温度参数，0 表示确定性输出
-        # 注意：这里没有启用 streaming，因为是同步接口
-    )
-
-    # 使用 LangGraph 创建 ReAct Agent
-    agent_executor = create_react_agent(llm, all_tools)
+    # 从注册表获取非流式 Agent（无 checkpointer，一次性问答）
+    agent_executor = agent_registry.get_agent(DEFAULT_MODEL)
 
     # 同步调用 invoke 方法运行 Agent
     # 将用户 ID 和请求内容组合成消息格式
     result = agent_executor.invoke(
-        {"messages": [("user", f"User ID: {user_id}\nRequest: {user_input}")]},
-        checkpointer=checkpointer
+        {"messages": [("user", f"User ID: {user_id}\nRequest: {user_input}")]}
     )
 
     # 从结果中提取最后一条消息的内容（即 AI 的最终回复）
@@ -0,0 +1,227 @@
+"""
+环境上下文
+
+模型只能通过 get_time 工具得知当前时间，而定时邮件（send_scheduled_email）、访客登记（create_visitor）
+等需要计算日期的请求几乎都会先调用它，多出一整步 LLM 往返。这里在每轮对话开始时生成一段环境信息：
+
+- 当前时间（精确到分钟）、星期、时区
+- 用户所在城市（可选，AMBIENT_LOCATION_ENABLED 开启时才解析：与 get_weather 一样按 IP 定位，
+  会把用户 IP 发给第三方接口；按用户缓存，未命中缓存时在后台解析，
+  最多等待 AMBIENT_LOCATION_TIMEOUT，默认不等待，解析好的结果留给下一轮）
+
+通过运行配置 configurable.ambient_context 传给 Agent，由 create_react_agent 的 prompt（ambient_prompt）
+在每次调用模型前并入本轮的用户消息；不写入图状态，历史中不会留下过期的时间。
+环境信息不放在最前面：系统消息、工具 schema 和历史消息组成的前缀保持不变，模型服务的前缀缓存才能命中；
+时间只到分钟，同一分钟内同一轮的多次模型调用完全一致。
+
+效果看 agent_tool_steps{ambient}：每轮中 Agent 因调用工具多走的步数（模型调用次数 - 1），
+对比开启和关闭时的分布即为减少的工具步数。
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from app.tools.api.weather_tools import locate_city
+from app.utils.logger import logger
+from app.utils.metrics import counter, histogram
+
+load_dotenv()
+
+AMBIENT_CONTEXT_ENABLED = os.getenv("AMBIENT_CONTEXT_ENABLED", "true").lower() == "true"
+# 时区（IANA 名称）；系统没有时区数据库时（如未安装 tzdata 的 Windows）按 UTC+8 处理
+AMBIENT_TIMEZONE = os.getenv("AMBIENT_TIMEZONE", "Asia/Shanghai")
+# 用户位置的缓存时间（秒）和数量上限
+AMBIENT_LOCATION_TTL = int(os.getenv("AMBIENT_LOCATION_TTL", "3600"))
+AMBIENT_LOCATION_CACHE_SIZE = int(os.getenv("AMBIENT_LOCATION_CACHE_SIZE", "10000"))
+# 是否在环境信息中带上用户所在城市（按 IP 定位，会请求第三方接口，默认关闭）
+AMBIENT_LOCATION_ENABLED = os.getenv("AMBIENT_LOCATION_ENABLED", "false").lower() == "true"
+# 未命中缓存时最多等待位置解析的时间（秒），默认不等待，避免拖慢冷启动的轮次
+AMBIENT_LOCATION_TIMEOUT = float(os.getenv("AMBIENT_LOCATION_TIMEOUT", "0"))
+# 解析失败后多久再重试（秒），期间不带位置
+AMBIENT_LOCATION_RETRY = 60
+
+# configurable 中环境信息的 key
+AMBIENT_CONFIG_KEY = "ambient_context"
+
+WEEKDAYS = ("星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日")
+
+ambient_location_total = counter(
+    "ambient_location_total",
+    "环境上下文中用户位置的来源（outcome: cached/resolved/pending/failed）",
+    ("outcome",),
+)
+agent_tool_steps = histogram(
+    "agent_tool_steps",
+    "每轮对话中 Agent 因调用工具多走的步数（ambient: on/off）",
+    ("ambient",),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12),
+)
+
+
+def _load_timezone(name: str) -> tzinfo:
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(name)
+    except Exception:
+        logger.warning("[AmbientContext] 找不到时区 {}，按 UTC+8 处理", name)
+        return timezone(timedelta(hours=8), name)
+
+
+class AmbientContext:
+    """每轮对话的环境信息（时间、时区、用户位置）"""
+
+    def __init__(
+        self,
+        enabled: bool = AMBIENT_CONTEXT_ENABLED,
+        location_enabled: bool = AMBIENT_LOCATION_ENABLED,
+        timezone_name: str = AMBIENT_TIMEZONE,
+        location_ttl: float = AMBIENT_LOCATION_TTL,
+        maxsize: int = AMBIENT_LOCATION_CACHE_SIZE,
+        location_timeout: float = AMBIENT_LOCATION_TIMEOUT,
+    ):
+        self.enabled = enabled
+        self.location_enabled = location_enabled
+        self.timezone_name = timezone_name
+        self.tz = _load_timezone(timezone_name)
+        self.location_ttl = location_ttl
+        self.maxsize = maxsize
+        self.location_timeout = location_timeout
+        # user_id -> (城市, 过期时间戳)
+        self._locations: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # 正在解析的位置，同一用户的并发轮次共用一个任务
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def _cached_location(self, user_id: str) -> Optional[str]:
+        entry = self._locations.get(user_id)
+        if entry is None:
+            return None
+        city, expires_at = entry
+        if expires_at <= time.time():
+            del self._locations[user_id]
+            return None
+        self._locations.move_to_end(user_id)
+        return city
+
+    def _put_location(self, user_id: str, city: str, ttl: float):
+        self._locations[user_id] = (city, time.time() + ttl)
+        self._locations.move_to_end(user_id)
+        while len(self._locations) > self.maxsize:
+            self._locations.popitem(last=False)
+
+    async def _resolve_location(self, user_id: str) -> str:
+        try:
+            city = await locate_city()
+        except Exception:
+            # 失败也缓存一小段时间（空字符串），避免每轮都重新请求
+            self._put_location(user_id, "", AMBIENT_LOCATION_RETRY)
+            raise
+        finally:
+            self._pending.pop(user_id, None)
+        self._put_location(user_id, city, self.location_ttl)
+        return city
+
+    async def get_location(self, user_id: str) -> Optional[str]:
+        """
+        获取用户所在城市
+
+        Returns:
+            城市；解析失败或超过等待时间时返回 None（后台任务继续执行，结果留给下一轮）
+        """
+        city = self._cached_location(user_id)
+        if city is not None:
+            ambient_location_total.inc(outcome="cached")
+            return city or None
+
+        # 后台任务继承当前上下文中的请求 token，/api/user/ip 按该用户定位
+        task = self._pending.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._resolve_location(user_id))
+            task.add_done_callback(_log_task_error)
+            self._pending[user_id] = task
+        try:
+            city = await asyncio.wait_for(asyncio.shield(task), self.location_timeout)
+        except asyncio.TimeoutError:
+            ambient_location_total.inc(outcome="pending")
+            return None
+        except Exception as e:
+            ambient_location_total.inc(outcome="failed")
+            logger.warning("[AmbientContext] 获取用户位置失败: {}", e)
+            return None
+        ambient_location_total.inc(outcome="resolved")
+        return city
+
+    def render(self, now: datetime, city: Optional[str] = None) -> str:
+        """生成环境信息文本"""
+        offset = now.strftime("%z")
+        lines = [
+            "以下是本轮对话的环境信息，回答和填写工具参数（如定时发送时间、来访日期）时直接使用，"
+            "不需要再调用 get_time 查询当前时间：",
+            f"- 当前时间：{now.strftime('%Y-%m-%d %H:%M')}（{WEEKDAYS[now.weekday()]}）",
+            f"- 时区：{self.timezone_name}（UTC{offset[:3]}:{offset[3:]}）",
+        ]
+        if city:
+            lines.append(f"- 用户所在城市（按 IP 定位）：{city}")
+        return "\n".join(lines)
+
+    async def build(self, user_id: str) -> Optional[str]:
+        """
+        生成本轮对话的环境信息
+
+        Returns:
+            环境信息文本；未开启时返回 None
+        """
+        if not self.enabled:
+            return None
+        city = await self.get_location(user_id) if self.location_enabled else None
+        return self.render(datetime.now(self.tz), city)
+
+    def observe_turn(self, model_calls: int):
+        """记录一轮对话中 Agent 的工具步数"""
+        if model_calls > 0:
+            agent_tool_steps.observe(model_calls - 1, ambient="on" if self.enabled else "off")
+
+
+def _log_task_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("[AmbientContext] 位置解析任务失败: {}", task.exception())
+
+
+def ambient_prompt(state: dict, config: RunnableConfig) -> list:
+    """
+    create_react_agent 的 prompt：把本轮的环境信息并入最后一条用户消息（本轮的请求）
+
+    在 pre_model_hook（上下文压缩）之后执行，state["messages"] 为压缩后的消息。
+    放在本轮请求处而不是最前面，之前的消息保持不变，模型服务可以复用前缀缓存；
+    并入用户消息而不是另加一条系统消息，部分模型只接受开头的一条系统消息
+    """
+    messages = state["messages"]
+    ambient = (config.get("configurable") or {}).get(AMBIENT_CONFIG_KEY)
+    if not ambient:
+        return messages
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if not isinstance(message, HumanMessage):
+            continue
+        if isinstance(message.content, str):
+            content = f"{ambient}\n\n{message.content}"
+        else:
+            content = [{"type": "text", "text": ambient}, *message.content]
+        return [
+            *messages[:index],
+            message.model_copy(update={"content": content}),
+            *messages[index + 1 :],
+        ]
+    return messages
+
+
+# 创建全局实例
+ambient_context = AmbientContext()
@@ -0,0 +1,230 @@
+"""
+上下文窗口管理
+
+每轮对话都会追加到 checkpointer，长会话发给模型的消息会越来越多，延迟和费用随会话长度线性增长。
+这里作为 Agent 图的 pre_model_hook，在每次调用模型前：
+1. 截断历史轮次中过长的工具输出
+2. 总 token 数超出预算时，从最早的轮次开始移出上下文，并合并进一条摘要消息
+压缩后的消息列表会写回图状态（RemoveMessage + 新列表），之后旧 checkpoint 可以被安全裁剪。
+"""
+
+import os
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_openai import ChatOpenAI
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from app.utils.metrics import counter, histogram
+from app.utils.logger import logger
+
+load_dotenv()
+
+# 发给模型的上下文 token 预算
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# 历史工具输出的最大 token 数
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "800"))
+# 超出预算时是否用模型总结被移出的轮次（关闭则直接丢弃）
+CONTEXT_SUMMARIZE = os.getenv("CONTEXT_SUMMARIZE", "true").lower() == "true"
+
+SUMMARY_MESSAGE_ID = "context_summary"
+SUMMARY_PREFIX = "以下是之前对话的摘要：\n"
+TRUNCATED_MARKER = "\n...[工具输出过长，已截断]"
+
+context_tokens = histogram(
+    "context_tokens",
+    "调用模型前的上下文 token 数",
+    labelnames=("stage",),
+    buckets=(500, 1000, 2000, 4000, 6000, 8000, 16000, 32000, 64000),
+)
+context_compactions_total = counter(
+    "context_compactions_total", "上下文压缩次数", labelnames=("mode",)
+)
+
+# 摘要模型：disable_streaming 保证摘要内容不会作为文本片段推送给前端
+summary_llm = ChatOpenAI(
+    api_key=os.getenv("API_KEY"),
+    base_url=os.getenv(
+        "LLM_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    ),
+    model="qwen-plus",
+    temperature=0,
+    disable_streaming=True,
+)
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # 离线环境无法下载词表时，退化为按字符数估算
+            logger.warning("[Context] 加载 tiktoken 词表失败，按字符数估算: {}", e)
+            _encoding = False
+    return _encoding
+
+
+def count_text_tokens(text: str) -> int:
+    """估算一段文本的 token 数（cl100k_base 词表，与 qwen 的分词接近）"""
+    encoding = _get_encoding()
+    if not encoding:
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _content_text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return str(message.content)
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """单条消息的 token 数（含角色等固定开销和工具调用参数）"""
+    tokens = 4 + count_text_tokens(_content_text(message))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_text_tokens(f"{tool_call['name']}{tool_call['args']}")
+    return tokens
+
+
+def count_tokens(messages: List[BaseMessage]) -> int:
+    """消息列表的 token 数"""
+    return sum(count_message_tokens(m) for m in messages)
+
+
+def _truncate_tool_message(message: ToolMessage, max_tokens: int) -> ToolMessage:
+    text = _content_text(message)
+    if text.endswith(TRUNCATED_MARKER):
+        return message
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return message
+        truncated = encoding.decode(tokens[:max_tokens])
+    else:
+        if len(text) <= max_tokens:
+            return message
+        truncated = text[:max_tokens]
+    return message.model_copy(update={"content": f"{truncated}{TRUNCATED_MARKER}"})
+
+
+def _split_turns(messages: List[BaseMessage]):
+    """按 HumanMessage 切分轮次，返回 (摘要消息, 其他前缀消息, 轮次列表)"""
+    summary: Optional[SystemMessage] = None
+    prefix: List[BaseMessage] = []
+    turns: List[List[BaseMessage]] = []
+
+    for message in messages:
+        if message.id == SUMMARY_MESSAGE_ID:
+            summary = message
+        elif isinstance(message, HumanMessage):
+            turns.append([message])
+        elif turns:
+            turns[-1].append(message)
+        else:
+            prefix.append(message)
+    return summary, prefix, turns
+
+
+async def _summarize(previous: Optional[SystemMessage], dropped: List[BaseMessage]) -> str:
+    """把被移出上下文的轮次合并进已有摘要"""
+    previous_text = (
+        _content_text(previous)[len(SUMMARY_PREFIX):] if previous is not None else "无"
+    )
+    transcript = "\n".join(
+        f"{m.type}: {_content_text(m)}" for m in dropped if _content_text(m)
+    )
+    result = await summary_llm.ainvoke(
+        [
+            SystemMessage(
+                content="你是对话摘要助手。请把已有摘要和新的对话记录合并成一段简洁的中文摘要，"
+                "保留用户的关键信息、偏好、未完成的请求和重要的工具结果，不超过 300 字。"
+            ),
+            HumanMessage(content=f"已有摘要：\n{previous_text}\n\n新的对话记录：\n{transcript}"),
+        ]
+    )
+    return _content_text(result).strip()
+
+
+async def compact_context(state: dict) -> dict:
+    """
+    pre_model_hook：按 token 预算压缩上下文
+
+    Args:
+        state: Agent 图状态，包含 messages
+
+    Returns:
+        状态更新；未压缩时不修改 messages
+    """
+    messages: List[BaseMessage] = state["messages"]
+    before = count_tokens(messages)
+    context_tokens.observe(before, stage="before")
+
+    summary, prefix, turns = _split_turns(messages)
+    changed = False
+
+    # 1. 截断历史轮次（最后一轮之前）中过长的工具输出
+    for turn in turns[:-1]:
+        for i, message in enumerate(turn):
+            if isinstance(message, ToolMessage):
+                truncated = _truncate_tool_message(message, TOOL_OUTPUT_MAX_TOKENS)
+                if truncated is not message:
+                    turn[i] = truncated
+                    changed = True
+
+    def total() -> int:
+        head = [summary] if summary is not None else []
+        return count_tokens(head + prefix + [m for turn in turns for m in turn])
+
+    # 2. 超出预算时，从最早的轮次开始移出（至少保留最后一轮）
+    dropped: List[BaseMessage] = []
+    while len(turns) > 1 and total() > CONTEXT_TOKEN_BUDGET:
+        dropped.extend(turns.pop(0))
+
+    if dropped:
+        changed = True
+        if CONTEXT_SUMMARIZE:
+            try:
+                summary_text = await _summarize(summary, dropped)
+                summary = SystemMessage(
+                    content=f"{SUMMARY_PREFIX}{summary_text}", id=SUMMARY_MESSAGE_ID
+                )
+                context_compactions_total.inc(mode="summarize")
+            except Exception as e:
+                logger.warning("[Context] 生成摘要失败，直接丢弃历史轮次: {}", e)
+                context_compactions_total.inc(mode="truncate")
+        else:
+            context_compactions_total.inc(mode="truncate")
+
+    # 3. 最后一轮本身仍超出预算时，截断这一轮的工具输出
+    if turns and total() > CONTEXT_TOKEN_BUDGET:
+        last = turns[-1]
+        for i, message in enumerate(last):
+            if isinstance(message, ToolMessage):
+                truncated = _truncate_tool_message(message, TOOL_OUTPUT_MAX_TOKENS)
+                if truncated is not message:
+                    last[i] = truncated
+                    changed = True
+
+    if not changed:
+        context_tokens.observe(before, stage="after")
+        return {"messages": []}
+
+    compacted = ([summary] if summary is not None else []) + prefix
+    compacted += [m for turn in turns for m in turn]
+    context_tokens.observe(count_tokens(compacted), stage="after")
+
+    # 用压缩后的列表替换图状态中的全部消息（会写入 checkpoint）
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted]}
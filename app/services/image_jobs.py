@@ -0,0 +1,337 @@
+"""
+文生图后台任务
+
+通义万相的文生图接口是异步的：提交任务后需要轮询结果，通常要 10~30 秒。
+如果在工具里轮询，整轮对话会被占住直到图片生成完毕。这里把轮询移到后台：
+
+- 工具提交任务后立即返回任务 ID，对话继续进行
+- 一个共享的轮询任务负责所有进行中的任务，每个任务按自适应退避（越等越久）安排下一次查询，
+  同一时刻到期的任务并发查询
+- 任务完成后通过 WebSocket 推送 image_result 消息，并把图片保存到会话历史
+- 没有 WebSocket 推送目标时（如非流式接口），工具可以用 wait() 等待结果
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.services.message_writer import message_writer
+from app.utils.logger import logger
+from app.utils.metrics import counter, gauge, histogram
+from app.utils.outbound_http import outbound_http
+
+load_dotenv()
+
+API_KEY = os.getenv("API_KEY")
+GET_RESULT_URL = os.getenv("QWEN_GET_RESULT_URL")
+
+# 第一次查询前的等待时间（秒）
+IMAGE_POLL_INITIAL = float(os.getenv("IMAGE_POLL_INITIAL", "2"))
+# 每次查询后等待时间的增长倍数
+IMAGE_POLL_BACKOFF = float(os.getenv("IMAGE_POLL_BACKOFF", "1.5"))
+# 两次查询之间的最长等待时间（秒）
+IMAGE_POLL_MAX_INTERVAL = float(os.getenv("IMAGE_POLL_MAX_INTERVAL", "5"))
+# 任务超时时间（秒）
+IMAGE_JOB_TIMEOUT = float(os.getenv("IMAGE_JOB_TIMEOUT", "120"))
+
+# 推送回调：(user_id, message, session_id)，启动时由 main.py 传入 manager.send_message
+Notify = Callable[[str, dict, Optional[int]], Awaitable[None]]
+
+image_jobs_total = counter(
+    "image_jobs_total", "文生图任务数（outcome: succeeded/failed/timeout）", ("outcome",)
+)
+image_job_seconds = histogram(
+    "image_job_seconds",
+    "文生图任务从提交到完成的耗时（秒）",
+    buckets=(1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120),
+)
+image_job_polls_total = counter("image_job_polls_total", "查询任务状态的请求数")
+
+
+class ImageJob:
+    """一个进行中的文生图任务"""
+
+    def __init__(
+        self,
+        task_id: str,
+        prompt: str,
+        user_id: Optional[str] = None,
+        session_id: Optional[int] = None,
+    ):
+        self.task_id = task_id
+        self.prompt = prompt
+        self.user_id = user_id
+        self.session_id = session_id
+        self.created_at = time.monotonic()
+        self.interval = IMAGE_POLL_INITIAL
+        self.next_poll_at = self.created_at + self.interval
+        self.polls = 0
+        # 完成后的结果：{"success": bool, "task_id": ..., "images": [...]} 或错误信息
+        self.result: Optional[dict] = None
+        self.done = asyncio.Event()
+
+    def backoff(self):
+        """安排下一次查询，间隔按倍数增长"""
+        self.interval = min(self.interval * IMAGE_POLL_BACKOFF, IMAGE_POLL_MAX_INTERVAL)
+        self.next_poll_at = time.monotonic() + self.interval
+
+
+class ImageJobPoller:
+    """所有文生图任务共享的后台轮询器"""
+
+    def __init__(self):
+        self._jobs: Dict[str, ImageJob] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._notify: Optional[Notify] = None
+        gauge("image_jobs_in_flight", "进行中的文生图任务数", fn=lambda: len(self._jobs))
+
+    async def start(self, notify: Optional[Notify] = None):
+        """
+        启动后台轮询（应用启动时调用）
+
+        Args:
+            notify: 任务完成后推送消息的回调
+        """
+        self._notify = notify
+        if self._task is None:
+            self._start_task()
+
+    async def stop(self):
+        """停止轮询，未完成的任务按失败处理（应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for job in list(self._jobs.values()):
+            job.result = {
+                "success": False,
+                "task_id": job.task_id,
+                "error": "Shutdown",
+                "message": "服务重启，图片生成任务已中断",
+            }
+            job.done.set()
+        if self._jobs:
+            logger.warning("[ImageJobs] 关闭时仍有 {} 个任务未完成", len(self._jobs))
+        self._jobs.clear()
+
+    def submit(
+        self,
+        task_id: str,
+        prompt: str,
+        user_id: Optional[str] = None,
+        session_id: Optional[int] = None,
+    ) -> ImageJob:
+        """
+        登记一个已提交到上游的任务
+
+        Args:
+            task_id: 上游返回的任务 ID
+            prompt: 图片描述
+            user_id: 完成后推送给哪个用户，为空时只能通过 wait() 获取结果
+            session_id: 结果所属的会话
+
+        Returns:
+            任务对象
+        """
+        job = ImageJob(task_id, prompt, user_id, session_id)
+        self._jobs[task_id] = job
+        if self._task is None:
+            # 未调用 start()（如脚本中直接使用工具）时按需启动
+            self._start_task()
+        self._wakeup.set()
+        return job
+
+    @property
+    def can_notify(self) -> bool:
+        """是否可以在完成后主动推送结果"""
+        return self._notify is not None
+
+    async def wait(self, job: ImageJob, timeout: float = IMAGE_JOB_TIMEOUT) -> dict:
+        """
+        等待任务完成
+
+        Args:
+            job: submit() 返回的任务
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            任务结果
+        """
+        await asyncio.wait_for(job.done.wait(), timeout)
+        return job.result
+
+    def in_flight(self) -> int:
+        """进行中的任务数"""
+        return len(self._jobs)
+
+    def _start_task(self):
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task):
+        """轮询任务意外退出时重新启动，否则所有进行中和之后提交的任务都会一直挂起"""
+        if task.cancelled() or self._task is not task:
+            return
+        logger.opt(exception=task.exception()).error("[ImageJobs] 轮询任务意外退出，重新启动")
+        self._start_task()
+
+    async def _run(self):
+        while True:
+            if not self._jobs:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            next_at = min(job.next_poll_at for job in self._jobs.values())
+            if next_at > now:
+                # 睡到最早到期的任务，期间有新任务提交会被唤醒重新计算
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_at - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = [job for job in self._jobs.values() if job.next_poll_at <= now]
+            await asyncio.gather(*(self._poll_safely(job) for job in due))
+
+    async def _poll_safely(self, job: ImageJob):
+        """查询单个任务，异常只让这一个任务失败，不影响共享的轮询任务"""
+        try:
+            await self._poll(job)
+        except Exception as e:
+            logger.exception("[ImageJobs] 处理任务 {} 出错: {}", job.task_id, e)
+            if self._jobs.pop(job.task_id, None) is not None and not job.done.is_set():
+                job.result = {
+                    "success": False,
+                    "task_id": job.task_id,
+                    "error": "Internal Error",
+                    "message": "图片生成任务处理出错",
+                }
+                job.done.set()
+                image_jobs_total.inc(outcome="failed")
+
+    async def _poll(self, job: ImageJob):
+        headers = {"Authorization": f"Bearer {API_KEY}"}
+        job.polls += 1
+        image_job_polls_total.inc()
+
+        output = None
+        try:
+            async with outbound_http.get(
+                f"{GET_RESULT_URL}/{job.task_id}", headers=headers
+            ) as response:
+                if response.status == 200:
+                    output = (await response.json()).get("output")
+        except Exception as e:
+            logger.warning("[ImageJobs] 查询任务 {} 失败: {}", job.task_id, e)
+
+        status = output.get("task_status") if output else None
+        if status == "SUCCEEDED":
+            if output.get("results"):
+                await self._finish(
+                    job,
+                    {"success": True, "task_id": job.task_id, "images": output["results"]},
+                    "succeeded",
+                )
+            else:
+                await self._finish(
+                    job,
+                    {
+                        "success": False,
+                        "task_id": job.task_id,
+                        "error": "No Results",
+                        "message": "Task succeeded but no image results found.",
+                    },
+                    "failed",
+                )
+        elif status in ("FAILED", "CANCELED", "UNKNOWN"):
+            await self._finish(
+                job,
+                {
+                    "success": False,
+                    "task_id": job.task_id,
+                    "error": "Generation Failed",
+                    "message": output.get("message", "Unknown error"),
+                },
+                "failed",
+            )
+        elif time.monotonic() - job.created_at >= IMAGE_JOB_TIMEOUT:
+            await self._finish(
+                job,
+                {
+                    "success": False,
+                    "task_id": job.task_id,
+                    "error": "Timeout",
+                    "message": "Image generation timed out.",
+                },
+                "timeout",
+            )
+        else:
+            # PENDING / RUNNING 或查询失败，稍后再查
+            job.backoff()
+
+    async def _finish(self, job: ImageJob, result: dict, outcome: str):
+        self._jobs.pop(job.task_id, None)
+        job.result = result
+        job.done.set()
+        image_jobs_total.inc(outcome=outcome)
+        image_job_seconds.observe(time.monotonic() - job.created_at)
+
+        if job.user_id and self._notify is not None:
+            try:
+                await self._notify(
+                    job.user_id,
+                    {"type": "image_result", "data": {**result, "prompt": job.prompt}},
+                    job.session_id,
+                )
+            except Exception as e:
+                logger.warning("[ImageJobs] 推送任务 {} 结果失败: {}", job.task_id, e)
+
+        # 生成的图片写入会话历史，刷新页面后仍能看到
+        if job.session_id and result["success"]:
+            content = "\n".join(
+                f"![{job.prompt}]({image['url']})"
+                for image in result["images"]
+                if image.get("url")
+            )
+            if content:
+                try:
+                    await message_writer.enqueue(job.session_id, "assistant", content)
+                except Exception as e:
+                    logger.warning("[ImageJobs] 保存任务 {} 的图片消息失败: {}", job.task_id, e)
+
+    def stats(self) -> dict:
+        """
+        获取任务统计
+
+        Returns:
+            进行中的任务数及各任务的等待时间和查询次数
+        """
+        now = time.monotonic()
+        return {
+            "in_flight": len(self._jobs),
+            "jobs": [
+                {
+                    "task_id": job.task_id,
+                    "age_seconds": now - job.created_at,
+                    "polls": job.polls,
+                    "interval": job.interval,
+                }
+                for job in self._jobs.values()
+            ],
+        }
+
+
+# 创建全局实例
+image_jobs = ImageJobPoller()
+
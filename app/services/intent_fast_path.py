@@ -0,0 +1,308 @@
+"""
+常见意图快速通道
+
+「查一下我的账单」「有没有新通知」「今天天气」这类请求占了很大比例，走 ReAct 循环要两次完整的
+LLM 往返（第一次决定调用哪个工具，第二次根据工具结果回答）。快速通道在进入 Agent 之前：
+
+- 用严格的规则匹配高置信度意图（整句匹配，句子里带有其他要求时不匹配）
+- 直接调用对应的工具（query_unpaid_bills / get_user_notifications / get_weather），
+  与 Agent 一样经过 with_execution_limits 的超时和并发限制
+- 把工具结果交给不绑定工具的模型，单次流式生成回答
+- 把这一轮（用户消息、工具调用、工具结果、回答）写回 checkpointer，后续追问的上下文与走 Agent 时一致
+
+没有匹配、工具抛出异常或返回 "Error: ..." 时回退到 Agent。
+
+指标：
+- intent_fast_path_total{intent, outcome}：hit 快速通道完成 / fallback 回退到 Agent / miss 没有匹配
+- chat_turn_seconds{path, intent}：整轮耗时，path 为 fast 或 agent；匹配到意图但走 Agent 的轮次
+  （快速通道关闭或回退）也带上 intent 标签，同一意图两条路径的耗时差即为节省的时间
+"""
+
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Pattern, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_openai import ChatOpenAI
+
+from app.services.agent_registry import API_KEY, DEFAULT_BASE_URL
+from app.tools import all_tools
+from app.utils.logger import logger
+from app.utils.metrics import counter, histogram
+
+load_dotenv()
+
+INTENT_FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH_ENABLED", "true").lower() == "true"
+# 超过这个长度的输入不走快速通道（长句通常包含多个要求）
+INTENT_FAST_PATH_MAX_LENGTH = int(os.getenv("INTENT_FAST_PATH_MAX_LENGTH", "24"))
+
+intent_fast_path_total = counter(
+    "intent_fast_path_total",
+    "意图快速通道结果（outcome: hit/fallback/miss）",
+    ("intent", "outcome"),
+)
+chat_turn_seconds = histogram(
+    "chat_turn_seconds",
+    "完成的对话轮次耗时（秒，path: fast/agent）",
+    ("path", "intent"),
+    buckets=(0.25, 0.5, 1, 1.5, 2, 3, 4, 6, 8, 12, 20, 30, 60),
+)
+
+# 匹配前去掉的标点和语气前缀
+_PUNCTUATION = re.compile(r"[\s,，。.!！?？~～、…]+")
+_POLITE_PREFIX = re.compile(r"^(你好|您好|小助手)*(请问|请|麻烦你?|能不能|可以)?(帮我|给我|帮忙)?")
+
+# 天气：表示「本地」的词按空城市处理（按 IP 定位），表示未来的词不匹配（get_weather 只查当天）
+_LOCAL_PLACES = {"这里", "这边", "我这", "我这里", "我们这", "我们这里", "本地", "当地", "外面", "小区", "附近"}
+_FUTURE_WORDS = ("明", "后天", "周", "星期", "未来", "下午", "晚上", "最近", "这几天")
+_TODAY_WORDS = ("今天", "今日", "现在", "当前")
+# 城市名：2~4 个汉字，可带「县」「区」（「市」匹配前已去掉）
+_CITY = re.compile(r"[一-龥]{2,4}(县|区)?")
+# 不会出现在城市名中的代词、动词和指代词（「我想知道天气」「你知道天气」「那边天气」）；
+# 出现时不走快速通道，交给 Agent 理解
+_NOT_CITY_CHARS = set("我你您他她它想要知道问说看查找告诉帮给能会吗呢那哪这啥什么怎")
+
+
+@dataclass(frozen=True)
+class Intent:
+    """一个可以走快速通道的意图"""
+
+    name: str
+    tool_name: str
+    patterns: Tuple[Pattern, ...]
+    # 回答要求（给单次回答的模型）
+    instruction: str
+    # 由匹配结果生成工具参数，返回 None 表示放弃匹配
+    build_args: Callable[[re.Match], Optional[dict]] = field(default=lambda match: {})
+
+
+@dataclass
+class IntentMatch:
+    """匹配结果"""
+
+    intent: Intent
+    args: dict
+
+
+def _weather_args(match: re.Match) -> Optional[dict]:
+    city = match.groupdict().get("city") or ""
+    for word in _TODAY_WORDS:
+        city = city.replace(word, "")
+    city = city.removesuffix("的").removesuffix("市")
+    if any(word in city for word in _FUTURE_WORDS):
+        return None
+    if city in _LOCAL_PLACES or not city:
+        return {"city": ""}
+    if not _CITY.fullmatch(city) or any(char in _NOT_CITY_CHARS for char in city):
+        return None
+    return {"city": city}
+
+
+_QUERY = r"(查询?|查一下|查查|看一下|看看|告诉我)?(一下)?"
+
+INTENTS: List[Intent] = [
+    Intent(
+        name="bills",
+        tool_name="query_unpaid_bills",
+        patterns=(
+            re.compile(
+                _QUERY
+                + r"(我|我家|我们家)?的?(待缴|未缴|待缴费|未缴费|待支付|未支付|没交的?|欠费的?)?的?"
+                r"(物业费?)?账单(情况|明细)?(有哪些|有多少|是多少|多少钱)?(吗|呢|了吗)?"
+            ),
+            re.compile(r"(我|我家)?(还有|有没有)(待缴|未缴|没交的?)的?(物业费?)?账单(吗|呢)?"),
+        ),
+        instruction="根据账单数据，列出每一笔待缴账单（费用类型、账期、金额）并给出合计；没有待缴账单时直接告诉用户。",
+        build_args=lambda match: {"status": 0},
+    ),
+    Intent(
+        name="notifications",
+        tool_name="get_user_notifications",
+        patterns=(
+            re.compile(
+                r"(有没有|有什么|有哪些|有|查询?|查一下|查查|看一下|看看)?(一下)?(我的?)?"
+                r"(新|最新|最近|未读)?的?(社区|小区)?通知(吗|呢|了吗|没有)?"
+            ),
+        ),
+        instruction="根据通知数据，先说明未读通知的数量，再按时间列出通知标题和要点；没有通知时直接告诉用户。",
+        build_args=lambda match: {"pageNum": 0, "pageSize": 10},
+    ),
+    Intent(
+        name="weather",
+        tool_name="get_weather",
+        patterns=(
+            re.compile(
+                _QUERY
+                + r"(?P<city>[一-龥]{2,8}?)?(今天|今日|现在|当前)?的?"
+                r"(天气|气温)(怎么样|如何|咋样|情况|预报)?(吗|呢|啊)?"
+            ),
+        ),
+        instruction="根据天气数据，简要说明城市、天气状况、气温和风力，并给一句出行或穿衣建议。",
+        build_args=_weather_args,
+    ),
+]
+
+ANSWER_SYSTEM_PROMPT = (
+    "你是社区智能助手。系统已经替用户调用了「{display_name}」工具，请只根据工具返回的数据回答用户的问题，"
+    "不要编造数据中没有的内容。如果数据表明服务不可用或出错，向用户说明并建议稍后再试。{instruction}"
+)
+
+
+class IntentFastPath:
+    """常见意图的快速通道"""
+
+    def __init__(
+        self,
+        intents: Optional[List[Intent]] = None,
+        enabled: bool = INTENT_FAST_PATH_ENABLED,
+        max_length: int = INTENT_FAST_PATH_MAX_LENGTH,
+    ):
+        self.intents = INTENTS if intents is None else intents
+        self.enabled = enabled
+        self.max_length = max_length
+        self._tools: Dict[str, object] = {t.name: t for t in all_tools}
+        # 单次回答使用的模型：与 Agent 相同，但不绑定工具
+        self.llm = ChatOpenAI(
+            api_key=API_KEY,
+            base_url=DEFAULT_BASE_URL,
+            model="qwen-plus",
+            temperature=0,
+            streaming=True,
+        )
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = _PUNCTUATION.sub("", text.lower())
+        return _POLITE_PREFIX.sub("", text)
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """
+        匹配高置信度意图（不论快速通道是否开启，匹配结果都用于给轮次耗时打标签）
+
+        Args:
+            text: 用户输入
+
+        Returns:
+            匹配结果；没有匹配时返回 None
+        """
+        normalized = self._normalize(text)
+        if not normalized or len(normalized) > self.max_length:
+            return None
+        for intent in self.intents:
+            if intent.tool_name not in self._tools:
+                continue
+            for pattern in intent.patterns:
+                found = pattern.fullmatch(normalized)
+                if found is None:
+                    continue
+                args = intent.build_args(found)
+                if args is not None:
+                    return IntentMatch(intent=intent, args=args)
+        return None
+
+    async def call_tool(self, match: IntentMatch) -> Optional[str]:
+        """
+        直接调用意图对应的工具
+
+        Returns:
+            工具结果；工具抛出异常或返回 "Error: ..."（超时、超过本轮时间预算）时返回 None，调用方回退到 Agent
+        """
+        tool = self._tools[match.intent.tool_name]
+        try:
+            result = await tool.ainvoke(match.args)
+        except Exception as e:
+            logger.warning("[IntentFastPath] 工具 {} 调用失败，回退到 Agent: {}", tool.name, e)
+            return None
+        result = result if isinstance(result, str) else str(result)
+        if result.startswith("Error:"):
+            logger.warning("[IntentFastPath] 工具 {} 返回错误，回退到 Agent: {}", tool.name, result)
+            return None
+        return result
+
+    async def answer_stream(
+        self, match: IntentMatch, display_name: str, user_input: str, tool_result: str
+    ) -> AsyncIterator[str]:
+        """根据工具结果单次流式生成回答"""
+        messages = [
+            SystemMessage(
+                content=ANSWER_SYSTEM_PROMPT.format(
+                    display_name=display_name, instruction=match.intent.instruction
+                )
+            ),
+            HumanMessage(content=f"工具返回的数据：\n{tool_result}\n\n用户的问题：{user_input}"),
+        ]
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                yield chunk.content
+
+    @staticmethod
+    def turn_messages(
+        match: IntentMatch, current_message: HumanMessage, tool_result: str, answer: str
+    ) -> list:
+        """
+        本轮写回 checkpointer 的消息，与 ReAct 循环产生的消息结构一致：
+        用户消息 -> 带工具调用的 AI 消息 -> 工具结果 -> 最终回答
+        """
+        tool_call_id = f"call_fast_{uuid.uuid4().hex[:24]}"
+        return [
+            current_message,
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": match.intent.tool_name, "args": match.args, "id": tool_call_id}
+                ],
+            ),
+            ToolMessage(content=tool_result, tool_call_id=tool_call_id, name=match.intent.tool_name),
+            AIMessage(content=answer),
+        ]
+
+    @staticmethod
+    def record(intent: Optional[IntentMatch], outcome: str):
+        intent_fast_path_total.inc(
+            intent=intent.intent.name if intent else "none", outcome=outcome
+        )
+
+    @staticmethod
+    def observe_turn(path: str, intent: Optional[IntentMatch], seconds: float):
+        chat_turn_seconds.observe(
+            seconds, path=path, intent=intent.intent.name if intent else "none"
+        )
+
+    def stats(self) -> dict:
+        """
+        按意图汇总命中率和节省的耗时
+
+        Returns:
+            {意图: {hit, fallback, hit_rate, fast_p50, agent_p50, saved_p50}}，
+            hit_rate 为命中次数占全部对话轮次（含未匹配）的比例
+        """
+        total = sum(
+            intent_fast_path_total.get(intent=intent.name, outcome=outcome)
+            for intent in self.intents
+            for outcome in ("hit", "fallback")
+        ) + intent_fast_path_total.get(intent="none", outcome="miss")
+        result = {}
+        for intent in self.intents:
+            hit = intent_fast_path_total.get(intent=intent.name, outcome="hit")
+            fast_p50 = chat_turn_seconds.percentile(0.5, path="fast", intent=intent.name)
+            agent_p50 = chat_turn_seconds.percentile(0.5, path="agent", intent=intent.name)
+            result[intent.name] = {
+                "hit": hit,
+                "fallback": intent_fast_path_total.get(intent=intent.name, outcome="fallback"),
+                "hit_rate": hit / total if total else 0.0,
+                "fast_p50": fast_p50,
+                "agent_p50": agent_p50,
+                "saved_p50": (
+                    agent_p50 - fast_p50
+                    if fast_p50 is not None and agent_p50 is not None
+                    else None
+                ),
+            }
+        return result
+
+
+# 创建全局实例
+intent_fast_path = IntentFastPath()
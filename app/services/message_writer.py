@@ -0,0 +1,220 @@
+"""
+消息写入队列（write-behind）
+
+每轮对话结束后不再直接插入数据库，而是把消息放入进程内队列，
+由后台任务按批量大小 / 时间窗口合并成一次批量插入：
+- 队列满时 enqueue 会等待（背压），不会无限堆积内存
+- 插入失败按指数退避重试；约束冲突、外键失效（会话已被删除）等重试也不会成功的错误
+  不重试，把批次二分后分别写入，只丢弃出错的那几行，不影响同批中其他会话的消息
+- 应用关闭时把队列中剩余的消息全部写完
+- 单个消费者按 FIFO 顺序写入，并在入队时分配严格递增的 created_at，保证同一会话内的顺序
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from app.database.service.message import save_messages
+from app.utils.metrics import counter, gauge, histogram
+from app.utils.logger import logger
+
+load_dotenv()
+
+MESSAGE_QUEUE_MAXSIZE = int(os.getenv("MESSAGE_QUEUE_MAXSIZE", "10000"))  # 队列容量
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "50"))  # 单批最多条数
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", "0.2"))  # 攒批时间窗口（秒）
+MESSAGE_MAX_RETRIES = int(os.getenv("MESSAGE_MAX_RETRIES", "5"))  # 单批最大重试次数
+
+# 队列结束标记
+_STOP = object()
+
+# 重试也不会成功的 SQLSTATE 类别：22 数据异常、23 约束冲突（含外键 23503）、42 语法或权限错误
+PERMANENT_SQLSTATE_CLASSES = ("22", "23", "42")
+# PostgREST 自身的请求错误（PGRST1xx 请求、PGRST2xx schema、PGRST3xx JWT，均为 4xx）；
+# PGRST0xx 是连接数据库失败，属于临时错误
+PERMANENT_POSTGREST_PREFIXES = ("PGRST1", "PGRST2", "PGRST3")
+
+message_flush_seconds = histogram(
+    "message_flush_seconds", "消息批量写入耗时（秒，含重试）"
+)
+messages_persisted_total = counter(
+    "messages_persisted_total",
+    "消息写入结果计数（outcome: success/rejected 数据错误被拒绝/dropped 重试耗尽）",
+    labelnames=("outcome",),
+)
+
+
+def _is_permanent_error(error: Exception) -> bool:
+    """是否为重试也不会成功的错误（postgrest APIError 的 code 或 HTTP 4xx）"""
+    code = str(getattr(error, "code", "") or "")
+    if code.startswith(PERMANENT_SQLSTATE_CLASSES) or code.startswith(
+        PERMANENT_POSTGREST_PREFIXES
+    ):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+class MessageWriter:
+    """后台批量写入消息"""
+
+    def __init__(
+        self,
+        maxsize: int = MESSAGE_QUEUE_MAXSIZE,
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_FLUSH_INTERVAL,
+        max_retries: int = MESSAGE_MAX_RETRIES,
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 上一条消息的 created_at，用于生成严格递增的时间戳
+        self._last_created_at: Optional[datetime] = None
+
+    async def start(self):
+        """启动后台写入任务（应用启动时调用）"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止写入任务，并把队列中已有的消息全部写入（应用关闭时调用）"""
+        if self._task is None:
+            return
+        # 先清空 _task，之后的 enqueue 直接写入，不会落在结束标记之后
+        task, self._task = self._task, None
+        await self._queue.put(_STOP)
+        await task
+
+        # 停止前已经阻塞在 put 上的 enqueue（队列满时）会在结束标记之后入队，这里补写；
+        # 取出消息会唤醒等待的 put，所以写完一批后再检查一次，直到队列为空
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            if batch:
+                await self._write(batch)
+
+    def depth(self) -> int:
+        """当前队列中等待写入的消息数"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _next_created_at(self) -> str:
+        now = datetime.now(timezone.utc)
+        if self._last_created_at is not None and now <= self._last_created_at:
+            now = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = now
+        return now.isoformat()
+
+    async def enqueue(self, session_id: int, role: str, content: str):
+        """
+        提交一条待写入的消息
+
+        队列满时会等待，直到后台任务腾出空间。
+
+        Args:
+            session_id: 会话 ID
+            role: 消息角色（user 或 assistant）
+            content: 消息内容
+        """
+        row = {
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "created_at": self._next_created_at(),
+        }
+
+        if self._task is None:
+            # 未启动（如脚本中直接调用）时退化为同步写入
+            await self._write([row])
+            return
+
+        await self._queue.put(row)
+
+    async def _run(self):
+        """后台消费循环：攒批 -> 写入"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            # 在时间窗口内继续收集，直到达到批量大小
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+
+    async def _write(self, batch: List[dict]):
+        """批量写入，记录耗时"""
+        start = time.perf_counter()
+        await self._write_batch(batch)
+        message_flush_seconds.observe(time.perf_counter() - start)
+
+    async def _write_batch(self, batch: List[dict]):
+        """
+        写入一批消息
+
+        临时错误（网络、5xx、数据库连接）按指数退避重试；
+        数据错误不重试，二分批次后分别写入，最终只丢弃出错的行
+        """
+        delay = 0.5
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await save_messages(batch)
+                messages_persisted_total.inc(len(batch), outcome="success")
+                return
+            except Exception as e:
+                if _is_permanent_error(e):
+                    if len(batch) == 1:
+                        messages_persisted_total.inc(outcome="rejected")
+                        logger.error(
+                            "消息被数据库拒绝，放弃保存（会话 {}）: {}", batch[0]["session_id"], e
+                        )
+                        return
+                    middle = len(batch) // 2
+                    logger.warning("批量保存消息失败，拆分为两批重新写入: {}", e)
+                    await self._write_batch(batch[:middle])
+                    await self._write_batch(batch[middle:])
+                    return
+
+                logger.warning("批量保存消息失败（第 {} 次）: {}", attempt, e)
+                if attempt == self.max_retries:
+                    messages_persisted_total.inc(len(batch), outcome="dropped")
+                    logger.error("放弃保存 {} 条消息", len(batch))
+                    return
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10)
+
+
+# 创建全局实例
+message_writer = MessageWriter()
+
+message_queue_depth = gauge(
+    "message_queue_depth", "等待写入的消息数", fn=message_writer.depth
+)
@@ -2,10 +2,20 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import os
+import time
+
+from app.utils.metrics import histogram
+from app.utils.logger import logger
+
+title_generation_seconds = histogram(
+    "title_generation_seconds", "会话标题生成耗时（秒）", ("outcome",)
+)
 
 llm = ChatOpenAI(
     api_key=os.getenv("API_KEY"),
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+    base_url=os.getenv(
+        "LLM_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    ),
     model="qwen-plus",
     temperature=0.3,
 )
@@ -28,9 +38,12 @@ title_chain = prompt | llm | StrOutputParser()
 
 
 async def generate_title(content: str) -> str:
+    start = time.perf_counter()
     try:
         title = await title_chain.ainvoke({"content": content})
+        title_generation_seconds.observe(time.perf_counter() - start, outcome="ok")
         return title.strip()
     except Exception as e:
-        print(f"生成标题失败: {e}")
+        title_generation_seconds.observe(time.perf_counter() - start, outcome="error")
+        logger.warning("生成标题失败: {}", e)
         return "新会话"
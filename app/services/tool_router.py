@@ -0,0 +1,268 @@
+"""
+工具路由
+
+每次调用模型都会带上全部工具的 schema（定时邮件、访客登记等工具的参数 schema 很长），
+既占 prompt token 也拖慢首个 token。这里在每轮对话开始前按用户输入挑出相关的工具子集：
+
+- 按 TOOL_METADATA 中的 category 把工具分组，每个分类有一组关键词
+- 本地打分：命中关键词记 1 分，再加上输入与分类描述（工具名称、说明、docstring）共有的
+  二元字组，按 IDF 加权（所有分类都有的字组如「正在」「查询」权重为 0）
+- 得分达到 TOOL_ROUTING_MIN_SCORE 的分类全部选中；上一轮选中的分类本轮继续保留
+- 没有分类达到阈值时，只有「好的，就发这个」之类简短的确认/指代追问
+  （不超过 TOOL_ROUTING_FOLLOW_UP_MAX_LENGTH 个字，且带有确认或指代词）沿用上一轮的分类；
+  其他输入（如「讲个笑话」「我想修一下水管」）回退到全部工具，并清除记住的分类
+
+被省掉的工具 schema token 数记录在 tool_schema_tokens_total{kind="saved"} 中。
+"""
+
+import json
+import math
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Set
+
+from dotenv import load_dotenv
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.services.ambient_context import AMBIENT_CONTEXT_ENABLED
+from app.services.context_window import count_text_tokens
+from app.tools import all_tools
+from app.tools.tool_metadata import get_tool_display_info
+from app.utils.metrics import counter, histogram
+
+load_dotenv()
+
+TOOL_ROUTING_ENABLED = os.getenv("TOOL_ROUTING_ENABLED", "true").lower() == "true"
+# 分类被选中的最低得分（命中一个关键词即为 1 分）
+TOOL_ROUTING_MIN_SCORE = float(os.getenv("TOOL_ROUTING_MIN_SCORE", "1.0"))
+# 二元字组得分的权重
+TOOL_ROUTING_BIGRAM_WEIGHT = float(os.getenv("TOOL_ROUTING_BIGRAM_WEIGHT", "0.3"))
+# 记住上一轮分类的会话数上限
+TOOL_ROUTING_MEMORY_SIZE = int(os.getenv("TOOL_ROUTING_MEMORY_SIZE", "10000"))
+# 沿用上一轮分类的追问最大长度（去掉空白和标点后的字数）
+TOOL_ROUTING_FOLLOW_UP_MAX_LENGTH = int(os.getenv("TOOL_ROUTING_FOLLOW_UP_MAX_LENGTH", "10"))
+
+# 各分类的关键词
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "bill": ["账单", "物业费", "缴费", "交费", "欠费", "水费", "电费", "燃气费", "费用"],
+    "notification": ["通知", "已读", "未读", "提醒"],
+    "message": ["私信", "发消息", "发送消息", "留言", "告诉他", "告诉她"],
+    "search": ["搜索", "搜一下", "新闻", "热榜", "热搜", "百科", "维基", "域名", "联网", "最新"],
+    "weather": ["天气", "气温", "温度", "下雨", "下雪", "降雨", "刮风", "穿衣", "带伞"],
+    "mall": ["商品", "商城", "购买", "买点", "想买", "价格", "多少钱", "超市"],
+    "email": ["邮件", "邮箱", "email", "定时发送"],
+    "time": ["时间", "几点", "日期", "今天几号", "星期几"],
+    "visitor": ["访客", "来访", "登记", "客人", "拜访"],
+    # 不用单字「画」：画面、规划、计划等都会误命中
+    "image": ["画一", "画个", "画张", "画幅", "帮我画", "图片", "生成图", "照片", "插画", "海报"],
+}
+
+# 始终带上的分类（schema 很短，很多问题都会用到当前时间）；
+# 开启环境上下文后当前时间已经随用户消息给出，不再默认带上
+ALWAYS_CATEGORIES: FrozenSet[str] = (
+    frozenset() if AMBIENT_CONTEXT_ENABLED else frozenset({"time"})
+)
+
+# 确认或指代上一轮内容的词，简短输入中带有这些词才视为追问
+FOLLOW_UP_WORDS = (
+    "好的", "好吧", "可以", "行吧", "对的", "是的", "嗯", "确认", "确定", "就这", "这个", "那个",
+    "这些", "那些", "这条", "那条", "这封", "那封", "第一", "第二", "第三", "上一", "刚才",
+    "继续", "再来", "改成", "换成", "发吧", "发送吧", "没问题",
+)
+
+_PUNCTUATION = re.compile(r"[\s,，。.!！?？~～、…]+")
+
+tool_routing_total = counter(
+    "tool_routing_total",
+    "工具路由结果（outcome: subset/carryover 沿用上一轮/fallback/disabled）",
+    ("outcome",),
+)
+tool_routing_selected_tools = histogram(
+    "tool_routing_selected_tools",
+    "每轮选中的工具数",
+    buckets=(1, 2, 3, 4, 6, 8, 10, 12, 16, 20),
+)
+tool_schema_tokens_total = counter(
+    "tool_schema_tokens_total",
+    "模型调用携带的工具 schema token 数（kind: sent 实际发送 / saved 路由省掉）",
+    ("kind",),
+)
+
+
+def is_follow_up(text: str, max_length: int = TOOL_ROUTING_FOLLOW_UP_MAX_LENGTH) -> bool:
+    """是否为简短的确认/指代追问（如「好的，就发这个」「第二个」）"""
+    normalized = _PUNCTUATION.sub("", text.lower())
+    return 0 < len(normalized) <= max_length and any(
+        word in normalized for word in FOLLOW_UP_WORDS
+    )
+
+
+def _bigrams(text: str) -> Set[str]:
+    text = "".join(text.lower().split())
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+@dataclass
+class ToolRoute:
+    """一轮对话的路由结果"""
+
+    tools: List
+    categories: FrozenSet[str]
+    fallback: bool
+    sent_tokens: int  # 每次模型调用携带的工具 schema token 数
+    saved_tokens: int  # 相比全部工具，每次模型调用省掉的 token 数
+
+    def record_model_call(self):
+        """每次调用模型时记录 schema token（一轮中模型可能被调用多次）"""
+        tool_schema_tokens_total.inc(self.sent_tokens, kind="sent")
+        tool_schema_tokens_total.inc(self.saved_tokens, kind="saved")
+
+
+class ToolRouter:
+    """按用户输入选出每轮对话使用的工具子集"""
+
+    def __init__(
+        self,
+        tools: Optional[List] = None,
+        enabled: bool = TOOL_ROUTING_ENABLED,
+        min_score: float = TOOL_ROUTING_MIN_SCORE,
+    ):
+        self.tools = all_tools if tools is None else tools
+        self.enabled = enabled
+        self.min_score = min_score
+        self._categories: Dict[str, str] = {
+            t.name: get_tool_display_info(t.name)["category"] for t in self.tools
+        }
+        self._profiles = self._build_profiles()
+        self._idf = self._build_idf()
+        # 工具 schema 的 token 数，第一次路由时计算
+        self._schema_tokens: Optional[Dict[str, int]] = None
+        # thread_id -> 上一轮选中的分类
+        self._last: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+
+    def _build_profiles(self) -> Dict[str, Set[str]]:
+        """每个分类的描述文本（关键词、工具名称、说明、docstring）拆成二元字组"""
+        texts: Dict[str, List[str]] = {}
+        for t in self.tools:
+            info = get_tool_display_info(t.name)
+            texts.setdefault(info["category"], []).extend(
+                [info["display_name"], info["description"], t.description or ""]
+            )
+        for category, keywords in CATEGORY_KEYWORDS.items():
+            if category in texts:
+                texts[category].extend(keywords)
+        return {category: _bigrams(" ".join(parts)) for category, parts in texts.items()}
+
+    def _build_idf(self) -> Dict[str, float]:
+        document_frequency: Dict[str, int] = {}
+        for bigrams in self._profiles.values():
+            for bigram in bigrams:
+                document_frequency[bigram] = document_frequency.get(bigram, 0) + 1
+        total = len(self._profiles)
+        return {
+            bigram: math.log(total / frequency)
+            for bigram, frequency in document_frequency.items()
+        }
+
+    def _get_schema_tokens(self) -> Dict[str, int]:
+        if self._schema_tokens is None:
+            self._schema_tokens = {
+                t.name: count_text_tokens(
+                    json.dumps(convert_to_openai_tool(t), ensure_ascii=False)
+                )
+                for t in self.tools
+            }
+        return self._schema_tokens
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        计算用户输入与各分类的相关度
+
+        Returns:
+            {分类: 得分}，只包含得分大于 0 的分类
+        """
+        lowered = text.lower()
+        bigrams = _bigrams(text)
+        scores = {}
+        for category, profile in self._profiles.items():
+            score = sum(
+                1.0 for keyword in CATEGORY_KEYWORDS.get(category, []) if keyword in lowered
+            )
+            score += TOOL_ROUTING_BIGRAM_WEIGHT * sum(
+                self._idf.get(bigram, 0.0) for bigram in bigrams & profile
+            )
+            if score > 0:
+                scores[category] = score
+        return scores
+
+    def route(self, text: str, thread_id: Optional[str] = None) -> ToolRoute:
+        """
+        选出本轮对话使用的工具
+
+        Args:
+            text: 用户输入
+            thread_id: 会话标识，用于保留上一轮选中的分类
+
+        Returns:
+            路由结果，tools 保持 all_tools 中的顺序（相同子集复用同一个编译好的 Agent）
+        """
+        schema_tokens = self._get_schema_tokens()
+        total_tokens = sum(schema_tokens.values())
+
+        matched = frozenset()
+        if self.enabled:
+            matched = frozenset(
+                category
+                for category, score in self.score(text).items()
+                if score >= self.min_score
+            )
+
+        previous = frozenset()
+        if self.enabled and thread_id is not None:
+            previous = self._last.get(thread_id, frozenset())
+            if not matched and previous and not is_follow_up(text):
+                # 换了话题：回退到全部工具，之后的追问也不再沿用更早的分类
+                del self._last[thread_id]
+                previous = frozenset()
+
+        if not matched and not previous:
+            tool_routing_total.inc(outcome="fallback" if self.enabled else "disabled")
+            tool_routing_selected_tools.observe(len(self.tools))
+            return ToolRoute(
+                tools=self.tools,
+                categories=frozenset(self._categories.values()),
+                fallback=True,
+                sent_tokens=total_tokens,
+                saved_tokens=0,
+            )
+
+        categories = matched | previous | ALWAYS_CATEGORIES
+        if matched and thread_id is not None:
+            self._remember(thread_id, matched)
+        elif previous:
+            # 简短的追问：沿用上一轮的分类，并刷新其在 LRU 中的位置
+            self._last.move_to_end(thread_id)
+
+        tools = [t for t in self.tools if self._categories[t.name] in categories]
+        sent_tokens = sum(schema_tokens[t.name] for t in tools)
+        tool_routing_total.inc(outcome="subset" if matched else "carryover")
+        tool_routing_selected_tools.observe(len(tools))
+        return ToolRoute(
+            tools=tools,
+            categories=categories,
+            fallback=False,
+            sent_tokens=sent_tokens,
+            saved_tokens=total_tokens - sent_tokens,
+        )
+
+    def _remember(self, thread_id: str, categories: FrozenSet[str]):
+        self._last[thread_id] = categories
+        self._last.move_to_end(thread_id)
+        while len(self._last) > TOOL_ROUTING_MEMORY_SIZE:
+            self._last.popitem(last=False)
+
+
+# 创建全局实例
+tool_router = ToolRouter()
@@ -19,13 +19,15 @@ from app.tools.api.scheduledEmail_tools import (
 )
 from app.tools.api.text2image import generate_image_from_text
 from app.tools.community.visitors import create_visitor
+from app.tools.execution import with_execution_limits
 
 # 未来如果有其他工具文件，继续在这里导入
 # from app.tools.wallet_tools import query_wallet_balance, transfer_money
 # from app.tools.order_tools import create_order, cancel_order
 
 # 导出所有工具的统一列表
-all_tools = [
+# 每个工具带有并发上限和超时（见 app/tools/execution.py），模型一步返回多个工具调用时并发执行
+all_tools = with_execution_limits([
     query_unpaid_bills,
     get_user_notifications,
     send_private_messages,
@@ -43,4 +45,4 @@ all_tools = [
     create_visitor,
     generate_image_from_text,
     # 以后新增工具直接在这里添加
-]
+])
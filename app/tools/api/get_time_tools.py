@@ -1,11 +1,10 @@
 import json
 import aiohttp
 from langchain_core.tools import tool
-from uvicorn.main import logger
 from app.utils.http_client import http_client
 from datetime import datetime
 
 @tool
 async def get_time() -> str:
-    """获取当前时间"""
+    """获取当前时间（用户消息前的环境信息中已给出当前时间，精确到分钟，一般不需要调用）"""
     return json.dumps(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ensure_ascii=False)
\ No newline at end of file
@@ -1,17 +1,20 @@
 import os
 import json
 import asyncio
-import aiohttp
 from typing import Optional
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+from app.utils.outbound_http import outbound_http
+from app.utils.context import get_request_user_id, get_request_session_id
+from app.services.image_jobs import image_jobs
+from app.utils.logger import logger
 
 load_dotenv()
 
 # 从环境变量获取配置
 API_KEY = os.getenv("API_KEY")
 CREATE_TEXT_URL = os.getenv("QWEN_CREATE_TEXT_URL")
-GET_RESULT_URL = os.getenv("QWEN_GET_RESULT_URL")
+GET_RESULT_URL = os.getenv("QWEN_GET_RESULT_URL")  # 后台轮询使用（见 app/services/image_jobs.py）
 
 
 @tool
@@ -27,7 +30,7 @@ async def generate_image_from_text(
         n: 生成数量, 默认为 1 (API限制通常为1-4)
 
     Returns:
-        生成的图片URL的JSON字符串
+        任务 ID 的JSON字符串（图片生成后推送给用户）；非流式调用时为生成的图片URL
     """
     if not API_KEY or not CREATE_TEXT_URL or not GET_RESULT_URL:
         return json.dumps(
@@ -51,93 +54,59 @@ async def generate_image_from_text(
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            # 1. 提交任务
-            async with session.post(
-                CREATE_TEXT_URL, headers=headers, json=payload
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    return json.dumps(
-                        {
-                            "success": False,
-                            "error": "API Error",
-                            "message": f"Failed to submit task. Status: {response.status}",
-                            "detail": error_text,
-                        },
-                        ensure_ascii=False,
-                    )
-
-                result = await response.json()
-                if "output" not in result or "task_id" not in result["output"]:
-                    return json.dumps(
-                        {
-                            "success": False,
-                            "error": "Invalid Response",
-                            "message": "Task ID not found in response",
-                            "detail": result,
-                        },
-                        ensure_ascii=False,
-                    )
-
-                task_id = result["output"]["task_id"]
-                print(f"Image generation task submitted. Task ID: {task_id}")
-
-            # 2. 轮询结果
-            task_status = "PENDING"
-            wait_time = 1
-            max_retries = 30  # 30 * (1~2s) approx 60s max wait
-
-            for attempt in range(max_retries):
-                await asyncio.sleep(wait_time)
-
-                check_url = f"{GET_RESULT_URL}/{task_id}"
-                async with session.get(check_url, headers=headers) as check_response:
-                    if check_response.status != 200:
-                        # 简单的重试逻辑或直接报错
-                        continue
-
-                    check_result = await check_response.json()
-
-                    if "output" in check_result:
-                        task_status = check_result["output"]["task_status"]
-
-                        if task_status == "SUCCEEDED":
-                            # 成功，返回结果
-                            # result format: output: { task_status: "SUCCEEDED", results: [ { url: "..." } ] }
-                            if "results" in check_result["output"]:
-                                return json.dumps(
-                                    {
-                                        "success": True,
-                                        "task_id": task_id,
-                                        "images": check_result["output"]["results"],
-                                    },
-                                    ensure_ascii=False,
-                                )
-                            else:
-                                return json.dumps(
-                                    {
-                                        "success": False,
-                                        "error": "No Results",
-                                        "message": "Task succeeded but no image results found.",
-                                    },
-                                    ensure_ascii=False,
-                                )
-
-                        elif task_status == "FAILED":
-                            return json.dumps(
-                                {
-                                    "success": False,
-                                    "error": "Generation Failed",
-                                    "message": check_result["output"].get(
-                                        "message", "Unknown error"
-                                    ),
-                                },
-                                ensure_ascii=False,
-                            )
+        # 1. 提交任务
+        async with outbound_http.post(
+            CREATE_TEXT_URL, headers=headers, json=payload
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                return json.dumps(
+                    {
+                        "success": False,
+                        "error": "API Error",
+                        "message": f"Failed to submit task. Status: {response.status}",
+                        "detail": error_text,
+                    },
+                    ensure_ascii=False,
+                )
+
+            result = await response.json()
+            if "output" not in result or "task_id" not in result["output"]:
+                return json.dumps(
+                    {
+                        "success": False,
+                        "error": "Invalid Response",
+                        "message": "Task ID not found in response",
+                        "detail": result,
+                    },
+                    ensure_ascii=False,
+                )
+
+            task_id = result["output"]["task_id"]
+            logger.info("Image generation task submitted. Task ID: {}", task_id)
+
+        # 2. 交给后台轮询，不占用本轮对话
+        user_id = get_request_user_id()
+        job = image_jobs.submit(
+            task_id, prompt, user_id=user_id, session_id=get_request_session_id()
+        )
 
-                        # else PENDING or RUNNING, continue loop
+        if user_id and image_jobs.can_notify:
+            # 图片生成完成后会通过 WebSocket 推送 image_result 消息
+            return json.dumps(
+                {
+                    "success": True,
+                    "task_id": task_id,
+                    "status": "PENDING",
+                    "message": "图片正在生成中，完成后会自动发送给用户，请告知用户稍等片刻。",
+                },
+                ensure_ascii=False,
+            )
 
+        # 没有推送目标（如非流式接口），等待结果
+        try:
+            return json.dumps(await image_jobs.wait(job), ensure_ascii=False)
+        except asyncio.TimeoutError:
             return json.dumps(
                 {
                     "success": False,
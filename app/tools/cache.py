@@ -0,0 +1,235 @@
+"""
+只读工具的结果缓存
+
+天气、热榜、百科、搜索等只读工具在短时间内经常被不同用户以相同参数重复调用，
+每次都请求上游 API 既慢又浪费配额。本模块提供 cached_tool 装饰器，放在 @tool 下面使用：
+
+    @tool
+    @cached_tool(ttl=600)
+    async def web_search(query: str): ...
+
+- 每个工具独立的 TTL 和 LRU 容量
+- scope="global" 所有用户共享结果；scope="user" 按请求 token 隔离（结果依赖登录用户时使用），
+  scope 也可以是一个函数，根据调用参数决定
+- 相同 key 的并发调用只会真正执行一次，其他调用等待同一个结果（防击穿）
+- 以 "Error" 开头或 success=False 的结果不缓存
+- TOOL_METADATA 中声明了 "mutating": True 的工具禁止缓存
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+
+from app.tools.tool_metadata import is_mutating_tool
+from app.utils.context import get_request_token
+from app.utils.metrics import counter
+
+load_dotenv()
+
+# 设为 false 时关闭所有工具缓存（排查问题时使用）
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+# 每个工具默认最多缓存的结果数
+TOOL_CACHE_MAXSIZE = int(os.getenv("TOOL_CACHE_MAXSIZE", "256"))
+
+tool_cache_requests_total = counter(
+    "tool_cache_requests_total",
+    "工具缓存请求数（outcome: hit/miss/coalesced/bypass）",
+    ("tool", "outcome"),
+)
+
+Scope = Union[str, Callable[[dict], str]]
+
+
+def _is_cacheable(result: Any) -> bool:
+    """错误结果不缓存，下次调用重新请求上游"""
+    if not isinstance(result, str):
+        return result is not None
+    if result.startswith("Error"):
+        return False
+    try:
+        data = json.loads(result)
+    except ValueError:
+        return True
+    return not (isinstance(data, dict) and data.get("success") is False)
+
+
+def _token_scope() -> str:
+    token = get_request_token()
+    if not token:
+        return "anonymous"
+    # 不在内存中保存原始 token
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+class ToolCache:
+    """单个工具的 LRU + TTL 缓存"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # key -> (过期时间, 结果)，按最近使用排序
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # 正在执行的调用，相同 key 的后续调用等待它的结果
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Tuple, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def call(self, key: Tuple, func: Callable, *args, **kwargs) -> Any:
+        """
+        带缓存地执行一次调用
+
+        Args:
+            key: 缓存 key
+            func: 被缓存的工具协程函数
+        """
+        found, value = self.get(key)
+        if found:
+            tool_cache_requests_total.inc(tool=self.name, outcome="hit")
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            tool_cache_requests_total.inc(tool=self.name, outcome="coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 执行中的那次调用被取消了，由当前调用自己执行；自己被取消则继续抛出
+                if not future.cancelled():
+                    raise
+
+        tool_cache_requests_total.inc(tool=self.name, outcome="miss")
+        future = asyncio.get_running_loop().create_future()
+        # 没有等待者时异常不会被读取，避免 "exception was never retrieved" 警告
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if _is_cacheable(value):
+            self.put(key, value)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "ttl": self.ttl,
+            "maxsize": self.maxsize,
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": tool_cache_requests_total.get(tool=self.name, outcome="hit"),
+            "misses": tool_cache_requests_total.get(tool=self.name, outcome="miss"),
+            "coalesced": tool_cache_requests_total.get(
+                tool=self.name, outcome="coalesced"
+            ),
+        }
+
+
+# 工具名称 -> 缓存
+_caches: Dict[str, ToolCache] = {}
+
+
+def cached_tool(
+    ttl: float,
+    scope: Scope = "global",
+    maxsize: int = TOOL_CACHE_MAXSIZE,
+    name: Optional[str] = None,
+):
+    """
+    工具结果缓存装饰器（放在 @tool 下面）
+
+    Args:
+        ttl: 结果有效期（秒）
+        scope: "global" / "user"，或根据调用参数返回二者之一的函数
+        maxsize: 最多缓存的结果数，超出时淘汰最久未使用的
+        name: 工具名称，默认取函数名
+
+    Raises:
+        ValueError: 工具在 TOOL_METADATA 中声明为 mutating
+    """
+
+    def decorator(func):
+        tool_name = name or func.__name__
+        if is_mutating_tool(tool_name):
+            raise ValueError(f"工具 {tool_name} 声明为 mutating，不能缓存结果")
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"cached_tool 只支持异步工具: {tool_name}")
+
+        cache = _caches[tool_name] = ToolCache(tool_name, ttl, maxsize)
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not TOOL_CACHE_ENABLED:
+                tool_cache_requests_total.inc(tool=tool_name, outcome="bypass")
+                return await func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+
+            resolved = scope(arguments) if callable(scope) else scope
+            owner = _token_scope() if resolved == "user" else "*"
+            key = (owner, json.dumps(arguments, sort_keys=True, default=str))
+            return await cache.call(key, func, *args, **kwargs)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def get_tool_cache(tool_name: str) -> Optional[ToolCache]:
+    """获取某个工具的缓存（未使用 cached_tool 时返回 None）"""
+    return _caches.get(tool_name)
+
+
+def clear_tool_caches():
+    """清空所有工具缓存"""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def tool_cache_stats() -> dict:
+    """
+    获取所有工具缓存的统计信息
+
+    Returns:
+        {工具名称: {ttl, maxsize, size, inflight, hits, misses, coalesced}}
+    """
+    return {tool_name: cache.stats() for tool_name, cache in _caches.items()}
@@ -0,0 +1,173 @@
+"""
+工具执行限制
+
+模型在一步中返回多个工具调用时（如同时查询账单、通知和天气），LangGraph 的 ToolNode 会并发执行它们。
+并发执行需要边界，否则一次突发就会把某个上游打满。本模块给 all_tools 中的每个工具包一层：
+
+- 每个工具一个信号量，限制同一工具同时执行的次数
+- 每个上游（Banked 后端、SerpApi、维基百科……）一个信号量，多个工具共用同一上游时共享上限
+- 每轮对话一个截止时间（start_turn_deadline 设置），排队和执行都计入，超时的工具返回错误文本，
+  模型可以据此回答而不是让整轮对话卡住
+"""
+
+import asyncio
+import functools
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.services.image_jobs import IMAGE_JOB_TIMEOUT
+from app.tools.tool_metadata import TOOL_METADATA
+from app.utils.metrics import counter, histogram
+
+load_dotenv()
+
+# 每轮对话中工具调用的总时间预算（秒）
+TOOL_TURN_DEADLINE = float(os.getenv("TOOL_TURN_DEADLINE", "60"))
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    """单个工具的执行策略"""
+
+    concurrency: int = 20  # 同一工具同时执行的上限
+    upstream: str = "banked"  # 工具访问的上游，决定共享哪个上游信号量
+    timeout: float = 30  # 单次执行超时（秒）
+
+
+# 各上游同时执行的工具调用上限
+UPSTREAM_CONCURRENCY: Dict[str, int] = {
+    "banked": 50,
+    "serpapi": 10,
+    "wikipedia": 10,
+    "tenapi": 5,
+    "domainsdb": 5,
+    "52vmy": 10,
+    "dashscope": 10,
+    "local": 1000,
+}
+
+# 未列出的工具使用默认策略（访问 Banked 后端）
+TOOL_POLICIES: Dict[str, ToolPolicy] = {
+    "get_time": ToolPolicy(upstream="local", timeout=5),
+    "get_weather": ToolPolicy(concurrency=10, upstream="52vmy", timeout=20),
+    "web_search": ToolPolicy(concurrency=10, upstream="serpapi", timeout=20),
+    "wikipedia_search": ToolPolicy(concurrency=10, upstream="wikipedia", timeout=20),
+    "toutiao_hot_news": ToolPolicy(concurrency=5, upstream="tenapi", timeout=15),
+    "search_domains_info": ToolPolicy(concurrency=5, upstream="domainsdb", timeout=15),
+    # 没有 WebSocket 推送目标时工具会等待图片生成完成（最长 IMAGE_JOB_TIMEOUT），留出余量
+    "generate_image_from_text": ToolPolicy(
+        concurrency=5, upstream="dashscope", timeout=IMAGE_JOB_TIMEOUT + 10
+    ),
+}
+
+DEFAULT_TOOL_POLICY = ToolPolicy()
+
+tool_calls_total = counter(
+    "tool_calls_total",
+    "工具调用次数（outcome: ok/error/timeout/deadline）",
+    ("tool", "outcome"),
+)
+# 预先创建所有工具的序列，没有调用过的工具也会以 0 出现在 /metrics 中
+for _tool_name in TOOL_METADATA:
+    for _outcome in ("ok", "error", "timeout", "deadline"):
+        tool_calls_total.inc(0, tool=_tool_name, outcome=_outcome)
+tool_duration_seconds = histogram(
+    "tool_duration_seconds", "工具执行耗时（秒，不含排队）", ("tool",)
+)
+tool_wait_seconds = histogram(
+    "tool_wait_seconds", "工具等待并发名额的时间（秒）", ("tool",)
+)
+
+# 当前对话轮次的截止时间（time.monotonic()），None 表示不限制
+_turn_deadline: ContextVar[Optional[float]] = ContextVar(
+    "turn_deadline", default=None
+)
+
+_upstream_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def start_turn_deadline(seconds: float = TOOL_TURN_DEADLINE):
+    """
+    设置本轮对话中工具调用的截止时间（每轮开始时调用）
+
+    Args:
+        seconds: 从现在起的时间预算（秒）
+    """
+    _turn_deadline.set(time.monotonic() + seconds)
+
+
+def _upstream_semaphore(upstream: str) -> asyncio.Semaphore:
+    semaphore = _upstream_semaphores.get(upstream)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY.get(upstream, 10))
+        _upstream_semaphores[upstream] = semaphore
+    return semaphore
+
+
+def _limited(name: str, coroutine):
+    """给工具协程加上并发上限和超时"""
+    policy = TOOL_POLICIES.get(name, DEFAULT_TOOL_POLICY)
+    tool_semaphore = asyncio.Semaphore(policy.concurrency)
+    upstream_semaphore = _upstream_semaphore(policy.upstream)
+
+    async def run(queued_at: float, *args, **kwargs):
+        async with tool_semaphore, upstream_semaphore:
+            tool_wait_seconds.observe(time.monotonic() - queued_at, tool=name)
+            with tool_duration_seconds.time(tool=name):
+                return await coroutine(*args, **kwargs)
+
+    @functools.wraps(coroutine)
+    async def wrapper(*args, **kwargs):
+        timeout = policy.timeout
+        deadline = _turn_deadline.get()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                tool_calls_total.inc(tool=name, outcome="deadline")
+                return f"Error: 本轮对话的工具调用已超过时间限制，未执行 {name}"
+            timeout = min(timeout, remaining)
+
+        scope = asyncio.timeout(timeout)
+        try:
+            async with scope:
+                result = await run(time.monotonic(), *args, **kwargs)
+        except asyncio.TimeoutError:
+            if not scope.expired():
+                # 工具内部抛出的超时（如 aiohttp、image_jobs.wait），不是执行策略的超时
+                tool_calls_total.inc(tool=name, outcome="error")
+                raise
+            tool_calls_total.inc(tool=name, outcome="timeout")
+            return f"Error: 工具 {name} 执行超时（{timeout:.1f} 秒）"
+        except Exception:
+            tool_calls_total.inc(tool=name, outcome="error")
+            raise
+
+        tool_calls_total.inc(tool=name, outcome="ok")
+        return result
+
+    return wrapper
+
+
+def with_execution_limits(tools: List) -> List:
+    """
+    给工具列表中的每个异步工具加上执行限制
+
+    Args:
+        tools: @tool 创建的工具列表
+
+    Returns:
+        新的工具列表（原工具对象不变）
+    """
+    limited = []
+    for t in tools:
+        coroutine = getattr(t, "coroutine", None)
+        if coroutine is None:
+            limited.append(t)
+            continue
+        limited.append(t.model_copy(update={"coroutine": _limited(t.name, coroutine)}))
+    return limited
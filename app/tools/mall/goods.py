@@ -2,9 +2,12 @@ import json
 from typing import Optional
 from langchain_core.tools import tool
 from app.utils.http_client import http_client
+from app.tools.cache import cached_tool
 
 
+# 商品列表通过 Banked 后端按登录用户查询，按用户隔离
 @tool
+@cached_tool(ttl=60, scope="user")
 async def search_goods(
     keyword: Optional[str] = None,
     category_id: Optional[int] = 0,
@@ -1,6 +1,9 @@
 """
 工具元数据映射表
 用于前端展示工具调用的可读信息
+
+"mutating": True 表示该工具会产生副作用（写入、发送、扣款等），
+这类工具的结果不能被缓存（见 app/tools/cache.py）
 """
 
 # 工具名称到可读信息的映射
@@ -16,7 +19,8 @@ TOOL_METADATA = {
         "display_name": "标记已读",
         "description": "正在标记通知为已读",
         "icon": "check",
-        "category": "notification"
+        "category": "notification",
+        "mutating": True
     },
     
     # 账单相关
@@ -30,7 +34,8 @@ TOOL_METADATA = {
         "display_name": "支付账单",
         "description": "正在支付账单",
         "icon": "bill",
-        "category": "bill"
+        "category": "bill",
+        "mutating": True
     },
     
     # 私信相关
@@ -38,7 +43,8 @@ TOOL_METADATA = {
         "display_name": "发送私信",
         "description": "正在发送私信",
         "icon": "message",
-        "category": "message"
+        "category": "message",
+        "mutating": True
     },
     
     # 停车相关
@@ -52,7 +58,8 @@ TOOL_METADATA = {
         "display_name": "预约停车位",
         "description": "正在预约停车位",
         "icon": "parking",
-        "category": "parking"
+        "category": "parking",
+        "mutating": True
     },
     
     # 报修相关
@@ -60,7 +67,8 @@ TOOL_METADATA = {
         "display_name": "提交报修",
         "description": "正在提交报修请求",
         "icon": "repair",
-        "category": "repair"
+        "category": "repair",
+        "mutating": True
     },
     "query_repair_status": {
         "display_name": "查询报修状态",
@@ -90,7 +98,8 @@ TOOL_METADATA = {
         "display_name": "发送定时邮件",
         "description": "正在发送定时邮件",
         "icon": "email",
-        "category": "email"
+        "category": "email",
+        "mutating": True
     },
     "get_scheduled_email": {
         "display_name": "查询定时邮件",
@@ -102,7 +111,8 @@ TOOL_METADATA = {
         "display_name": "删除定时邮件",
         "description": "正在删除定时邮件",
         "icon": "email",
-        "category": "email"
+        "category": "email",
+        "mutating": True
     },
     
     # 搜索相关
@@ -136,7 +146,8 @@ TOOL_METADATA = {
         "display_name": "文生图",
         "description": "正在根据描述生成图片",
         "icon": "image",
-        "category": "image"
+        "category": "image",
+        "mutating": True
     },
     
     # 访客相关
@@ -144,7 +155,8 @@ TOOL_METADATA = {
         "display_name": "访客登记",
         "description": "正在登记访客信息",
         "icon": "visitor",
-        "category": "visitor"
+        "category": "visitor",
+        "mutating": True
     },
     
     # 商城相关
@@ -174,7 +186,8 @@ TOOL_METADATA = {
         "display_name": "更新用户资料",
         "description": "正在更新用户资料",
         "icon": "user",
-        "category": "user"
+        "category": "user",
+        "mutating": True
     },
 }
 
@@ -210,3 +223,15 @@ def get_all_tools_metadata() -> dict:
     """
     return TOOL_METADATA
 
+
+def is_mutating_tool(tool_name: str) -> bool:
+    """
+    工具是否会产生副作用
+
+    Args:
+        tool_name: 工具名称
+
+    Returns:
+        声明了 "mutating": True 时返回 True
+    """
+    return bool(TOOL_METADATA.get(tool_name, {}).get("mutating", False))
@@ -5,6 +5,7 @@ JWT 认证中间件 - 统一返回格式
 from fastapi import Header, HTTPException
 from app.utils.JWTutils.jwt_helper import get_user_id
 import jwt
+from app.utils.logger import logger, sampled
 
 
 def verify_token(authorization: str = Header(None)) -> str:
@@ -21,7 +22,7 @@ def verify_token(authorization: str = Header(None)) -> str:
         HTTPException: 401 - token 无效或过期
     """
     if not authorization:
-        print("没认证成功")
+        logger.debug("请求缺少 Authorization header")
         raise HTTPException(
             status_code=401,
             detail={"code": 401, "message": "缺少 Authorization header", "data": None},
@@ -30,13 +31,10 @@ def verify_token(authorization: str = Header(None)) -> str:
     # 去掉 "Bearer " 前缀
     token = authorization.replace("Bearer ", "").strip()
 
-    print(f"token is {token}")
-
     try:
         # 解码并验证 token（会自动检查过期时间）
         user_id = get_user_id(token)
-
-        print(f"------------{user_id}------------")
+        sampled.debug("认证成功: user_id={}", user_id)
         return user_id
 
     except jwt.ExpiredSignatureError:
@@ -1,16 +1,83 @@
 """
 JWT 解析工具 - 最精简版本
+
+每个 REST 请求和 WebSocket 认证都要校验一次 token，同一个 token 会被反复使用，
+这里用一个有上限的 LRU 缓存保存校验通过的 token → (user_id, 过期时间)，过期后自动失效。
 """
 
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
 import jwt
 from dotenv import load_dotenv
 
+from app.utils.metrics import counter
+
 load_dotenv()
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = "HS512"  # Java 后端使用 HS512
 
+# 缓存的 token 数上限
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+# token 没有 exp 时的缓存时间（秒）
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", "300"))
+
+jwt_cache_requests_total = counter(
+    "jwt_cache_requests_total", "token 校验缓存请求数（outcome: hit/miss）", ("outcome",)
+)
+
+
+class TokenCache:
+    """校验通过的 token 缓存（verify_token 在线程池中执行，需要加锁）"""
+
+    def __init__(self, maxsize: int = JWT_CACHE_SIZE):
+        self.maxsize = maxsize
+        # sha256(token) -> (user_id, 过期时间戳)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # 不在内存中保存原始 token
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def put(self, token: str, user_id: str, expires_at: float):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 创建全局实例
+token_cache = TokenCache()
+
 
 def decode_token(token: str) -> dict:
     """
@@ -31,15 +98,28 @@ def decode_token(token: str) -> dict:
 
 def get_user_id(token: str) -> str:
     """
-    从 token 中提取用户 ID
+    从 token 中提取用户 ID（校验结果缓存到 token 过期为止）
 
     Args:
         token: JWT token 字符串
 
     Returns:
         用户 ID
+
+    Raises:
+        jwt.ExpiredSignatureError: token 已过期
+        jwt.InvalidTokenError: token 无效
     """
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        jwt_cache_requests_total.inc(outcome="hit")
+        return user_id
+
+    jwt_cache_requests_total.inc(outcome="miss")
     payload = decode_token(token)
+    user_id = str(payload.get("userId") or payload.get("sub") or payload.get("id"))
 
-    print(f"-----userId------{payload.get('userId')}")
-    return str(payload.get("userId") or payload.get("sub") or payload.get("id"))
+    exp = payload.get("exp")
+    expires_at = float(exp) if exp is not None else time.time() + JWT_CACHE_TTL
+    token_cache.put(token, user_id, expires_at)
+    return user_id
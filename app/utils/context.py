@@ -1,5 +1,5 @@
 """
-上下文管理器 - 用于在异步调用链中传递请求上下文信息（如 token）
+上下文管理器 - 用于在异步调用链中传递请求上下文信息（如 token、用户和会话）
 """
 
 from contextvars import ContextVar
@@ -17,3 +17,26 @@ def set_request_token(token: str):
 def get_request_token() -> Optional[str]:
     """获取当前请求的 token"""
     return request_token.get()
+
+
+# 当前对话轮次的用户和会话（供需要异步推送结果的工具使用）
+request_user_id: ContextVar[Optional[str]] = ContextVar("request_user_id", default=None)
+request_session_id: ContextVar[Optional[int]] = ContextVar(
+    "request_session_id", default=None
+)
+
+
+def set_request_session(user_id: str, session_id: Optional[int]):
+    """设置当前对话轮次的用户和会话"""
+    request_user_id.set(user_id)
+    request_session_id.set(session_id)
+
+
+def get_request_user_id() -> Optional[str]:
+    """获取当前对话轮次的用户 ID"""
+    return request_user_id.get()
+
+
+def get_request_session_id() -> Optional[int]:
+    """获取当前对话轮次的会话 ID"""
+    return request_session_id.get()
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import time
 import aiohttp
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
@@ -8,13 +10,153 @@ load_dotenv()
 
 Base_Url = os.getenv("Banked_URL")
 
+# 连接池配置（可通过环境变量调整）
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # 连接总数上限
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "50"))  # 单主机连接上限
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # DNS 缓存时间（秒）
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # 空闲连接保活时间（秒）
+
+
+class PoolStats:
+    """
+    连接池统计
+
+    通过 aiohttp 的 TraceConfig 钩子统计：
+    - requests: 发出的请求数
+    - connections_created: 新建的 TCP 连接数
+    - connections_reused: 复用已有连接的次数（池命中）
+    - queued: 因连接数达到上限而排队等待的次数
+    - queued_seconds: 排队等待的累计时间
+    - requests_in_flight: 正在进行的请求数（发出请求到收到响应头或出错）
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.queued = 0
+        self.queued_seconds = 0.0
+        self.requests_in_flight = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """创建挂载统计钩子的 TraceConfig"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.requests += 1
+            self.requests_in_flight += 1
+
+        async def on_request_done(session, ctx, params):
+            self.requests_in_flight -= 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.connections_reused += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            self.queued += 1
+            ctx.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(session, ctx, params):
+            queued_at = getattr(ctx, "queued_at", None)
+            if queued_at is not None:
+                self.queued_seconds += time.perf_counter() - queued_at
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_done)
+        trace_config.on_request_exception.append(on_request_done)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        return trace_config
+
+    def snapshot(self) -> dict:
+        """获取统计快照"""
+        acquired = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": self.connections_reused / acquired if acquired else 0.0,
+            "queued": self.queued,
+            "queued_seconds": self.queued_seconds,
+            "requests_in_flight": self.requests_in_flight,
+        }
+
 
 class HttpClient:
-    """异步 HTTP 客户端封装"""
+    """
+    异步 HTTP 客户端封装
+
+    内部持有一个长期存活的 aiohttp.ClientSession（带连接池和 keep-alive），
+    由应用启动/关闭时的 start()/close() 管理生命周期。
+    """
 
-    def __init__(self, base_url: str = Base_Url, timeout: int = 10):
+    def __init__(
+        self,
+        base_url: str = Base_Url,
+        timeout: int = 10,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache: int = HTTP_DNS_CACHE_TTL,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+    ):
         self.base_url = base_url
         self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.stats = PoolStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 保证并发的首个请求只创建一个 session（否则多余的 session 和连接器会泄漏）
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """创建共享的 ClientSession（应用启动时调用）"""
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = self._create_session()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """创建连接池和 ClientSession"""
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[self.stats.trace_config()],
+        )
+
+    async def close(self):
+        """关闭共享的 ClientSession（应用关闭时调用）"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享 session，未启动时（如脚本中直接使用）自动创建"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    def pool_stats(self) -> dict:
+        """
+        获取连接池统计信息
+
+        Returns:
+            请求数、新建/复用连接数、排队次数、正在进行的请求数等
+        """
+        snapshot = self.stats.snapshot()
+        snapshot.update({"limit": self.limit, "limit_per_host": self.limit_per_host})
+        return snapshot
 
     def _prepare_headers(
         self, headers: Optional[Dict[str, str]] = None
@@ -40,6 +182,24 @@ class HttpClient:
 
         return final_headers
 
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> Any:
+        """通过共享 session 发送请求并解析 JSON"""
+        url = f"{self.base_url}{endpoint}"
+        final_headers = self._prepare_headers(headers)
+        session = await self._get_session()
+
+        async with session.request(
+            method, url, headers=final_headers, **kwargs
+        ) as response:
+            response.raise_for_status()  # 如果状态码不是 2xx，抛出异常
+            return await response.json()
+
     async def get(
         self,
         endpoint: str,
@@ -57,15 +217,7 @@ class HttpClient:
         Returns:
             解析后的 JSON 数据
         """
-        url = f"{self.base_url}{endpoint}"
-        final_headers = self._prepare_headers(headers)
-
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            async with session.get(
-                url, params=params, headers=final_headers
-            ) as response:
-                response.raise_for_status()  # 如果状态码不是 2xx，抛出异常
-                return await response.json()
+        return await self._request("GET", endpoint, headers=headers, params=params)
 
     async def post(
         self,
@@ -86,15 +238,9 @@ class HttpClient:
         Returns:
             解析后的 JSON 数据
         """
-        url = f"{self.base_url}{endpoint}"
-        final_headers = self._prepare_headers(headers)
-
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            async with session.post(
-                url, data=data, json=json_data, headers=final_headers
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await self._request(
+            "POST", endpoint, headers=headers, data=data, json=json_data
+        )
 
     async def put(
         self,
@@ -104,15 +250,9 @@ class HttpClient:
         headers: Optional[Dict[str, str]] = None,
     ) -> Any:
         """发送 PUT 请求"""
-        url = f"{self.base_url}{endpoint}"
-        final_headers = self._prepare_headers(headers)
-
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            async with session.put(
-                url, data=data, json=json_data, headers=final_headers
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await self._request(
+            "PUT", endpoint, headers=headers, data=data, json=json_data
+        )
 
     async def delete(
         self,
@@ -121,15 +261,7 @@ class HttpClient:
         headers: Optional[Dict[str, str]] = None,
     ) -> Any:
         """发送 DELETE 请求"""
-        url = f"{self.base_url}{endpoint}"
-        final_headers = self._prepare_headers(headers)
-
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            async with session.delete(
-                url, params=params, headers=final_headers
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await self._request("DELETE", endpoint, headers=headers, params=params)
 
 
 # 创建全局实例
@@ -0,0 +1,123 @@
+"""
+日志
+
+基于 loguru，所有模块统一使用：
+
+    from app.utils.logger import logger
+
+    logger.info("用户 {} 已连接", user_id)
+
+- 写日志只是把记录放入队列（enqueue=True），由后台线程输出，不阻塞事件循环
+- 级别由 LOG_LEVEL 控制；LOG_FORMAT=json 时每行输出一条 JSON，便于日志系统采集
+- 输出前对 JWT、Bearer token、API key 等敏感信息脱敏
+- 高频事件可以按比例采样：logger.bind(sample=0.01).debug(...) 只输出约 1% 的记录，
+  默认比例为 LOG_SAMPLE_RATE（sampled 即 logger.bind(sample=LOG_SAMPLE_RATE)）
+- 尽量使用 "{}" 占位符而不是 f-string，级别未开启时不会格式化参数
+"""
+
+import os
+import random
+import re
+import sys
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# text | json
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# 同时写入文件，为空只输出到 stderr
+LOG_FILE = os.getenv("LOG_FILE", "")
+# 高频事件（连接建立/断开、认证成功等）的采样比例
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{line}</cyan> | <level>{message}</level>"
+)
+
+# 需要脱敏的内容：(正则, 替换文本)
+_REDACTIONS = [
+    # JWT（header.payload.signature，header 以 eyJ 开头）
+    (re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*"), "[REDACTED_JWT]"),
+    (re.compile(r"(?i)(bearer\s+)[\w.~+/=-]+"), r"\1[REDACTED]"),
+    # sk- 开头的 API key（DashScope / OpenAI 等）
+    (re.compile(r"\bsk-[\w-]{8,}"), "[REDACTED_KEY]"),
+    # key=value / "key": "value" 形式的密钥参数
+    # 键名前后要求单词边界，max_tokens、prompt_tokens、tokens_per_sec 等统计字段不会被误伤
+    (
+        re.compile(
+            r"(?i)(\b(?:api[_-]?key|(?:access_?|refresh_?|id_?)?token|(?:client_?)?secret"
+            r"|password|authorization)\b[\"']?\s*[:=]\s*[\"']?)"
+            r"[^\s\"'&,}]+"
+        ),
+        r"\1[REDACTED]",
+    ),
+]
+
+
+def redact(text: str) -> str:
+    """去掉文本中的 token、密钥等敏感信息"""
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _patch(record):
+    record["message"] = redact(record["message"])
+    for key, value in record["extra"].items():
+        if isinstance(value, str):
+            record["extra"][key] = redact(value)
+
+
+def _filter(record) -> bool:
+    # 带 sample 的记录按比例输出
+    rate = record["extra"].get("sample")
+    return rate is None or random.random() < rate
+
+
+def setup_logging():
+    """按环境变量配置日志输出（导入本模块时自动调用一次）"""
+    logger.remove()
+    logger.configure(patcher=_patch)
+
+    serialize = LOG_FORMAT == "json"
+    logger.add(
+        sys.stderr,
+        level=LOG_LEVEL,
+        format=TEXT_FORMAT,
+        filter=_filter,
+        serialize=serialize,
+        enqueue=True,
+        backtrace=False,
+        diagnose=False,
+    )
+    if LOG_FILE:
+        logger.add(
+            LOG_FILE,
+            level=LOG_LEVEL,
+            format=TEXT_FORMAT,
+            filter=_filter,
+            serialize=serialize,
+            enqueue=True,
+            rotation="100 MB",
+            retention="7 days",
+            backtrace=False,
+            diagnose=False,
+        )
+
+
+# 高频事件使用的采样 logger
+sampled = logger.bind(sample=LOG_SAMPLE_RATE)
+
+
+async def flush_logging():
+    """等待队列中的日志全部输出（应用关闭时调用）"""
+    await logger.complete()
+
+
+setup_logging()
+
+__all__ = ["logger", "sampled", "redact", "setup_logging", "flush_logging"]
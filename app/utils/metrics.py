@@ -0,0 +1,332 @@
+"""
+进程内指标
+
+提供 Counter / Gauge / Histogram 三种基础指标，按标签（labels）分组统计。
+所有指标注册到全局 REGISTRY，由 render_prometheus() 按 Prometheus 文本格式导出（/metrics）。
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+from app.utils.logger import logger
+
+# 默认的延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Gauge 回调的返回值：单个值，或 {标签值元组: 值}（有标签时）
+GaugeValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+class _Metric:
+    """指标基类：名称、说明、标签名"""
+
+    type = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        # 指标可能在线程池（如数据库查询）中更新，用锁保证一致
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """
+    只增不减的计数器
+
+    也可以传入 fn 回调，读取其他组件自己维护的累计值（如连接池统计），返回值格式同 Gauge
+    """
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], "GaugeValue"]] = None,
+    ):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        if self._fn is not None:
+            return self.samples().get(self._key(labels), 0)
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        if self._fn is not None:
+            value = self._fn()
+            return value if isinstance(value, dict) else {(): value}
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(_Metric):
+    """
+    可增可减的瞬时值
+
+    也可以传入 fn 回调，在读取时实时计算（如当前连接数、队列长度）；
+    有标签时回调返回 {标签值元组: 值}
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], GaugeValue]] = None,
+    ):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self.samples().get(self._key(labels), 0)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        if self._fn is not None:
+            value = self._fn()
+            return value if isinstance(value, dict) else {(): value}
+        with self._lock:
+            return dict(self._values)
+
+
+class _HistogramValue:
+    """单组标签下的直方图数据"""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size  # 每个桶的计数（非累积，最后一个为 +Inf）
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    """分桶直方图，支持按桶插值估算分位数"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], _HistogramValue] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = _HistogramValue(len(self.buckets) + 1)
+            data.counts[index] += 1
+            data.count += 1
+            data.sum += value
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文：with histogram.time(query="x"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def percentile(self, quantile: float, **labels) -> Optional[float]:
+        """
+        估算分位数
+
+        Args:
+            quantile: 分位（0~1），如 0.95
+            labels: 标签
+
+        Returns:
+            估算值；没有数据时返回 None
+        """
+        data = self._values.get(self._key(labels))
+        if data is None or data.count == 0:
+            return None
+        return self._estimate(data, quantile)
+
+    def _estimate(self, data: _HistogramValue, quantile: float) -> float:
+        rank = quantile * data.count
+        cumulative = 0
+        lower = 0.0
+        for i, count in enumerate(data.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else lower
+            if count and cumulative + count >= rank:
+                if i >= len(self.buckets):
+                    # 落在 +Inf 桶，只能返回最大的有限边界
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = upper
+        return lower
+
+    def summary(self) -> Dict[Tuple[str, ...], dict]:
+        """每组标签的 count / sum / p50 / p95 / p99"""
+        with self._lock:
+            items = list(self._values.items())
+        return {
+            key: {
+                "count": data.count,
+                "sum": data.sum,
+                "p50": self._estimate(data, 0.5),
+                "p95": self._estimate(data, 0.95),
+                "p99": self._estimate(data, 0.99),
+            }
+            for key, data in items
+            if data.count
+        }
+
+    def samples(self) -> Dict[Tuple[str, ...], _HistogramValue]:
+        with self._lock:
+            return dict(self._values)
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type}")
+            return metric
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+
+# 全局指标注册表
+REGISTRY = MetricsRegistry()
+
+
+def counter(
+    name: str,
+    description: str,
+    labelnames: Sequence[str] = (),
+    fn: Optional[Callable[[], GaugeValue]] = None,
+) -> Counter:
+    """获取或创建计数器"""
+    return REGISTRY._get_or_create(Counter, name, description, labelnames, fn=fn)
+
+
+def gauge(
+    name: str,
+    description: str,
+    labelnames: Sequence[str] = (),
+    fn: Optional[Callable[[], GaugeValue]] = None,
+) -> Gauge:
+    """获取或创建 Gauge"""
+    return REGISTRY._get_or_create(Gauge, name, description, labelnames, fn=fn)
+
+
+def histogram(
+    name: str,
+    description: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """获取或创建直方图"""
+    return REGISTRY._get_or_create(Histogram, name, description, labelnames, buckets)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render_prometheus(registry: MetricsRegistry = REGISTRY) -> str:
+    """
+    按 Prometheus 文本格式（text/plain; version=0.0.4）导出所有指标
+
+    Args:
+        registry: 指标注册表
+
+    Returns:
+        指标文本
+    """
+    lines = []
+    for metric in registry.metrics():
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {description}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+
+        if isinstance(metric, Histogram):
+            for key, data in metric.samples().items():
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), data.counts):
+                    cumulative += count
+                    labels = _format_labels(
+                        metric.labelnames, key, f'le="{_format_value(bound)}"'
+                    )
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(data.sum)}")
+                lines.append(f"{metric.name}_count{labels} {data.count}")
+            continue
+
+        try:
+            samples = metric.samples()
+        except Exception as e:
+            # 回调出错不影响其他指标的导出
+            logger.warning("[Metrics] 读取指标 {} 失败: {}", metric.name, e)
+            continue
+        for key, value in samples.items():
+            labels = _format_labels(metric.labelnames, key)
+            lines.append(f"{metric.name}{labels} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,201 @@
+"""
+第三方 HTTP 会话池
+
+搜索、天气、文生图等工具访问的是第三方服务（SerpApi、维基百科、头条热榜等），
+与 Banked 后端的 http_client 分开管理：每个上游主机一个长期存活的 ClientSession，
+并配有独立的并发上限和超时，避免突发流量时为每次工具调用新建大量短连接。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from app.utils.http_client import (
+    PoolStats,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    http_client,
+)
+from app.utils.metrics import counter, gauge
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """单个上游主机的访问策略"""
+
+    concurrency: int = 10  # 同时进行的请求数上限
+    timeout: float = 15  # 单次请求总超时（秒）
+
+
+# 上游主机策略，key 匹配主机名本身或其子域名（如 wikipedia.org 匹配 zh.wikipedia.org）
+HOST_POLICIES: Dict[str, HostPolicy] = {
+    "serpapi.com": HostPolicy(concurrency=10, timeout=15),
+    "wikipedia.org": HostPolicy(concurrency=10, timeout=10),
+    "tenapi.cn": HostPolicy(concurrency=5, timeout=10),
+    "api.domainsdb.info": HostPolicy(concurrency=5, timeout=10),
+    "api.52vmy.cn": HostPolicy(concurrency=10, timeout=10),
+    "dashscope.aliyuncs.com": HostPolicy(concurrency=10, timeout=30),
+}
+
+DEFAULT_POLICY = HostPolicy()
+
+
+class _HostPool:
+    """单个上游主机的会话、并发信号量和统计"""
+
+    def __init__(self, host: str, policy: HostPolicy):
+        self.host = host
+        self.policy = policy
+        self.semaphore = asyncio.Semaphore(policy.concurrency)
+        self.stats = PoolStats()
+        self.in_flight = 0
+        self.waits = 0  # 因达到并发上限而等待的次数
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit_per_host=policy.concurrency,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ),
+            timeout=aiohttp.ClientTimeout(total=policy.timeout),
+            trace_configs=[self.stats.trace_config()],
+        )
+
+
+class OutboundSessionRegistry:
+    """按上游主机复用的 ClientSession 注册表"""
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, HostPolicy]] = None,
+        default_policy: HostPolicy = DEFAULT_POLICY,
+    ):
+        self.policies = HOST_POLICIES if policies is None else policies
+        self.default_policy = default_policy
+        self._pools: Dict[str, _HostPool] = {}
+
+    def _policy_for(self, host: str) -> HostPolicy:
+        for pattern, policy in self.policies.items():
+            if host == pattern or host.endswith(f".{pattern}"):
+                return policy
+        return self.default_policy
+
+    def _pool_for(self, url: str) -> _HostPool:
+        host = urlsplit(url).hostname or ""
+        pool = self._pools.get(host)
+        if pool is None or pool.session.closed:
+            pool = _HostPool(host, self._policy_for(host))
+            self._pools[host] = pool
+        return pool
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求（在主机并发上限内），用法与 aiohttp 一致：
+
+            async with outbound_http.get(url, params=params) as response:
+                data = await response.json()
+
+        Args:
+            method: HTTP 方法
+            url: 完整的请求地址
+            **kwargs: 透传给 aiohttp 的参数（params、json、headers 等）
+        """
+        pool = self._pool_for(url)
+        if pool.semaphore.locked():
+            pool.waits += 1
+
+        async with pool.semaphore:
+            pool.in_flight += 1
+            try:
+                async with pool.session.request(method, url, **kwargs) as response:
+                    yield response
+            finally:
+                pool.in_flight -= 1
+
+    def get(self, url: str, **kwargs):
+        """发送 GET 请求"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """发送 POST 请求"""
+        return self.request("POST", url, **kwargs)
+
+    async def close(self):
+        """关闭所有主机的会话（应用关闭时调用）"""
+        for pool in self._pools.values():
+            if not pool.session.closed:
+                await pool.session.close()
+        self._pools.clear()
+
+    def pool_stats(self) -> dict:
+        """
+        获取各上游主机的统计信息
+
+        Returns:
+            {host: {并发上限, 正在进行的请求数, 等待次数, 连接复用统计...}}
+        """
+        return {
+            host: {
+                "concurrency": pool.policy.concurrency,
+                "timeout": pool.policy.timeout,
+                "in_flight": pool.in_flight,
+                "waits": pool.waits,
+                **pool.stats.snapshot(),
+            }
+            for host, pool in self._pools.items()
+        }
+
+
+# 创建全局实例
+outbound_http = OutboundSessionRegistry()
+
+
+def _pool_samples(banked_field: str, outbound_field: str):
+    """把 Banked 后端连接池（pool="banked"）和各上游主机的统计转成指标样本"""
+
+    def collect() -> dict:
+        samples = {("banked",): http_client.pool_stats()[banked_field]}
+        for host, stats in outbound_http.pool_stats().items():
+            samples[(host,)] = stats[outbound_field]
+        return samples
+
+    return collect
+
+
+gauge(
+    "http_pool_in_use",
+    "正在进行的请求数（banked 与各第三方主机）",
+    ("pool",),
+    fn=_pool_samples("requests_in_flight", "in_flight"),
+)
+gauge(
+    "http_pool_limit",
+    "连接池上限（banked）/ 并发上限（第三方主机）",
+    ("pool",),
+    fn=_pool_samples("limit", "concurrency"),
+)
+counter(
+    "http_pool_requests_total", "HTTP 请求数", ("pool",), fn=_pool_samples("requests", "requests")
+)
+counter(
+    "http_pool_connections_created_total",
+    "新建的连接数",
+    ("pool",),
+    fn=_pool_samples("connections_created", "connections_created"),
+)
+counter(
+    "http_pool_connections_reused_total",
+    "复用的连接数",
+    ("pool",),
+    fn=_pool_samples("connections_reused", "connections_reused"),
+)
+counter(
+    "http_pool_queued_total",
+    "等待空闲连接（banked）/ 并发名额（第三方主机）的次数",
+    ("pool",),
+    fn=_pool_samples("queued", "waits"),
+)
@@ -0,0 +1,313 @@
+"""
+链路追踪
+
+记录一轮对话中各环节的耗时（span）：首个 token、每次 LLM 调用、每次工具调用、
+每次 Supabase 查询、每次 WebSocket 发送。
+
+- 同一轮对话的 span 属于同一个 trace，通过 contextvars 自动关联父子关系
+- 每个 span 结束时记录到 span_duration_seconds 直方图（按 span 名称分组），/metrics 据此给出 p50/p95/p99
+- 采样到的 trace 按 OpenTelemetry OTLP/JSON 格式批量导出到本地文件（每行一个批次）或 collector 的 /v1/traces
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.metrics import DEFAULT_BUCKETS, counter, histogram
+from app.utils.logger import logger
+from app.utils.outbound_http import outbound_http
+
+load_dotenv()
+
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "community-agent")
+# 导出的 trace 比例（0~1），直方图统计不受采样影响
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# 导出到本地文件（JSON Lines），为空不导出
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")
+# 导出到 OTLP/HTTP collector，如 http://localhost:4318/v1/traces，为空不导出
+TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL", "")
+# 批量导出的间隔（秒）和最多缓存的 span 数
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "5"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+
+# WebSocket 发送通常在毫秒以下，整轮对话可能超过 30 秒，在默认分桶两端各补几个桶
+SPAN_BUCKETS = (0.0005, 0.001, 0.0025) + DEFAULT_BUCKETS + (60, 120)
+
+span_duration_seconds = histogram(
+    "span_duration_seconds", "各环节耗时（秒）", ("span",), buckets=SPAN_BUCKETS
+)
+spans_dropped_total = counter("spans_dropped_total", "缓冲区已满被丢弃的 span 数")
+
+# OTLP 的 StatusCode
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """一个环节的耗时记录"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "status",
+        "status_message",
+        "_tracer",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[dict] = None,
+        start_ns: Optional[int] = None,
+    ):
+        self._tracer = tracer
+        self.name = name
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+            self.sampled = random.random() < tracer.sample_rate
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def duration_seconds(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, error):
+        self.status = STATUS_ERROR
+        self.status_message = str(error)
+
+    def end(self, end_ns: Optional[int] = None):
+        """结束 span（重复调用无效）"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        self._tracer._on_end(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """span 的创建、统计和导出"""
+
+    def __init__(
+        self,
+        service_name: str = TRACING_SERVICE_NAME,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        export_file: str = TRACE_EXPORT_FILE,
+        export_url: str = TRACE_EXPORT_URL,
+        interval: float = TRACE_EXPORT_INTERVAL,
+        buffer_size: int = TRACE_BUFFER_SIZE,
+    ):
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.export_file = export_file
+        self.export_url = export_url
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self._buffer: List[Span] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def exporting(self) -> bool:
+        return bool(self.export_file or self.export_url)
+
+    def current_span(self) -> Optional[Span]:
+        """当前上下文中的 span"""
+        return _current_span.get()
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        start_ns: Optional[int] = None,
+        **attributes,
+    ) -> Span:
+        """
+        创建一个 span（不设为当前 span，需要手动调用 end()）
+
+        用于开始和结束不在同一段代码里的环节，如 astream_events 中的 LLM / 工具调用
+
+        Args:
+            name: span 名称
+            parent: 父 span，默认为当前 span
+            start_ns: 开始时间（纳秒时间戳），默认为现在
+            attributes: span 属性
+        """
+        return Span(self, name, parent or _current_span.get(), attributes, start_ns)
+
+    def attach(self, span: Span) -> Token:
+        """把 span 设为当前 span，之后创建的 span 都是它的子 span"""
+        return _current_span.set(span)
+
+    def detach(self, token: Token):
+        """恢复 attach 之前的当前 span"""
+        _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        记录一段代码的耗时：with tracer.span("db.messages.insert"): ...
+
+        代码块抛出异常时 span 标记为错误
+        """
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+                span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _on_end(self, span: Span):
+        span_duration_seconds.observe(span.duration_seconds, span=span.name)
+        if not (span.sampled and self.exporting):
+            return
+        if len(self._buffer) >= self.buffer_size:
+            spans_dropped_total.inc()
+            return
+        self._buffer.append(span)
+
+    async def start(self):
+        """启动后台导出任务（应用启动时调用）"""
+        if self.exporting and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """停止导出任务并导出剩余的 span（应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("[Tracing] 导出失败: {}", e)
+
+    def _payload(self, spans: List[Span]) -> dict:
+        """按 OTLP/JSON 的 ExportTraceServiceRequest 格式组织"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.utils.tracing"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    async def flush(self):
+        """立即导出缓冲区中的 span"""
+        if not self._buffer:
+            return
+        spans, self._buffer = self._buffer, []
+        payload = self._payload(spans)
+
+        if self.export_file:
+            line = json.dumps(payload, ensure_ascii=False) + "\n"
+            await asyncio.to_thread(self._append_file, line)
+
+        if self.export_url:
+            async with outbound_http.post(self.export_url, json=payload) as response:
+                if response.status >= 400:
+                    logger.warning("[Tracing] collector 返回 {}", response.status)
+
+    def _append_file(self, line: str):
+        with open(self.export_file, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        各环节耗时汇总
+
+        Returns:
+            {span 名称: {count, sum, p50, p95, p99}}（单位：秒）
+        """
+        return {key[0]: value for key, value in span_duration_seconds.summary().items()}
+
+
+# 创建全局实例
+tracer = Tracer()
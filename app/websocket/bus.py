@@ -0,0 +1,176 @@
+"""
+WebSocket 跨 worker 消息总线
+
+多个 uvicorn worker 部署在负载均衡后面时，同一用户的连接可能落在不同 worker 上。
+发送消息时，ConnectionManager 先投递给本 worker 上的连接，再通过总线广播给其他 worker，
+其他 worker 收到后投递给各自本地的连接。
+
+- InProcessBus: 单进程部署（默认），不做跨进程广播
+- BrokerBus:    通过进程内的 LocalBroker 模拟消息中间件，用于测试多 worker 路由
+- RedisBus:     通过 Redis Pub/Sub 广播（可选依赖 redis）
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.logger import logger
+
+load_dotenv()
+
+WS_BUS_BACKEND = os.getenv("WS_BUS_BACKEND", "memory")
+WS_BUS_REDIS_URL = os.getenv("WS_BUS_REDIS_URL", "redis://localhost:6379/0")
+WS_BUS_CHANNEL = os.getenv("WS_BUS_CHANNEL", "ws:fanout")
+
+# 投递回调：(user_id, message, session_id)
+Deliver = Callable[[str, dict, Optional[int]], Awaitable[None]]
+
+
+class FanoutBus:
+    """总线基类"""
+
+    def __init__(self):
+        # 当前 worker 的标识，用于忽略自己发出的消息
+        self.worker_id = uuid.uuid4().hex
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        """
+        开始接收其他 worker 的消息
+
+        Args:
+            deliver: 收到消息后投递到本地连接的回调
+        """
+        self._deliver = deliver
+
+    async def publish(self, user_id: str, message: dict, session_id: Optional[int] = None):
+        """广播给其他 worker"""
+
+    async def close(self):
+        """停止接收并释放资源"""
+
+    def _envelope(self, user_id: str, message: dict, session_id: Optional[int]) -> dict:
+        return {
+            "origin": self.worker_id,
+            "user_id": user_id,
+            "session_id": session_id,
+            "message": message,
+        }
+
+    async def _on_envelope(self, envelope: dict):
+        if envelope["origin"] == self.worker_id or self._deliver is None:
+            return
+        try:
+            await self._deliver(
+                envelope["user_id"], envelope["message"], envelope["session_id"]
+            )
+        except Exception as e:
+            logger.warning("[WebSocket Bus] 投递失败: {}", e)
+
+
+class InProcessBus(FanoutBus):
+    """单进程部署：所有连接都在本地，不需要广播"""
+
+
+class LocalBroker:
+    """进程内的消息中间件替身，多个 BrokerBus 订阅同一个 broker 即可模拟多个 worker"""
+
+    def __init__(self):
+        self._subscribers: List[asyncio.Queue] = []
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    async def publish(self, envelope: dict):
+        for queue in list(self._subscribers):
+            queue.put_nowait(envelope)
+
+
+class BrokerBus(FanoutBus):
+    """基于 LocalBroker 的总线"""
+
+    def __init__(self, broker: LocalBroker):
+        super().__init__()
+        self.broker = broker
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self._queue = self.broker.subscribe()
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            envelope = await self._queue.get()
+            await self._on_envelope(envelope)
+
+    async def publish(self, user_id: str, message: dict, session_id: Optional[int] = None):
+        await self.broker.publish(self._envelope(user_id, message, session_id))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._queue is not None:
+            self.broker.unsubscribe(self._queue)
+            self._queue = None
+
+
+class RedisBus(FanoutBus):
+    """基于 Redis Pub/Sub 的总线（需要 pip install redis）"""
+
+    def __init__(self, url: str = WS_BUS_REDIS_URL, channel: str = WS_BUS_CHANNEL):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        import redis.asyncio as redis
+
+        await super().start(deliver)
+        self._redis = redis.from_url(self.url)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        async for item in self._pubsub.listen():
+            if item.get("type") != "message":
+                continue
+            await self._on_envelope(json.loads(item["data"]))
+
+    async def publish(self, user_id: str, message: dict, session_id: Optional[int] = None):
+        envelope = self._envelope(user_id, message, session_id)
+        await self._redis.publish(self.channel, json.dumps(envelope, ensure_ascii=False))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._redis is not None:
+            await self._redis.close()
+
+
+def create_bus(backend: str = WS_BUS_BACKEND) -> FanoutBus:
+    """按配置创建总线"""
+    if backend == "memory":
+        return InProcessBus()
+    if backend == "redis":
+        return RedisBus()
+    raise ValueError(f"未知的 WS_BUS_BACKEND: {backend}")
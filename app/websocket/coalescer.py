@@ -0,0 +1,114 @@
+"""
+文本片段合并发送
+
+LLM 每产生一个 token 就发一帧 JSON 会产生大量小帧；这里把一个时间窗口内（或累计到一定字节数）的
+片段合并成一帧发送。同一时间只有一次发送在进行，发送过程会等待 socket 写缓冲区排空，
+缓冲区满且上一次发送尚未完成时，生产者（LLM 流）会被挂起，形成真正的背压。
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.metrics import counter
+
+load_dotenv()
+
+# 合并窗口（秒）：第一个片段到达后最多等待多久发送
+WS_COALESCE_WINDOW = float(os.getenv("WS_COALESCE_WINDOW", "0.03"))
+# 累计达到该字节数时立即发送
+WS_COALESCE_MAX_BYTES = int(os.getenv("WS_COALESCE_MAX_BYTES", "1024"))
+
+ws_chunk_tokens_total = counter("ws_chunk_tokens_total", "LLM 产生的文本片段数")
+ws_chunk_frames_total = counter("ws_chunk_frames_total", "实际发送的 chunk 帧数")
+
+
+class ChunkCoalescer:
+    """单个输出流的片段缓冲区"""
+
+    def __init__(
+        self,
+        send: Callable[[dict], Awaitable[None]],
+        window: float = WS_COALESCE_WINDOW,
+        max_bytes: int = WS_COALESCE_MAX_BYTES,
+    ):
+        self._send = send
+        self.window = window
+        self.max_bytes = max_bytes
+        self._buffer: List[str] = []
+        self._size = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        # 串行化发送：上一帧写完之前不会开始下一帧
+        self._send_lock = asyncio.Lock()
+        self.tokens = 0
+        self.frames = 0
+
+    @property
+    def pending(self) -> bool:
+        """是否有尚未发送的片段"""
+        return bool(self._buffer)
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    async def add(self, chunk: str):
+        """
+        加入一个文本片段
+
+        Args:
+            chunk: 文本片段
+        """
+        self._raise_if_failed()
+        self.tokens += 1
+        ws_chunk_tokens_total.inc()
+        self._buffer.append(chunk)
+        self._size += len(chunk.encode("utf-8"))
+
+        if self._size >= self.max_bytes:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # 后台发送失败，留给下一次 add/flush 抛出
+            self._error = e
+
+    async def flush(self, is_final: bool = False):
+        """
+        立即发送缓冲区中的片段
+
+        Args:
+            is_final: 是否是最后一帧（即使缓冲区为空也会发送）
+        """
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+        self._raise_if_failed()
+
+        async with self._send_lock:
+            if not self._buffer and not is_final:
+                return
+            content = "".join(self._buffer)
+            self._buffer = []
+            self._size = 0
+            await self._send({"type": "chunk", "content": content, "is_final": is_final})
+            self.frames += 1
+            ws_chunk_frames_total.inc()
+
+    def close(self):
+        """丢弃未发送的片段并取消定时器（连接断开时调用）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._buffer = []
+        self._size = 0
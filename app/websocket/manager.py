@@ -1,88 +1,280 @@
 """
 WebSocket 连接管理器
 用于管理 WebSocket 连接和消息发送
+
+- 同一用户可以同时有多个连接（多个标签页），每个连接可以关注多个会话
+- 带 session_id 的消息只发给关注该会话的连接，不带 session_id 的消息发给该用户的所有连接
+- 本地投递之后再通过总线广播给其他 worker（见 app/websocket/bus.py）
 """
 
+import asyncio
+import uuid
 from fastapi import WebSocket
-from typing import Dict
+from typing import Dict, List, Optional, Set, Tuple
+from app.utils.metrics import gauge
+from app.utils.logger import logger, sampled
+from app.utils.tracing import tracer
+from app.websocket.bus import FanoutBus, create_bus
+from app.websocket.coalescer import (
+    ChunkCoalescer,
+    ws_chunk_tokens_total,
+    ws_chunk_frames_total,
+)
+
+
+class Connection:
+    """单个 WebSocket 连接"""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.user_id = user_id
+        # 该连接关注的会话
+        self.sessions: Set[int] = set()
+        # 同一个 socket 的发送串行进行
+        self.send_lock = asyncio.Lock()
+
+    async def send_json(self, message: dict):
+        # 耗时包含等待同一 socket 上一帧发送完成的时间
+        with tracer.span("ws.send", type=message.get("type")):
+            async with self.send_lock:
+                await self.websocket.send_json(message)
 
 
 class ConnectionManager:
     """WebSocket 连接管理器"""
 
-    def __init__(self):
-        # 存储活跃的连接：{user_id: WebSocket}
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(self, bus: Optional[FanoutBus] = None):
+        # 存储活跃的连接：{user_id: {connection_id: Connection}}
+        self.active_connections: Dict[str, Dict[str, Connection]] = {}
+        # 每个输出流（用户 + 会话）的片段缓冲区
+        self.coalescers: Dict[Tuple[str, Optional[int]], ChunkCoalescer] = {}
+        self.bus = bus or create_bus()
+
+    async def start(self):
+        """开始接收其他 worker 广播的消息（应用启动时调用）"""
+        await self.bus.start(self._deliver_local)
+
+    async def close(self):
+        """停止总线（应用关闭时调用）"""
+        await self.bus.close()
+
+    def connection_count(self) -> int:
+        """本 worker 上的连接总数"""
+        return sum(len(conns) for conns in self.active_connections.values())
+
+    def register(
+        self, websocket: WebSocket, user_id: str, session_id: Optional[int] = None
+    ) -> str:
+        """
+        登记一个已经 accept 的连接
+
+        Args:
+            websocket: WebSocket 连接对象
+            user_id: 用户 ID
+            session_id: 连接建立时关注的会话
+
+        Returns:
+            连接 ID
+        """
+        connection = Connection(websocket, user_id)
+        if session_id:
+            connection.sessions.add(session_id)
+        self.active_connections.setdefault(user_id, {})[connection.id] = connection
+        sampled.info(
+            "[WebSocket] User {} connected. Total connections: {}",
+            user_id,
+            self.connection_count(),
+        )
+        return connection.id
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(
+        self, websocket: WebSocket, user_id: str, session_id: Optional[int] = None
+    ) -> str:
         """
         接受 WebSocket 连接
 
         Args:
             websocket: WebSocket 连接对象
             user_id: 用户 ID
+            session_id: 连接建立时关注的会话
+
+        Returns:
+            连接 ID
         """
         await websocket.accept()
-        self.active_connections[user_id] = websocket
-        print(
-            f"已建立一个websocket连接 | [WebSocket] User {user_id} connected. Total connections: {len(self.active_connections)}"
-        )
+        return self.register(websocket, user_id, session_id)
+
+    def subscribe(self, user_id: str, connection_id: str, session_id: int):
+        """
+        让连接关注某个会话（之后该会话的消息会发到这个连接）
 
-    def disconnect(self, user_id: str):
+        Args:
+            user_id: 用户 ID
+            connection_id: 连接 ID
+            session_id: 会话 ID
+        """
+        connection = self.active_connections.get(user_id, {}).get(connection_id)
+        if connection is not None and session_id:
+            connection.sessions.add(session_id)
+
+    def disconnect(self, user_id: str, connection_id: Optional[str] = None):
         """
         断开连接
 
         Args:
             user_id: 用户 ID
+            connection_id: 连接 ID，为空时断开该用户的所有连接
         """
-        if user_id in self.active_connections:
+        connections = self.active_connections.get(user_id)
+        if not connections:
+            return
+
+        if connection_id is None:
+            connections.clear()
+        else:
+            connections.pop(connection_id, None)
+
+        if not connections:
             del self.active_connections[user_id]
-            print(
-                f"关闭一个连接 | [WebSocket] User {user_id} disconnected. Total connections: {len(self.active_connections)}"
-            )
+            # 用户的最后一个连接断开，丢弃未发送的片段
+            for key in [k for k in self.coalescers if k[0] == user_id]:
+                self.coalescers.pop(key).close()
+
+        sampled.info(
+            "[WebSocket] User {} disconnected. Total connections: {}",
+            user_id,
+            self.connection_count(),
+        )
+
+    def _targets(self, user_id: str, session_id: Optional[int]) -> List[Connection]:
+        connections = self.active_connections.get(user_id, {}).values()
+        if session_id is None:
+            return list(connections)
+        return [c for c in connections if session_id in c.sessions]
+
+    async def _deliver_local(
+        self, user_id: str, message: dict, session_id: Optional[int] = None
+    ) -> bool:
+        """
+        投递给本 worker 上的目标连接（等待发送完成，慢客户端会让调用方等待）
+
+        Returns:
+            是否有发送失败的连接
+        """
+        failed = False
+        for connection in self._targets(user_id, session_id):
+            try:
+                await connection.send_json(message)
+            except Exception as e:
+                logger.warning("[WebSocket] Error sending message to {}: {}", user_id, e)
+                self.disconnect(user_id, connection.id)
+                failed = True
+        return failed
+
+    async def _route(self, user_id: str, message: dict, session_id: Optional[int]):
+        """本地投递 + 广播给其他 worker"""
+        failed = await self._deliver_local(user_id, message, session_id)
+        await self.bus.publish(user_id, message, session_id)
 
-    async def send_message(self, user_id: str, message: dict):
+        if failed and not self._targets(user_id, session_id):
+            # 抛出异常，让上层知道连接已断开
+            raise RuntimeError(f"WebSocket send failed for user {user_id}")
+
+    async def send_message(
+        self, user_id: str, message: dict, session_id: Optional[int] = None
+    ):
         """
         发送消息给指定用户
 
+        先发送缓冲区中尚未发出的文本片段，保证消息顺序
+
         Args:
             user_id: 用户 ID
             message: 消息字典
+            session_id: 会话 ID，指定时只发给关注该会话的连接
         """
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                print(f"[WebSocket] Error sending message to {user_id}: {e}")
-                self.disconnect(user_id)
-                # 抛出异常，让上层知道连接已断开
-                raise RuntimeError(f"WebSocket send failed for user {user_id}: {e}")
+        coalescer = self.coalescers.get((user_id, session_id))
+        if coalescer is not None and coalescer.pending:
+            await coalescer.flush()
+        if session_id is not None:
+            message = {**message, "session_id": session_id}
+        await self._route(user_id, message, session_id)
 
-    async def send_text_chunk(self, user_id: str, chunk: str, is_final: bool = False):
+    async def send_text_chunk(
+        self,
+        user_id: str,
+        chunk: str,
+        is_final: bool = False,
+        session_id: Optional[int] = None,
+    ):
         """
-        发送文本片段（打字机效果）
+        发送文本片段（打字机效果），相邻片段会合并发送
 
         Args:
             user_id: 用户 ID
             chunk: 文本片段
             is_final: 是否是最后一个片段
+            session_id: 会话 ID
         """
-        message = {"type": "chunk", "content": chunk, "is_final": is_final}
-        await self.send_message(user_id, message)
+        key = (user_id, session_id)
+        coalescer = self.coalescers.get(key)
+        if coalescer is None:
+
+            async def send(message: dict):
+                if session_id is not None:
+                    message["session_id"] = session_id
+                await self._route(user_id, message, session_id)
 
-    async def send_error(self, user_id: str, error: str):
+            coalescer = self.coalescers[key] = ChunkCoalescer(send)
+
+        # 片段先进入缓冲区，按时间窗口/字节数合并成一帧发送
+        if chunk:
+            await coalescer.add(chunk)
+        if is_final:
+            await coalescer.flush(is_final=True)
+            # 本轮输出结束，释放缓冲区
+            self.coalescers.pop(key, None)
+
+    async def send_error(
+        self, user_id: str, error: str, session_id: Optional[int] = None
+    ):
         """
         发送错误消息
 
         Args:
             user_id: 用户 ID
             error: 错误信息
+            session_id: 会话 ID
         """
         message = {"type": "error", "content": error}
-        await self.send_message(user_id, message)
+        await self.send_message(user_id, message, session_id)
+
+    async def send_to_connection(self, user_id: str, connection_id: str, message: dict):
+        """
+        只发送给指定连接（如对该连接发来的非法请求的回复，不打扰同一用户的其他标签页）
+
+        Args:
+            user_id: 用户 ID
+            connection_id: 连接 ID
+            message: 消息字典
+        """
+        connection = self.active_connections.get(user_id, {}).get(connection_id)
+        if connection is None:
+            return
+        try:
+            await connection.send_json(message)
+        except Exception as e:
+            logger.warning("[WebSocket] Error sending message to {}: {}", user_id, e)
+            self.disconnect(user_id, connection_id)
 
-    async def send_status(self, user_id: str, status: str, data: dict = None):
+    async def send_status(
+        self,
+        user_id: str,
+        status: str,
+        data: dict = None,
+        session_id: Optional[int] = None,
+    ):
         """
         发送状态消息
 
@@ -90,10 +282,36 @@ class ConnectionManager:
             user_id: 用户 ID
             status: 状态（如 "thinking", "tool_calling", "completed"）
             data: 额外数据
+            session_id: 会话 ID
         """
         message = {"type": "status", "status": status, "data": data or {}}
-        await self.send_message(user_id, message)
+        await self.send_message(user_id, message, session_id)
+
+    def stats(self) -> dict:
+        """
+        获取发送统计
+
+        Returns:
+            活跃用户数、连接数、LLM 产生的片段数和实际发送的帧数
+        """
+        return {
+            "active_users": len(self.active_connections),
+            "active_connections": self.connection_count(),
+            "chunk_tokens": ws_chunk_tokens_total.get(),
+            "chunk_frames": ws_chunk_frames_total.get(),
+        }
 
 
 # 创建全局连接管理器实例
 manager = ConnectionManager()
+
+gauge(
+    "ws_connections_active",
+    "本 worker 上的 WebSocket 连接数",
+    fn=manager.connection_count,
+)
+gauge(
+    "ws_users_active",
+    "本 worker 上有连接的用户数",
+    fn=lambda: len(manager.active_connections),
+)
@@ -4,11 +4,14 @@ WebSocket 路由处理器
 
 from fastapi import WebSocket, WebSocketDisconnect, Query
 from app.websocket.manager import manager
+from app.websocket.scheduler import TurnScheduler
 from app.services.agent_stream import get_agent_response_stream
 from app.database.service.session import create_session, update_session_title
 from app.services.title_generator import generate_title
+from app.utils.logger import logger
 import json
 import asyncio
+import functools
 
 
 async def websocket_chat_handler(
@@ -26,11 +29,14 @@ async def websocket_chat_handler(
         session_id: 会话 ID (URL 参数传入)
         already_accepted: 是否已经 accept 过连接
     """
-    # 建立连接
+    # 建立连接（同一用户可以有多个连接，用连接 ID 区分）
     if not already_accepted:
-        await manager.connect(websocket, user_id)
+        connection_id = await manager.connect(websocket, user_id, session_id)
     else:
-        manager.active_connections[user_id] = websocket
+        connection_id = manager.register(websocket, user_id, session_id)
+
+    # 每轮对话作为独立任务执行，接收循环可以继续处理取消请求和其他会话的提问
+    scheduler = TurnScheduler(user_id)
 
     try:
         while True:
@@ -43,15 +49,35 @@ async def websocket_chat_handler(
             current_session_id = (
                 message.get("session_id") or message.get("sessionId") or session_id
             )
+            # 统一为整数，保证按会话路由时 key 一致
+            if current_session_id:
+                try:
+                    current_session_id = int(current_session_id)
+                except (TypeError, ValueError):
+                    # 非法的 session_id 只拒绝这条消息，不能断开连接（会取消该连接上进行中的回答）
+                    # 错误只回复给发来这条消息的连接
+                    await manager.send_to_connection(
+                        user_id,
+                        connection_id,
+                        {"type": "error", "content": f"无效的会话 ID: {current_session_id}"},
+                    )
+                    continue
+
+            # 取消请求: { type: 'cancel', session_id: 123 }
+            if message.get("type") == "cancel":
+                if current_session_id and scheduler.cancel(current_session_id):
+                    logger.info("[WebSocket] 用户 {} 取消了会话 {} 的回答", user_id, current_session_id)
+                continue
 
             if query:
                 # 1. 自动创建会话逻辑 (如果没传 sessionId)
                 if not current_session_id:
                     # ✅ 1.1 极速创建会话 (先用默认标题，ms级)
-                    session_res = create_session(user_id, "新对话")
+                    session_res = await create_session(user_id, "新对话")
 
                     if session_res.data:
                         current_session_id = session_res.data[0]["id"]
+                        manager.subscribe(user_id, connection_id, current_session_id)
 
                         # ✅ 1.2 立即通知前端 (前端拿到 ID 可以更新 URL)
                         await manager.send_message(
@@ -73,15 +99,39 @@ async def websocket_chat_handler(
                         await manager.send_error(user_id, "创建会话失败")
                         continue
 
-                # ✅ 2. 立即开始流式响应 (此时已有 sessionId)
-                await get_agent_response_stream(user_id, current_session_id, query)
+                # 当前连接关注该会话，流式输出只发给关注该会话的连接
+                manager.subscribe(user_id, connection_id, current_session_id)
+
+                # 该用户的并发轮次已满时，提示前端正在排队
+                if scheduler.saturated:
+                    await manager.send_status(
+                        user_id,
+                        "queued",
+                        {"message": "排队中，请稍候..."},
+                        session_id=current_session_id,
+                    )
+
+                # ✅ 2. 提交流式响应任务 (此时已有 sessionId)
+                # 同一会话的提问按顺序执行，不同会话并发执行
+                scheduler.submit(
+                    current_session_id,
+                    functools.partial(
+                        get_agent_response_stream, user_id, current_session_id, query
+                    ),
+                )
 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        pass
     except Exception as e:
-        print(f"[WebSocket Error] {e}")
-        await manager.send_error(user_id, f"错误: {str(e)}")
-        manager.disconnect(user_id)
+        logger.exception("[WebSocket Error] {}", e)
+        try:
+            await websocket.send_json({"type": "error", "content": f"错误: {str(e)}"})
+        except Exception:
+            pass
+    finally:
+        # 连接断开：取消该连接上未完成的对话任务
+        await scheduler.close()
+        manager.disconnect(user_id, connection_id)
 
 
 async def _bg_generate_title(session_id: int, content: str, user_id: str):
@@ -91,7 +141,7 @@ async def _bg_generate_title(session_id: int, content: str, user_id: str):
         new_title = await generate_title(content)
 
         # 更新数据库
-        update_session_title(session_id, new_title)
+        await update_session_title(session_id, new_title)
 
         # 再次通知前端更新标题
         await manager.send_message(
@@ -102,4 +152,4 @@ async def _bg_generate_title(session_id: int, content: str, user_id: str):
             },
         )
     except Exception as e:
-        print(f"后台生成标题失败: {e}")
+        logger.warning("后台生成标题失败: {}", e)
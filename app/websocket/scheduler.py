@@ -0,0 +1,134 @@
+"""
+对话轮次调度器
+
+每个 WebSocket 连接一个调度器，把每轮对话作为独立任务执行，接收循环不再被阻塞：
+- 同一会话的轮次按提交顺序串行执行
+- 不同会话的轮次并发执行，同一用户（跨连接）同时执行的轮次数有上限
+- 支持取消某个会话正在进行的轮次
+- 连接断开时取消所有未完成的任务
+"""
+
+import asyncio
+import os
+import weakref
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from app.utils.metrics import gauge
+from app.utils.logger import logger
+
+load_dotenv()
+
+# 同一用户同时执行的轮次上限
+WS_MAX_TURNS_PER_USER = int(os.getenv("WS_MAX_TURNS_PER_USER", "3"))
+
+chat_turns_in_flight = gauge("chat_turns_in_flight", "正在执行的对话轮次数")
+chat_turns_queued = gauge("chat_turns_queued", "等待执行的对话轮次数")
+
+# 同一用户的所有连接共享一个信号量，没有连接引用时自动释放
+_user_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _user_semaphore(user_id: str, limit: int) -> asyncio.Semaphore:
+    semaphore = _user_semaphores.get(user_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(limit)
+        _user_semaphores[user_id] = semaphore
+    return semaphore
+
+
+class TurnScheduler:
+    """单个连接的轮次调度器"""
+
+    def __init__(self, user_id: str, max_concurrent: int = WS_MAX_TURNS_PER_USER):
+        self.user_id = user_id
+        self._semaphore = _user_semaphore(user_id, max_concurrent)
+        # 每个会话最后提交的任务，新任务排在它后面
+        self._tails: Dict[int, asyncio.Task] = {}
+        # 每个会话正在执行的任务
+        self._running: Dict[int, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def saturated(self) -> bool:
+        """该用户的并发轮次是否已满（新轮次需要排队）"""
+        return self._semaphore.locked()
+
+    def submit(
+        self, session_id: int, turn: Callable[[], Awaitable[None]]
+    ) -> asyncio.Task:
+        """
+        提交一轮对话
+
+        Args:
+            session_id: 会话 ID
+            turn: 无参协程函数，执行一轮对话
+
+        Returns:
+            对应的任务
+        """
+        previous = self._tails.get(session_id)
+        task = asyncio.create_task(self._run(session_id, previous, turn))
+        self._tails[session_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._on_done(session_id, t))
+        return task
+
+    async def _run(
+        self,
+        session_id: int,
+        previous: Optional[asyncio.Task],
+        turn: Callable[[], Awaitable[None]],
+    ):
+        chat_turns_queued.inc()
+        try:
+            # 等待同一会话的上一轮结束（无论成功、失败还是被取消）
+            if previous is not None and not previous.done():
+                await asyncio.wait([previous])
+            await self._semaphore.acquire()
+        finally:
+            chat_turns_queued.dec()
+
+        chat_turns_in_flight.inc()
+        self._running[session_id] = asyncio.current_task()
+        try:
+            await turn()
+        finally:
+            if self._running.get(session_id) is asyncio.current_task():
+                del self._running[session_id]
+            chat_turns_in_flight.dec()
+            self._semaphore.release()
+
+    def _on_done(self, session_id: int, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._tails.get(session_id) is task:
+            del self._tails[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.opt(exception=task.exception()).error("[WebSocket] 对话任务异常")
+
+    def cancel(self, session_id: int) -> bool:
+        """
+        取消会话正在执行的轮次（排队中的后续轮次不受影响）
+
+        Args:
+            session_id: 会话 ID
+
+        Returns:
+            是否有正在执行的轮次被取消
+        """
+        task = self._running.get(session_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def close(self):
+        """取消所有未完成的任务并等待它们退出（连接断开时调用）"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
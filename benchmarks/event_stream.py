@@ -0,0 +1,195 @@
+"""
+astream_events 开销的微基准
+
+用与 app 相同结构的 ReAct 图（create_react_agent + pre_model_hook + checkpointer），
+模型换成按脚本输出的本地假模型（每轮先并发调用若干工具，再流式输出回答），对比：
+
+- v1：原来的循环，astream_events(version="v1")，在 Python 里按 kind 过滤
+- v2：astream_events(version="v2")，不过滤
+- v2+filter：app 当前的方式，version="v2" + include_types=["chat_model", "tool"]
+
+每种方式在同一个会话里连续跑若干轮（历史逐轮增长，与真实会话一致），
+统计每轮收到的事件数、消费事件流的 CPU 时间（process_time）和耗时。
+
+    python -m benchmarks.event_stream --turns 20 --reply-tokens 200 --tools 2
+
+只依赖 langchain-core / langgraph，不访问任何外部服务。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import time
+from typing import Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    message_chunk_to_message,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+
+# 与 app/services/agent_stream.py 中的 STREAM_EVENTS_VERSION / STREAM_EVENT_TYPES 一致
+MODES = {
+    "v1": {"version": "v1"},
+    "v2": {"version": "v2"},
+    "v2+filter": {"version": "v2", "include_types": ["chat_model", "tool"]},
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """用户消息之后返回工具调用，工具结果之后逐字流式输出回答"""
+
+    tool_names: List[str] = []
+    reply_tokens: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _chunks(self, messages: List[BaseMessage]) -> Iterator[ChatGenerationChunk]:
+        if isinstance(messages[-1], HumanMessage) and self.tool_names:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": name,
+                            "args": "{}",
+                            "id": f"call_{len(messages)}_{index}",
+                            "index": index,
+                        }
+                        for index, name in enumerate(self.tool_names)
+                    ],
+                )
+            )
+            return
+        for _ in range(self.reply_tokens):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="字"))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message: Optional[AIMessageChunk] = None
+        for chunk in self._chunks(messages):
+            message = chunk.message if message is None else message + chunk.message
+        return ChatResult(
+            generations=[ChatGeneration(message=message_chunk_to_message(message))]
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield from self._chunks(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks(messages):
+            yield chunk
+
+
+def make_tools(count: int, payload_bytes: int) -> list:
+    """生成若干返回固定大小 JSON 的异步工具（模拟账单、通知等接口的返回）"""
+    payload = json.dumps(
+        {"code": 200, "data": [{"id": i, "content": "x" * 64} for i in range(payload_bytes // 80)]}
+    )
+    tools = []
+    for index in range(count):
+
+        async def fetch() -> str:
+            """返回固定的 JSON 数据"""
+            return payload
+
+        fetch.__name__ = f"fetch_{index}"
+        tools.append(tool(fetch))
+    return tools
+
+
+def pre_model_hook(state: dict) -> dict:
+    # 与 app 一样在调用模型前经过一个 hook 节点（这里不做压缩）
+    return {"llm_input_messages": state["messages"]}
+
+
+async def run_mode(name: str, kwargs: dict, args) -> dict:
+    tools = make_tools(args.tools, args.payload_bytes)
+    model = ScriptedChatModel(
+        tool_names=[t.name for t in tools], reply_tokens=args.reply_tokens
+    )
+    agent = create_react_agent(
+        model, tools, checkpointer=InMemorySaver(), pre_model_hook=pre_model_hook
+    )
+    config = {"configurable": {"thread_id": name}, "recursion_limit": 50}
+
+    events, cpu, wall, tokens = [], [], [], 0
+    for turn in range(args.turns + args.warmup):
+        count = 0
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        async for event in agent.astream_events(
+            {"messages": HumanMessage(content=f"Request: 第 {turn} 轮")},
+            config=config,
+            **kwargs,
+        ):
+            count += 1
+            # 与 agent_stream 一样按 kind 分发，不过滤时其余事件在这里被丢弃
+            kind = event["event"]
+            if kind == "on_chat_model_stream" and event["data"]["chunk"].content:
+                tokens += turn >= args.warmup
+        if turn >= args.warmup:
+            cpu.append(time.process_time() - cpu_start)
+            wall.append(time.perf_counter() - wall_start)
+            events.append(count)
+
+    return {
+        "mode": name,
+        "events": statistics.mean(events),
+        "cpu_ms": statistics.mean(cpu) * 1000,
+        "cpu_p95_ms": sorted(cpu)[max(0, math.ceil(len(cpu) * 0.95) - 1)] * 1000,
+        "wall_ms": statistics.mean(wall) * 1000,
+        "tokens": tokens,
+    }
+
+
+async def main_async(args):
+    print(
+        f"turns={args.turns} reply_tokens={args.reply_tokens} tools={args.tools} "
+        f"payload_bytes={args.payload_bytes}"
+    )
+    results = []
+    for name in args.modes:
+        results.append(await run_mode(name, MODES[name], args))
+
+    base = results[0]
+    print(
+        f"{'mode':<10} {'events/turn':>12} {'cpu ms/turn':>12} {'cpu p95':>9} "
+        f"{'wall ms/turn':>13} {'tokens':>8} {'cpu vs ' + base['mode']:>12}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<10} {r['events']:>12.1f} {r['cpu_ms']:>12.2f} "
+            f"{r['cpu_p95_ms']:>9.2f} {r['wall_ms']:>13.2f} {r['tokens']:>8} "
+            f"{r['cpu_ms'] / base['cpu_ms']:>11.2f}x"
+        )
+    if len({r["tokens"] for r in results}) != 1:
+        print("警告：各方式收到的 token 数不一致")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20, help="每种方式测量的轮数")
+    parser.add_argument("--warmup", type=int, default=2, help="不计入统计的预热轮数")
+    parser.add_argument("--reply-tokens", type=int, default=200, help="每轮回答的 token 数")
+    parser.add_argument("--tools", type=int, default=2, help="每轮并发调用的工具数")
+    parser.add_argument("--payload-bytes", type=int, default=2000, help="每个工具返回的大小")
+    parser.add_argument(
+        "--modes", nargs="+", default=list(MODES), choices=list(MODES), help="对比的方式"
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+端到端压测
+
+在本地启动三个替身：
+- OpenAI 兼容的流式模型（benchmarks/stand_ins/llm.py）：可配置首 token 延迟分布、输出速度、工具调用脚本
+- Banked 后端（benchmarks/stand_ins/banked.py）：账单、通知、商品等接口，可配置延迟分布
+- Supabase / PostgREST（benchmarks/stand_ins/postgrest.py）：会话和消息的读写
+
+然后用这些替身的地址启动应用（uvicorn 子进程），由 N 个已认证的客户端并发连接 /ws/chat，
+每个客户端依次发送若干轮提问，统计首 token 时间、输出速度、整轮耗时分位数和错误率。
+
+    python -m benchmarks.load_test --clients 50 --turns 5 --ttft lognormal:300,0.5
+
+已经启动的应用（环境变量需指向替身的固定端口，见 --print-env）：
+
+    python -m benchmarks.load_test --app-url http://127.0.0.1:8000 --llm-port 18001 \\
+        --banked-port 18002 --supabase-port 18003
+
+需要安装 requirements.txt 中的依赖，不访问任何外部服务。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import secrets
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import aiohttp
+import jwt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stand_ins.banked import FakeBanked  # noqa: E402
+from benchmarks.stand_ins.llm import FakeLLM  # noqa: E402
+from benchmarks.stand_ins.postgrest import FakePostgREST  # noqa: E402
+from benchmarks.stand_ins.runner import AppThread, Latency  # noqa: E402
+
+# 默认的提问，按客户端和轮次轮流使用；关键词与默认工具调用脚本对应
+DEFAULT_QUERIES = [
+    "你好，介绍一下你自己",
+    "帮我查一下待缴的账单",
+    "我最近有哪些通知",
+    "帮我搜索一下牛奶类的商品",
+    "同时帮我看看账单和通知",
+]
+
+
+@dataclass
+class TurnResult:
+    """一轮对话的测量结果"""
+
+    client: int
+    ok: bool
+    latency: float  # 发送提问到收到 completed 的时间（秒）
+    ttft: Optional[float] = None  # 发送提问到第一个文本片段的时间（秒）
+    tokens: int = 0  # 收到的文本字符数（替身模型每个 token 一个字符）
+    tool_calls: int = 0
+    error: Optional[str] = None
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        if self.ttft is None or self.tokens < 2 or self.latency <= self.ttft:
+            return None
+        return self.tokens / (self.latency - self.ttft)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩分位数"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def make_token(secret: str, user_id: str) -> str:
+    """签发与应用相同算法（HS512）的测试 token"""
+    return jwt.encode(
+        {"userId": user_id, "exp": int(time.time()) + 3600}, secret, algorithm="HS512"
+    )
+
+
+async def run_turn(ws, client: int, query: str, session_id, timeout: float):
+    """发送一轮提问并读取到 completed / error，返回 (结果, 会话 ID)"""
+    payload = {"query": query}
+    if session_id:
+        payload["session_id"] = session_id
+
+    started = time.perf_counter()
+    deadline = started + timeout
+    result = TurnResult(client=client, ok=False, latency=0)
+    await ws.send_json(payload)
+
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            result.error = "timeout"
+            break
+        try:
+            msg = await ws.receive(timeout=remaining)
+        except asyncio.TimeoutError:
+            result.error = "timeout"
+            break
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            result.error = "closed"
+            break
+
+        data = json.loads(msg.data)
+        kind = data.get("type")
+        if kind == "session_created":
+            session_id = data["data"]["sessionId"]
+        elif kind == "chunk" and data.get("content"):
+            if result.ttft is None:
+                result.ttft = time.perf_counter() - started
+            result.tokens += len(data["content"])
+        elif kind == "status" and data.get("status") == "tool_calling":
+            result.tool_calls += 1
+        elif kind == "status" and data.get("status") == "completed":
+            result.ok = True
+            break
+        elif kind == "error":
+            result.error = str(data.get("content"))[:80]
+            break
+
+    result.latency = time.perf_counter() - started
+    return result, session_id
+
+
+async def run_client(
+    client: int, args, url: str, token: str, queries: List[str], results: list
+):
+    await asyncio.sleep(args.ramp_up * client / max(args.clients, 1))
+    async with aiohttp.ClientSession() as http:
+        try:
+            async with http.ws_connect(f"{url}/ws/chat", heartbeat=30) as ws:
+                await ws.send_json({"type": "auth", "token": token})
+                auth = await ws.receive_json(timeout=args.timeout)
+                if auth.get("type") != "auth_success":
+                    results.append(
+                        TurnResult(client, False, 0, error=f"auth: {auth.get('content')}")
+                    )
+                    return
+
+                session_id = None
+                for turn in range(args.turns):
+                    query = queries[(client + turn) % len(queries)]
+                    result, session_id = await run_turn(
+                        ws, client, query, session_id, args.timeout
+                    )
+                    results.append(result)
+                    if result.error in ("closed", "timeout"):
+                        return
+                    await asyncio.sleep(args.think_time / 1000)
+        except Exception as e:
+            results.append(TurnResult(client, False, 0, error=f"connect: {e}"))
+
+
+def summarize(results: List[TurnResult], wall: float) -> dict:
+    ok = [r for r in results if r.ok]
+    errors = {}
+    for r in results:
+        if not r.ok:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    def stats(values):
+        return {
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": max(values) if values else None,
+        }
+
+    tps = [r.tokens_per_sec for r in ok if r.tokens_per_sec is not None]
+    return {
+        "turns": len(results),
+        "ok": len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "errors": errors,
+        "wall_seconds": wall,
+        "turns_per_sec": len(ok) / wall if wall else 0.0,
+        "ttft_seconds": stats([r.ttft for r in ok if r.ttft is not None]),
+        "turn_seconds": stats([r.latency for r in ok]),
+        "tokens_per_sec": {
+            "per_turn_p50": percentile(tps, 0.50),
+            "per_turn_p05": percentile(tps, 0.05),
+            "aggregate": sum(r.tokens for r in ok) / wall if wall else 0.0,
+        },
+        "tool_calls": sum(r.tool_calls for r in results),
+    }
+
+
+def print_report(summary: dict, llm: FakeLLM, banked: FakeBanked, db: FakePostgREST):
+    def ms(value):
+        return f"{value * 1000:8.1f}ms" if value is not None else "       -"
+
+    def rate(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    print()
+    print(
+        f"turns={summary['turns']} ok={summary['ok']} "
+        f"error_rate={summary['error_rate']:.2%} wall={summary['wall_seconds']:.1f}s "
+        f"throughput={summary['turns_per_sec']:.2f} turns/s"
+    )
+    for name in ("ttft_seconds", "turn_seconds"):
+        s = summary[name]
+        print(
+            f"{name:<14} p50={ms(s['p50'])} p95={ms(s['p95'])} "
+            f"p99={ms(s['p99'])} max={ms(s['max'])}"
+        )
+
+    t = summary["tokens_per_sec"]
+    print(
+        f"tokens/sec     per-turn p50={rate(t['per_turn_p50'])} "
+        f"p05={rate(t['per_turn_p05'])} aggregate={rate(t['aggregate'])}"
+    )
+    print(f"tool calls     {summary['tool_calls']}")
+    if summary["errors"]:
+        print("errors:")
+        for error, count in sorted(summary["errors"].items(), key=lambda e: -e[1]):
+            print(f"  {count:>6}  {error}")
+    print(
+        f"stand-ins      llm_requests={llm.requests} banked_requests="
+        f"{sum(banked.requests.values())} supabase_requests={db.requests}"
+    )
+
+
+def app_env(args, llm_url: str, banked_url: str, supabase_url: str, secret: str) -> dict:
+    """应用指向替身所需的环境变量"""
+    return {
+        "LLM_BASE_URL": f"{llm_url}/v1",
+        "API_KEY": "sk-load-test",
+        "Banked_URL": banked_url,
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_KEY": "bench.bench.bench",
+        "JWT_SECRET": secret,
+        "CHECKPOINTER_BACKEND": "memory",
+        "LOG_LEVEL": args.log_level,
+    }
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"应用启动失败，退出码 {process.returncode}")
+            try:
+                async with http.get(f"{url}/metrics/summary") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError("等待应用启动超时")
+
+
+async def main_async(args):
+    script = None
+    if args.tool_script:
+        with open(args.tool_script, encoding="utf-8") as f:
+            script = json.load(f)
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    llm = FakeLLM(args.tokens_per_sec, args.reply_tokens, Latency(args.ttft), script)
+    banked = FakeBanked(Latency(args.banked_latency))
+    db = FakePostgREST(args.supabase_rtt / 1000)
+    llm_server = AppThread(llm.app(), args.llm_port).start()
+    banked_server = AppThread(banked.app(), args.banked_port).start()
+    db_server = db.serve(args.supabase_port)
+    supabase_url = f"http://127.0.0.1:{db_server.server_port}"
+
+    secret = os.getenv("JWT_SECRET") if args.app_url else secrets.token_hex(32)
+    env = app_env(args, llm_server.url, banked_server.url, supabase_url, secret or "")
+    if args.print_env:
+        for key, value in env.items():
+            print(f"{key}={value}")
+
+    process = None
+    url = args.app_url
+    try:
+        if url is None:
+            url = f"http://127.0.0.1:{args.port}"
+            process = subprocess.Popen(
+                [
+                    sys.executable, "-m", "uvicorn", "main:app",
+                    "--host", "127.0.0.1", "--port", str(args.port),
+                    "--workers", str(args.workers), "--log-level", "warning",
+                ],
+                cwd=ROOT,
+                env={**os.environ, **env},
+            )
+            await wait_ready(url, process)
+        elif not secret:
+            raise RuntimeError("--app-url 模式需要设置与应用相同的 JWT_SECRET")
+
+        print(
+            f"clients={args.clients} turns={args.turns} ttft={args.ttft} "
+            f"tokens/sec={args.tokens_per_sec} reply_tokens={args.reply_tokens} "
+            f"banked={args.banked_latency} supabase_rtt={args.supabase_rtt}ms"
+        )
+        ws_url = url.replace("http://", "ws://").replace("https://", "wss://")
+        results: List[TurnResult] = []
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                run_client(
+                    i, args, ws_url, make_token(secret, str(100000 + i)), queries, results
+                )
+                for i in range(args.clients)
+            )
+        )
+        summary = summarize(results, time.perf_counter() - started)
+        print_report(summary, llm, banked, db)
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "args": vars(args),
+                        "summary": summary,
+                        "turns": [asdict(r) for r in results],
+                    },
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        llm_server.stop()
+        banked_server.stop()
+        db_server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20, help="并发客户端数")
+    parser.add_argument("--turns", type=int, default=5, help="每个客户端的对话轮数")
+    parser.add_argument("--ramp-up", type=float, default=2, help="所有客户端在多少秒内依次连接")
+    parser.add_argument("--think-time", type=float, default=500, help="两轮之间的间隔（毫秒）")
+    parser.add_argument("--timeout", type=float, default=120, help="单轮超时（秒）")
+    parser.add_argument("--tokens-per-sec", type=float, default=40, help="替身模型每秒输出的 token 数")
+    parser.add_argument("--reply-tokens", type=int, default=80, help="每次回答的 token 数")
+    parser.add_argument("--ttft", default="lognormal:300,0.4", help="替身模型首 token 延迟分布")
+    parser.add_argument("--banked-latency", default="uniform:20,80", help="Banked 替身延迟分布")
+    parser.add_argument("--supabase-rtt", type=float, default=10, help="Supabase 替身往返延迟（毫秒）")
+    parser.add_argument("--tool-script", help="工具调用脚本 JSON 文件（格式见 stand_ins/llm.py）")
+    parser.add_argument("--queries", help="提问列表文件，每行一条")
+    parser.add_argument("--app-url", help="压测已经启动的应用，不再启动子进程")
+    parser.add_argument("--port", type=int, default=18000, help="应用子进程监听的端口")
+    parser.add_argument("--workers", type=int, default=1, help="应用子进程的 uvicorn worker 数")
+    parser.add_argument("--llm-port", type=int, default=0, help="模型替身端口（0 为随机）")
+    parser.add_argument("--banked-port", type=int, default=0, help="Banked 替身端口（0 为随机）")
+    parser.add_argument("--supabase-port", type=int, default=0, help="Supabase 替身端口（0 为随机）")
+    parser.add_argument("--log-level", default="WARNING", help="应用子进程的 LOG_LEVEL")
+    parser.add_argument("--print-env", action="store_true", help="打印应用指向替身所需的环境变量")
+    parser.add_argument("--json", help="把汇总和每轮结果写入 JSON 文件")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+会话归属校验的往返次数基准测试
+
+对比两种实现：
+- legacy：先查询会话归属（check_session_owner），再获取消息 / 分别删除会话和消息
+- owned：get_owned_messages 嵌入查询、delete_session_owned 事务 RPC，每个接口一次数据库调用
+
+本地启动一个 PostgREST 替身（benchmarks/stand_ins/postgrest.py），
+每个请求固定增加 --rtt 毫秒延迟模拟到 Supabase 的网络往返。app 中的 supabase 客户端指向该服务，
+走真实的 supabase-py 请求路径和 db_query 线程池。
+
+    python -m benchmarks.session_ownership --requests 200 --rtt 20
+
+需要安装 requirements.txt 中的依赖，不需要真实的 Supabase。
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stand_ins.postgrest import FakePostgREST  # noqa: E402
+
+
+def _report(name: str, latencies: list, round_trips: int):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    p95 = latencies[min(count - 1, int(count * 0.95))]
+    print(
+        f"{name:<24} round_trips/req={round_trips / count:>4.2f}  "
+        f"mean={statistics.mean(latencies) * 1000:>7.2f}ms  p95={p95 * 1000:>7.2f}ms"
+    )
+
+
+async def run(args):
+    fake = FakePostgREST(args.rtt / 1000)
+    server = fake.serve()
+
+    # 客户端在导入时根据环境变量创建，必须先指向替身
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_KEY"] = "bench.bench.bench"
+
+    from app.database.client import supabase
+    from app.database.executor import db_query
+    from app.database.service.message import get_messages, get_owned_messages
+    from app.database.service.session import (
+        check_session_owner,
+        delete_session_owned,
+        session_owner_cache,
+    )
+
+    # 原实现：先校验归属，再分别删除会话和消息
+    @db_query("bench.sessions.delete")
+    def legacy_delete_session(session_id: int):
+        return supabase.table("sessions").delete().eq("id", session_id).execute()
+
+    @db_query("bench.messages.delete")
+    def legacy_delete_messages(session_id: int):
+        return supabase.table("messages").delete().eq("session_id", session_id).execute()
+
+    async def legacy_get(session_id):
+        if await check_session_owner(session_id, args.user):
+            return (await get_messages(session_id)).data
+
+    async def legacy_delete(session_id):
+        if await check_session_owner(session_id, args.user):
+            await legacy_delete_session(session_id)
+            await legacy_delete_messages(session_id)
+
+    async def measure(name, func, session_ids):
+        before = fake.requests
+        latencies = []
+        for session_id in session_ids:
+            # 每次都从冷缓存开始，只比较数据库往返
+            session_owner_cache.clear()
+            started = time.perf_counter()
+            await func(session_id)
+            latencies.append(time.perf_counter() - started)
+        _report(name, latencies, fake.requests - before)
+
+    print(
+        f"requests={args.requests} messages/session={args.messages} rtt={args.rtt}ms"
+    )
+    ids = fake.seed(args.requests * 2, args.messages, args.user)
+    get_ids, delete_ids = ids[: args.requests], ids[args.requests :]
+    half = args.requests // 2
+
+    await measure("get messages (legacy)", legacy_get, get_ids)
+    await measure(
+        "get messages (owned)",
+        lambda session_id: get_owned_messages(session_id, args.user),
+        get_ids,
+    )
+    await measure("delete session (legacy)", legacy_delete, delete_ids[:half])
+    await measure(
+        "delete session (owned)",
+        lambda session_id: delete_session_owned(session_id, args.user),
+        delete_ids[half:],
+    )
+
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="每种接口的请求数")
+    parser.add_argument("--messages", type=int, default=20, help="每个会话的消息数")
+    parser.add_argument("--rtt", type=float, default=20, help="模拟的数据库往返延迟（毫秒）")
+    parser.add_argument("--user", default="1", help="会话所属用户 ID")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
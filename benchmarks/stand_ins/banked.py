@@ -0,0 +1,53 @@
+"""
+Banked 后端替身
+
+返回固定的账单、通知、商品等数据，每个请求按 latency 分布等待，按路径统计请求数。
+未列出的路径返回空列表，保证工具不会因为 404 报错。
+"""
+
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.stand_ins.runner import Latency
+
+BILLS = [
+    {"id": 1, "feeType": "物业费", "amount": 320.5, "period": "2025-01", "status": 0},
+    {"id": 2, "feeType": "停车费", "amount": 150.0, "period": "2025-01", "status": 0},
+]
+
+NOTIFICATIONS = [
+    {"id": 11, "title": "停水通知", "content": "本周六 9:00-12:00 停水检修", "isRead": False},
+    {"id": 12, "title": "电梯维保", "content": "3 号楼电梯周日维保", "isRead": True},
+]
+
+GOODS = [
+    {"id": 101, "name": "纯牛奶 250ml*12", "price": 45.9, "categoryId": 1},
+    {"id": 102, "name": "酸奶 200g*6", "price": 29.9, "categoryId": 1},
+]
+
+
+class FakeBanked:
+    """社区后端的替身"""
+
+    def __init__(self, latency: Latency = Latency("fixed:20")):
+        self.latency = latency
+        self.requests = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/property-fee/bills", self._data(BILLS))
+        app.router.add_get("/api/notification/list", self._data(NOTIFICATIONS))
+        app.router.add_post("/api/mall/list", self._data({"list": GOODS, "total": len(GOODS)}))
+        app.router.add_get("/api/user/ip", self._data({"ip": "127.0.0.1"}))
+        app.router.add_route("*", "/{tail:.*}", self._data([]))
+        return app
+
+    def _data(self, data):
+        async def handler(request: web.Request) -> web.Response:
+            self.requests[request.path] += 1
+            await asyncio.sleep(self.latency.sample())
+            return web.json_response({"code": 200, "message": "success", "data": data})
+
+        return handler
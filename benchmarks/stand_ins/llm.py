@@ -0,0 +1,177 @@
+"""
+OpenAI 兼容接口替身（/v1/chat/completions）
+
+- 首个 token 前按 ttft 分布等待，之后按 tokens_per_sec 逐个输出 token（每个 token 为一个字符）
+- 按工具调用脚本决定是否返回 tool_calls：最后一条消息是用户消息、且包含规则中的关键词时，
+  返回该规则的工具调用（只保留请求中声明过的工具）；最后一条是工具结果时给出最终回答
+- 支持流式（SSE）和非流式（标题生成、上下文摘要）两种调用
+
+工具调用脚本是一个 JSON 列表，按顺序匹配第一条：
+
+    [
+        {"match": "账单", "tools": [{"name": "query_unpaid_bills", "arguments": {"status": 0}}]},
+        {"match": "通知", "tools": [{"name": "get_user_notifications", "arguments": {}}]}
+    ]
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from typing import List, Optional
+
+from aiohttp import web
+
+from benchmarks.stand_ins.runner import Latency
+
+DEFAULT_TOOL_SCRIPT = [
+    {
+        "match": "账单和通知",
+        "tools": [
+            {"name": "query_unpaid_bills", "arguments": {"status": 0}},
+            {"name": "get_user_notifications", "arguments": {"pageNum": 0, "pageSize": 10}},
+        ],
+    },
+    {"match": "账单", "tools": [{"name": "query_unpaid_bills", "arguments": {"status": 0}}]},
+    {
+        "match": "通知",
+        "tools": [
+            {"name": "get_user_notifications", "arguments": {"pageNum": 0, "pageSize": 10}}
+        ],
+    },
+    {"match": "商品", "tools": [{"name": "search_goods", "arguments": {"keyword": "牛奶"}}]},
+]
+
+
+def _text(content) -> str:
+    # content 可能是字符串或 [{"type": "text", "text": ...}] 列表
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+class FakeLLM:
+    """按配置的速度和脚本输出的假模型"""
+
+    def __init__(
+        self,
+        tokens_per_sec: float = 50,
+        reply_tokens: int = 60,
+        ttft: Latency = Latency("fixed:300"),
+        script: Optional[List[dict]] = None,
+        model: str = "qwen-plus",
+    ):
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+        self.ttft = ttft
+        self.script = DEFAULT_TOOL_SCRIPT if script is None else script
+        self.model = model
+        self.requests = 0
+        self.tool_calls = 0
+        self._ids = itertools.count(1)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        return app
+
+    def _tool_calls(self, body: dict) -> List[dict]:
+        messages = body.get("messages") or []
+        if not messages or messages[-1].get("role") != "user":
+            return []
+        declared = {
+            t.get("function", {}).get("name") for t in body.get("tools") or []
+        }
+        content = _text(messages[-1].get("content"))
+        for rule in self.script:
+            if rule["match"] in content:
+                return [
+                    {
+                        "id": f"call_{next(self._ids)}",
+                        "type": "function",
+                        "function": {
+                            "name": call["name"],
+                            "arguments": json.dumps(call.get("arguments", {}), ensure_ascii=False),
+                        },
+                    }
+                    for call in rule["tools"]
+                    if call["name"] in declared
+                ]
+        return []
+
+    def _chunk(self, completion_id: str, delta: dict, finish_reason=None) -> bytes:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode()
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        completion_id = f"chatcmpl-{next(self._ids)}"
+        tool_calls = self._tool_calls(body)
+        self.tool_calls += len(tool_calls)
+        usage = {
+            "prompt_tokens": 100,
+            "completion_tokens": 0 if tool_calls else self.reply_tokens,
+            "total_tokens": 100 + (0 if tool_calls else self.reply_tokens),
+        }
+
+        await asyncio.sleep(self.ttft.sample())
+
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": None if tool_calls else "压测回复"}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": self.model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": message,
+                            "finish_reason": "tool_calls" if tool_calls else "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(self._chunk(completion_id, {"role": "assistant", "content": ""}))
+
+        if tool_calls:
+            for index, call in enumerate(tool_calls):
+                await response.write(
+                    self._chunk(completion_id, {"tool_calls": [{"index": index, **call}]})
+                )
+            await response.write(self._chunk(completion_id, {}, "tool_calls"))
+        else:
+            interval = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+            for i in range(self.reply_tokens):
+                if i and interval:
+                    await asyncio.sleep(interval)
+                await response.write(self._chunk(completion_id, {"content": "字"}))
+            await response.write(self._chunk(completion_id, {}, "stop"))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": self.model,
+                "choices": [],
+                "usage": usage,
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
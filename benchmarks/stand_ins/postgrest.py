@@ -0,0 +1,196 @@
+"""
+PostgREST 替身
+
+标准库 HTTP 服务 + 内存 SQLite，实现 app 用到的 Supabase 查询语法：
+select（eq 过滤、order、一层嵌入）、insert、update、delete，以及 delete_session_owned 函数。
+每个请求固定增加 rtt 秒延迟，模拟到 Supabase 的网络往返。
+
+    fake = FakePostgREST(rtt=0.02)
+    server = fake.serve()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class FakePostgREST:
+    """PostgREST 替身：sessions / messages 两张表和 delete_session_owned 函数"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(
+            """
+            create table sessions (
+                id integer primary key autoincrement,
+                user_id text not null,
+                title text,
+                created_at text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+            );
+            create table messages (
+                id integer primary key autoincrement,
+                session_id integer not null,
+                role text not null,
+                content text not null,
+                created_at text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+            );
+            create index messages_session_id_created_at_idx on messages (session_id, created_at);
+            """
+        )
+
+    def seed(self, sessions: int, messages_per_session: int, user_id: str) -> list:
+        """写入测试数据，返回会话 ID 列表"""
+        ids = []
+        for i in range(sessions):
+            cursor = self.db.execute(
+                "insert into sessions (user_id, title) values (?, ?)",
+                (user_id, f"会话 {i}"),
+            )
+            ids.append(cursor.lastrowid)
+            self.db.executemany(
+                "insert into messages (session_id, role, content) values (?, ?, ?)",
+                [
+                    (cursor.lastrowid, "user" if j % 2 == 0 else "assistant", f"消息 {j}")
+                    for j in range(messages_per_session)
+                ],
+            )
+        self.db.commit()
+        return ids
+
+    # ---------- 查询语法 ----------
+
+    @staticmethod
+    def _parse(query: str):
+        """拆分 select、eq 过滤条件和排序：(select, {列: 值}, {表: (列, desc)})"""
+        select, filters, orders = "*", {}, {}
+        for key, value in parse_qsl(query, keep_blank_values=True):
+            if key == "select":
+                select = value.replace(" ", "")
+            elif key == "order" or key.endswith(".order"):
+                table = key[: -len(".order")] if key != "order" else ""
+                column, _, direction = value.partition(".")
+                orders[table] = (column, direction.startswith("desc"))
+            elif value.startswith("eq."):
+                filters[key] = value[3:]
+        return select, filters, orders
+
+    def _rows(self, table: str, columns: str, filters: dict, order=None) -> list:
+        sql = f"select {columns} from {table}"
+        if filters:
+            sql += " where " + " and ".join(f"{column} = ?" for column in filters)
+        if order:
+            sql += f" order by {order[0]} {'desc' if order[1] else 'asc'}"
+        return [dict(row) for row in self.db.execute(sql, list(filters.values()))]
+
+    def select(self, table: str, query: str) -> list:
+        select, filters, orders = self._parse(query)
+        # 只支持 "列,...,子表(*)" 形式的一层嵌入
+        embeds = [part[: part.index("(")] for part in select.split(",") if "(" in part]
+        columns = [part for part in select.split(",") if "(" not in part] or ["*"]
+        rows = self._rows(table, ",".join(columns), filters, orders.get(""))
+        for embed in embeds:
+            for row in rows:
+                row[embed] = self._rows(
+                    embed, "*", {"session_id": row["id"]}, orders.get(embed)
+                )
+        return rows
+
+    def insert(self, table: str, body) -> list:
+        rows = body if isinstance(body, list) else [body]
+        inserted = []
+        for row in rows:
+            columns = ",".join(row)
+            placeholders = ",".join("?" for _ in row)
+            cursor = self.db.execute(
+                f"insert into {table} ({columns}) values ({placeholders})",
+                list(row.values()),
+            )
+            inserted.extend(self._rows(table, "*", {"id": cursor.lastrowid}))
+        self.db.commit()
+        return inserted
+
+    def update(self, table: str, query: str, body: dict) -> list:
+        _, filters, _ = self._parse(query)
+        where = " and ".join(f"{column} = ?" for column in filters)
+        assignments = ",".join(f"{column} = ?" for column in body)
+        self.db.execute(
+            f"update {table} set {assignments} where {where}",
+            list(body.values()) + list(filters.values()),
+        )
+        self.db.commit()
+        return self._rows(table, "*", filters)
+
+    def delete(self, table: str, query: str) -> list:
+        _, filters, _ = self._parse(query)
+        rows = self._rows(table, "*", filters)
+        where = " and ".join(f"{column} = ?" for column in filters)
+        self.db.execute(f"delete from {table} where {where}", list(filters.values()))
+        self.db.commit()
+        return rows
+
+    def delete_session_owned(self, p_session_id: int, p_user_id: str) -> list:
+        # 与 migrations/001_session_ownership.sql 中的函数语义一致
+        owned = self._rows("sessions", "*", {"id": p_session_id, "user_id": p_user_id})
+        if not owned:
+            return []
+        self.db.execute("delete from messages where session_id = ?", (p_session_id,))
+        self.db.execute("delete from sessions where id = ?", (p_session_id,))
+        self.db.commit()
+        return owned
+
+    # ---------- HTTP ----------
+
+    def handle(self, method: str, path: str, query: str, body: bytes):
+        time.sleep(self.rtt)
+        with self._lock:
+            self.requests += 1
+            name = path.rsplit("/", 1)[-1]
+            if path.startswith("/rest/v1/rpc/") and name == "delete_session_owned":
+                return self.delete_session_owned(**json.loads(body or b"{}"))
+            if method == "GET":
+                return self.select(name, query)
+            if method == "POST":
+                return self.insert(name, json.loads(body))
+            if method == "PATCH":
+                return self.update(name, query, json.loads(body))
+            if method == "DELETE":
+                return self.delete(name, query)
+        raise ValueError(f"不支持的请求: {method} {path}")
+
+    def serve(self, port: int = 0) -> ThreadingHTTPServer:
+        """在后台线程中启动 HTTP 服务（port=0 使用随机端口）"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                try:
+                    payload = fake.handle(self.command, url.path, url.query, body)
+                    status = 200
+                except Exception as e:
+                    payload, status = {"message": str(e)}, 400
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _respond
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
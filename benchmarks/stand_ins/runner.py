@@ -0,0 +1,80 @@
+"""
+替身服务的公共部分：延迟分布和在后台线程中运行 aiohttp 应用
+"""
+
+import asyncio
+import random
+import threading
+from typing import Optional
+
+from aiohttp import web
+
+
+class Latency:
+    """
+    延迟分布（毫秒），命令行写法：
+
+        fixed:200          固定 200ms
+        uniform:100,400    100~400ms 均匀分布
+        lognormal:300,0.5  中位数 300ms、sigma 0.5 的对数正态分布（长尾）
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        values = [float(value) for value in params.split(",") if value]
+        if kind == "fixed" and len(values) == 1:
+            self._sample = lambda: values[0]
+        elif kind == "uniform" and len(values) == 2:
+            self._sample = lambda: random.uniform(values[0], values[1])
+        elif kind == "lognormal" and len(values) == 2:
+            median, sigma = values
+            self._sample = lambda: median * random.lognormvariate(0, sigma)
+        else:
+            raise ValueError(f"无效的延迟分布: {spec}")
+
+    def sample(self) -> float:
+        """采样一次延迟（秒）"""
+        return max(self._sample(), 0) / 1000
+
+    def __repr__(self):
+        return self.spec
+
+
+class AppThread:
+    """在独立线程的事件循环中运行 aiohttp 应用，不占用压测客户端的事件循环"""
+
+    def __init__(self, app: web.Application, port: int = 0):
+        self.app = app
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "AppThread":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        self._loop.run_until_complete(site.start())
+        # port=0 时取实际监听的端口
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
@@ -1,4 +1,6 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from app.api.session import router as session_router
@@ -6,9 +8,58 @@ from app.api.dialog import router as dialog_router
 from app.api.tools import router as tools_router
 
 from app.api.message import router as message_router
+from app.services.agent_registry import agent_registry
+from app.services.intent_fast_path import intent_fast_path
+from app.database.checkpointer import init_checkpointer, close_checkpointer
+from app.utils.http_client import http_client
+from app.utils.outbound_http import outbound_http
+from app.database.executor import shutdown_executor
+from app.services.message_writer import message_writer
+from app.websocket.manager import manager
+from app.services.image_jobs import image_jobs
+from app.utils.tracing import tracer
+from app.utils.metrics import render_prometheus
+from app.utils.logger import flush_logging
 
 load_dotenv()
-app = FastAPI(title="Community Agent API")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时初始化存储、预热 Agent、创建共享连接池，关闭时释放"""
+    # 启动 trace 导出（未配置 TRACE_EXPORT_FILE / TRACE_EXPORT_URL 时只做统计）
+    await tracer.start()
+    # 初始化会话记忆存储（后端由 CHECKPOINTER_BACKEND 决定）
+    checkpointer = await init_checkpointer()
+    # 预先构建并编译 Agent，所有 WebSocket 连接共享
+    agent_registry.warm_up(checkpointer=checkpointer)
+    # 创建访问 Banked 后端的共享连接池
+    await http_client.start()
+    # 启动消息批量写入任务
+    await message_writer.start()
+    # 订阅跨 worker 的 WebSocket 消息总线
+    await manager.start()
+    # 启动文生图任务轮询，完成后通过 WebSocket 推送结果
+    await image_jobs.start(manager.send_message)
+    yield
+    # 停止轮询（会话历史写入依赖消息队列，需在其之前停止）
+    await image_jobs.stop()
+    await manager.close()
+    # 先把队列中的消息写完，再关闭数据库线程池
+    await message_writer.stop()
+    await http_client.close()
+    # 导出剩余的 trace（可能通过 outbound_http 发送到 collector）
+    await tracer.close()
+    # 关闭第三方服务（搜索、天气、文生图等）的会话池
+    await outbound_http.close()
+    # 等待数据库线程池中的查询完成
+    shutdown_executor()
+    await close_checkpointer()
+    # 输出队列中剩余的日志
+    await flush_logging()
+
+
+app = FastAPI(title="Community Agent API", lifespan=lifespan)
 
 # 配置 CORS
 app.add_middleware(
@@ -26,6 +77,41 @@ app.include_router(tools_router)
 app.include_router(message_router)
 
 
+@app.get("/metrics", tags=["监控"], response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 指标（供 Prometheus 抓取，用于监控和自动扩缩容）
+
+    包括 WebSocket 连接数、进行中/排队的对话轮次、流式输出的片段数、按工具和结果统计的工具调用、
+    HTTP 连接池占用、数据库查询耗时、标题生成耗时、各环节 span 耗时等
+    """
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/metrics/summary", tags=["监控"])
+async def metrics_summary():
+    """
+    各环节耗时汇总（秒）
+
+    包括首个 token（llm.first_token）、LLM 调用、工具调用（tool.<name>）、
+    Supabase 查询（db.<query>）、WebSocket 发送（ws.send）和整轮对话（chat.turn）的 p50/p95/p99
+    """
+    return {"success": True, "data": tracer.summary()}
+
+
+@app.get("/metrics/fast-path", tags=["监控"])
+async def metrics_fast_path():
+    """
+    意图快速通道统计
+
+    按意图（bills/notifications/weather）返回命中、回退次数，命中率，
+    以及快速通道和 Agent 两条路径整轮耗时的 p50 与节省的时间（秒）
+    """
+    return {"success": True, "data": intent_fast_path.stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,59 @@
+-- 会话归属相关的查询优化
+--
+-- 1. messages.session_id -> sessions.id 外键：PostgREST 依据外键支持 sessions?select=id,messages(*) 嵌入查询，
+--    获取消息时一次请求同时完成归属校验和消息读取（app/database/service/message.py: get_owned_messages）
+-- 2. messages (session_id, created_at) 索引：按会话读取消息并按时间排序
+-- 3. delete_session_owned：在一个事务中校验归属并删除会话及其消息
+--    （app/database/service/session.py: delete_session_owned）
+--
+-- 在 Supabase SQL Editor 中执行，可重复执行。
+
+-- 外键（NOT VALID：不校验已有的数据，历史上残留的孤儿消息不影响添加）
+do $$
+begin
+    if not exists (
+        select 1
+        from pg_constraint
+        where conrelid = 'public.messages'::regclass
+          and confrelid = 'public.sessions'::regclass
+          and contype = 'f'
+    ) then
+        alter table public.messages
+            add constraint messages_session_id_fkey
+            foreign key (session_id) references public.sessions (id)
+            on delete cascade
+            not valid;
+    end if;
+end;
+$$;
+
+create index if not exists messages_session_id_created_at_idx
+    on public.messages (session_id, created_at);
+
+-- 删除属于该用户的会话及其全部消息
+-- 返回被删除的会话行；会话不存在或不属于该用户时返回空集，不删除任何数据
+create or replace function public.delete_session_owned(p_session_id bigint, p_user_id text)
+returns setof public.sessions
+language plpgsql
+as $$
+begin
+    -- 锁定会话行，防止并发请求在校验和删除之间修改
+    perform 1
+    from public.sessions
+    where id = p_session_id
+      and user_id::text = p_user_id
+    for update;
+
+    if not found then
+        return;
+    end if;
+
+    delete from public.messages where session_id = p_session_id;
+
+    return query
+        delete from public.sessions where id = p_session_id returning *;
+end;
+$$;
+
+-- 通知 PostgREST 重新加载表结构（新的外键和函数立即可用）
+notify pgrst, 'reload schema';
@@ -0,0 +1,16 @@
+-- 会话列表的键集分页索引
+--
+-- GET /sessions?mode=cursor 的查询为：
+--   where user_id = ? [and (created_at, id) < 游标] order by created_at desc, id desc limit ?
+-- 该索引与过滤和排序完全一致，每页只读取 limit 行，与用户的历史会话数量无关；
+-- page 模式的 offset 分页和 count=exact 也会用到它（仍需扫描前面的行）。
+--
+-- 在 Supabase SQL Editor 中执行，可重复执行。
+-- 会话表较大时去掉 concurrently 前的注释符并单独执行，避免建索引期间锁表
+-- （concurrently 不能在事务块中执行）。
+
+create index /* concurrently */ if not exists sessions_user_id_created_at_idx
+    on public.sessions (user_id, created_at desc, id desc);
+
+-- 更新统计信息，count=estimated 依赖查询计划的行数估计
+analyze public.sessions;